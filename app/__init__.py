@@ -1,37 +1,83 @@
-from flask import Flask
+from flask import Flask, g
 from app.extensions import db, login_manager
 from flask_migrate import Migrate
 from app.models import User
 from flask_wtf.csrf import CSRFProtect # Güvenlik modülü
+from app.tenancy import init_tenancy, split_user_id
+from app.catalog import init_catalog
+from app.audit import init_audit
+from app.replica import init_replica
+from app.query_budget import init_query_budget
+from app.query_plans import init_query_plans
+from app.scheduler import init_scheduler
+from app.outbox import init_outbox
+from app.archive import init_archive
+from app.backup import init_backup
+from app.patients import init_patients
+from app.assets import init_assets
+from app.fragments import init_fragments
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     
     # Ayarlar
     app.config['SECRET_KEY'] = 'gizli-anahtar-123'
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///dishekimi.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config:
+        app.config.update(config) # Testler için ayar ezme
+    app.config.setdefault('SCHEDULER_ENABLED', not app.config.get('TESTING'))
+    app.config.setdefault('OUTBOX_TRANSPORTS', {'sms': 'stub', 'email': 'stub'} if app.config.get('TESTING') else {'sms': 'console', 'email': 'console'})
 
     # Eklentileri Başlat
     db.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
-    migrate = Migrate(app, db)
+    migrate = Migrate(app, db, render_as_batch=True) # SQLite: sütun / kısıt değişiklikleri tabloyu yeniden kurar (migrations/)
     
     # CSRF Korumasını Aktif Et (Kritik Nokta)
     csrf = CSRFProtect(app)
 
+    # GET istekleri salt-okunur bağlantıdan (SQLite WAL), yazmalar birincilden; diğer before_request'lerden önce
+    init_replica(app)
+
+    # Çoklu şube: klinik çözümleme ve otomatik sorgu kapsamı
+    init_tenancy(app)
+    init_catalog(app) # İşlem kataloğu önbelleği (sürüm damgası kontrolü)
+    init_audit(app) # Randevu / tedavi değişiklik kaydı (arka planda toplu yazılır)
+
+    # Route başına sorgu bütçesi (N+1 koruması; sayaç ilk before_request olarak başlar)
+    init_query_budget(app)
+    init_query_plans(app) # Sık sorguların planı (`flask indexes check|sync`)
+
+    # Bakım görevleri (geçmiş randevu/seans kapatma vb.)
+    init_scheduler(app)
+    init_outbox(app)
+    init_archive(app) # Eski randevu / tedavi arşivi (`flask archive ...`)
+    init_backup(app) # Canlı veritabanı yedekleri (`flask backup ...`)
+    init_patients(app) # Telefon normalizasyonu, mükerrer hasta birleştirme (`flask patients ...`)
+
+    # Parmak izli statik dosyalar (Cache-Control: immutable)
+    init_assets(app)
+    init_fragments(app) # Jinja bytecode önbelleği + {% cache %} parçaları
+
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Başka şubenin adresine taşınan oturum o şubenin aynı id'li kullanıcısı olarak açılmaz
+        clinic_id, user_id = split_user_id(user_id)
+        if clinic_id != g.get('clinic_id'):
+            return None
+        return db.session.get(User, user_id)
 
     # Blueprint'leri Kayıt Et
     from app.routes.admin_routes import admin_bp
     from app.routes.user_routes import user_bp
     from app.routes.auth_routes import auth_bp
+    from app.routes.calendar_routes import calendar_bp
 
     app.register_blueprint(admin_bp)
     app.register_blueprint(user_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(calendar_bp)
 
     return app
\ No newline at end of file
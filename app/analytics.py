@@ -0,0 +1,174 @@
+import calendar
+from datetime import date, datetime
+import numpy as np
+from flask import g
+from sqlalchemy import select, func, cast, Integer
+from app.extensions import db
+from app.models import Appointment, AppointmentArchive, Resource
+from app.fragments import FragmentCache
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+# Tek istekte sorulabilecek en uzun aralık (ay)
+MAX_MONTHS = 36
+# Bellekte tutulan ay sonucu (klinik x ay; LRU)
+MONTH_CACHE_SIZE = 256
+# Koltuğu meşgul etmeyen randevular (gelmeyen hasta da slotu kapatmıştır, sayılır)
+EXCLUDED_STATUSES = ('cancelled',)
+# Geçmiş yıllar arşiv tablosunda (bkz. app/archive.py)
+SOURCES = (Appointment, AppointmentArchive)
+
+# Ay sonuçları süreç içinde saklanır. Anahtar, o ayın satırlarından tek GROUP BY sorgusuyla çıkan
+# damgadır (adet, id toplamı, sürüm toplamı): ekleme / silme / düzenleme (sürüm artar) yeni anahtar
+# üretir, değişmeyen aylar yeniden hesaplanmaz. Silme gerekmez; eski sonuçlar LRU'dan düşer.
+_MONTHS = FragmentCache(MONTH_CACHE_SIZE)
+
+
+class AnalyticsError(ValueError):
+    """Geçersiz analiz aralığı."""
+
+
+def parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        raise AnalyticsError(f'Geçersiz ay: {value!r} (beklenen YYYY-AA).')
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(first, last):
+    """first..last (dahil) ayların ilk günleri."""
+    count = (last.year - first.year) * 12 + last.month - first.month + 1
+    if count < 1:
+        raise AnalyticsError('Başlangıç ayı bitiş ayından sonra olamaz.')
+    if count > MAX_MONTHS:
+        raise AnalyticsError(f'En fazla {MAX_MONTHS} aylık aralık sorulabilir.')
+    return [add_months(first, i) for i in range(count)]
+
+
+def _epoch_seconds(column):
+    # Tarih ayrıştırma Python'da değil SQLite'ta: satır başına tek tamsayı gelir
+    return cast(func.strftime('%s', column), Integer)
+
+
+def _window(model, months):
+    return (model.start_time >= months[0], model.start_time < add_months(months[-1], 1),
+            model.status.notin_(EXCLUDED_STATUSES))
+
+
+def _stamps(months):
+    """Ay -> damga; her kaynak tablo için tek gruplanmış sorgu."""
+    stamps = {}
+    for model in SOURCES:
+        key = func.strftime('%Y-%m', model.start_time)
+        rows = db.session.execute(
+            select(key, func.count(), func.sum(model.id), func.coalesce(func.sum(model.version), 0))
+            .where(*_window(model, months)).group_by(key))
+        for month, *stamp in rows:
+            stamps.setdefault(month, []).extend(stamp)
+    return {m: tuple(stamps.get(m.strftime('%Y-%m'), ())) for m in months}
+
+
+def _fetch(months):
+    """Aralıktaki randevular: (başlangıç, bitiş) epoch dakikası ve işlem adı dizileri."""
+    rows = []
+    for model in SOURCES:
+        rows += db.session.execute(
+            select(_epoch_seconds(model.start_time), _epoch_seconds(model.end_time), model.title)
+            .where(*_window(model, months), model.end_time > model.start_time)).all()
+    if not rows:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, object)
+    starts, ends, titles = zip(*rows)
+    return (np.fromiter(starts, np.int64, len(rows)) // 60, np.fromiter(ends, np.int64, len(rows)) // 60,
+            np.array([t or '-' for t in titles], dtype=object))
+
+
+def bin_intervals(starts, ends, days):
+    """Aralıkları gün x slot matrisine döker: hücre = o 15 dakikadaki dolu koltuk-dakika.
+
+    Döngü yok: başlangıçlarda +1, bitişlerde -1 (bincount), kümülatif toplam dakika başına eşzamanlı
+    randevu sayısını verir; 15'lik gruplar toplanır. starts / ends pencere başından dakika, [0, gün*1440].
+    """
+    minutes = days * 24 * 60
+    delta = np.bincount(starts, minlength=minutes + 1) - np.bincount(ends, minlength=minutes + 1)
+    busy = np.cumsum(delta[:minutes])
+    return busy.reshape(days, SLOTS_PER_DAY, SLOT_MINUTES).sum(axis=2)
+
+
+def month_stats(month, starts, ends, titles):
+    """Tek ayın sonucu: haftanın günü x slot dolu dakika, ayda her günün kaç kez geçtiği, işlem dakikaları.
+
+    Ay sınırını aşan randevunun taşan kısmı kırpılır.
+    """
+    days = calendar.monthrange(month.year, month.month)[1]
+    origin = calendar.timegm(month.timetuple()) // 60
+    starts = np.clip(starts - origin, 0, days * 1440)
+    ends = np.clip(ends - origin, 0, days * 1440)
+    weekdays = (month.weekday() + np.arange(days)) % 7
+
+    minutes = np.zeros((7, SLOTS_PER_DAY), np.int64)
+    np.add.at(minutes, weekdays, bin_intervals(starts, ends, days))
+    names, inverse = np.unique(titles, return_inverse=True)
+    by_procedure = np.bincount(inverse, weights=ends - starts, minlength=len(names))
+    return {
+        'minutes': minutes,
+        'days': np.bincount(weekdays, minlength=7),
+        'procedures': dict(zip(names.tolist(), by_procedure.astype(np.int64).tolist())),
+        'count': len(starts),
+    }
+
+
+def monthly(months):
+    """Ay -> sonuç; önbellekte olmayan aylar tek seferde çekilip hesaplanır."""
+    clinic = g.get('clinic_id')
+    stamps = _stamps(months)
+    results = {m: _MONTHS.get((clinic, m, stamps[m])) for m in months}
+    missing = [m for m in months if results[m] is None]
+    if missing:
+        starts, ends, titles = _fetch(missing)
+        origins = np.array([calendar.timegm(m.timetuple()) // 60 for m in months + [add_months(months[-1], 1)]])
+        index = np.searchsorted(origins, starts, side='right') - 1  # randevunun başladığı ay
+        for m in missing:
+            mask = index == months.index(m)
+            results[m] = month_stats(m, starts[mask], ends[mask], titles[mask])
+            _MONTHS.set((clinic, m, stamps[m]), results[m])
+    return results
+
+
+def utilization(first, last):
+    """first..last ayları için koltuk doluluğu ısı haritası ve aylara göre işlem yükü.
+
+    heatmap[gün][slot]: o haftanın günü ve saat diliminde dolu koltuk-dakika / kapasite (0-1).
+    Kapasite = aralıkta o günün kaç kez geçtiği x 15 dk x aktif koltuk sayısı (kaynak yoksa 1).
+    """
+    months = month_range(first, last)
+    results = monthly(months)
+    chairs = Resource.query.filter_by(kind='chair', active=True).count() or 1
+
+    minutes = sum(results[m]['minutes'] for m in months)
+    capacity = sum(results[m]['days'] for m in months)[:, None] * SLOT_MINUTES * chairs
+    heatmap = minutes / capacity
+
+    names = sorted({name for m in months for name in results[m]['procedures']})
+    return {
+        'months': [m.strftime('%Y-%m') for m in months],
+        'slot_minutes': SLOT_MINUTES,
+        'chairs': chairs,
+        'appointments': sum(results[m]['count'] for m in months),
+        'heatmap': np.round(heatmap, 3).tolist(),
+        'procedures': {
+            'names': names,
+            # İşlem x ay, saat
+            'hours': [[round(results[m]['procedures'].get(name, 0) / 60, 1) for m in months] for name in names],
+        },
+    }
+
+
+def default_range(today=None):
+    """Son 12 ay (içinde bulunulan ay dahil)."""
+    current = (today or date.today()).replace(day=1)
+    return add_months(current, -11), current
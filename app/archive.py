@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, func, literal, exists
+from app.extensions import db
+from app.models import (Appointment, Treatment, AppointmentArchive, TreatmentArchive, OutboxMessage, WaitlistEntry,
+                        appointment_resource)
+from app.tenancy import for_each_tenant, clinics, tenant
+
+# Bitişi bu kadar gün önce olan randevular / tedaviler arşive taşınır
+ARCHIVE_AFTER_DAYS = 365
+# Her parti ayrı transaction: yazma kilidi kısa tutulur, arada diğer istekler çalışır
+BATCH_SIZE = 500
+
+# Sıcak tablo -> arşiv tablosu
+ARCHIVES = {Appointment: AppointmentArchive, Treatment: TreatmentArchive}
+# Satırın "yaşı" (ufuk bu kolona göre)
+AGE_COLUMNS = {Appointment: Appointment.end_time, Treatment: Treatment.date}
+
+
+def _columns(model):
+    return [c.key for c in model.__table__.columns]
+
+
+def horizon(now=None):
+    days = current_app.config.get('ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS)
+    return (now or datetime.now()) - timedelta(days=days)
+
+
+def _candidates(model, cutoff, limit):
+    """Arşivlenecek sıradaki id'ler (en eskiden).
+
+    Tablodaki en büyük id taşınmaz: AUTOINCREMENT'siz eski SQLite tablolarında boşalan en büyük
+    id yeniden verilebilir ve geri yüklemede çakışırdı. Bekleyen hatırlatması ya da açık bekleme
+    listesi teklifi olan randevular sıcak tabloda kalır.
+    """
+    # Tablo sütunu üzerinden: klinik filtresi eklenmez, rowid'den tek adımda okunur
+    newest = db.session.execute(select(func.max(model.__table__.c.id))).scalar()
+    if newest is None:
+        return []
+    query = db.session.query(model.id).filter(model.id < newest, AGE_COLUMNS[model] < cutoff)
+    if model is Appointment:
+        query = query.filter(
+            Appointment.status != 'held',
+            ~exists().where(OutboxMessage.appointment_id == Appointment.id, OutboxMessage.status.in_(('pending', 'sending'))),
+            ~exists().where(WaitlistEntry.appointment_id == Appointment.id, WaitlistEntry.status == 'offered'),
+        )
+    return [i for (i,) in query.order_by(model.id).limit(limit)]
+
+
+def archive_batch(model, ids):
+    """id'leri tek transaction'da arşive kopyalar ve sıcak tablodan siler.
+
+    Randevuya bağlı bitmiş hatırlatmaların ve bekleme listesi kayıtlarının bağı aynı transaction'da
+    kaldırılır (SQLite yabancı anahtarları denetlemez; silinen randevuya işaret eden satır kalmasın).
+    Açık olanlar zaten taşınmaz (bkz. _candidates); geri yüklemede bu bağlar geri gelmez.
+    """
+    archive = ARCHIVES[model]
+    columns = _columns(model)
+    values = [getattr(model, c) for c in columns]
+    if model is Appointment:
+        columns = columns + ['resource_ids']
+        values.append(select(func.group_concat(appointment_resource.c.resource_id))
+                      .where(appointment_resource.c.appointment_id == Appointment.id).scalar_subquery())
+    db.session.execute(insert(archive).from_select(
+        columns + ['archived_at'], select(*values, literal(datetime.utcnow(), db.DateTime)).where(model.id.in_(ids))))
+    if model is Appointment:
+        db.session.execute(delete(appointment_resource).where(appointment_resource.c.appointment_id.in_(ids)))
+        for referencing in (OutboxMessage, WaitlistEntry):
+            db.session.execute(update(referencing).where(referencing.appointment_id.in_(ids)).values(appointment_id=None)
+                               .execution_options(synchronize_session=False))
+    db.session.execute(delete(model).where(model.id.in_(ids))
+                       .execution_options(synchronize_session=False, audit_action='archive'))
+    db.session.commit()
+    return len(ids)
+
+
+def restore_batch(model, ids):
+    """Arşivdeki id'leri aynı id'lerle sıcak tabloya geri taşır."""
+    archive = ARCHIVES[model]
+    columns = _columns(model)
+    db.session.execute(insert(model).from_select(columns, select(*[getattr(archive, c) for c in columns])
+                                                 .where(archive.id.in_(ids))))
+    if model is Appointment:
+        links = [{'appointment_id': appt_id, 'resource_id': int(r)}
+                 for appt_id, resource_ids in db.session.execute(
+                     select(archive.id, archive.resource_ids).where(archive.id.in_(ids)))
+                 if resource_ids for r in resource_ids.split(',')]
+        if links:
+            db.session.execute(insert(appointment_resource), links)
+    db.session.execute(delete(archive).where(archive.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+def archive_old_rows(now=None, batch_size=None):
+    """Ufuktan eski randevu ve tedavileri partiler hâlinde arşive taşır (aktif klinik kapsamında)."""
+    cutoff = horizon(now)
+    batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', BATCH_SIZE)
+    moved = 0
+    for model in ARCHIVES:
+        while ids := _candidates(model, cutoff, batch_size):
+            moved += archive_batch(model, ids)
+    return moved
+
+
+def restore(user_id=None, since=None, batch_size=None):
+    """Arşivden geri yükler: hastanın tüm geçmişi ve/veya `since` tarihinden yeni kayıtlar."""
+    batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', BATCH_SIZE)
+    restored = 0
+    for model, archive in ARCHIVES.items():
+        query = db.session.query(archive.id)
+        if user_id is not None:
+            query = query.filter(archive.user_id == user_id)
+        if since is not None:
+            query = query.filter((archive.end_time if archive is AppointmentArchive else archive.date) >= since)
+        while ids := [i for (i,) in query.order_by(archive.id).limit(batch_size)]:
+            restored += restore_batch(model, ids)
+    return restored
+
+
+def patient_history(user_id):
+    """Hasta detay ekranı için randevu ve tedaviler: sıcak + arşiv, yeniden eskiye."""
+    appointments = Appointment.query.filter_by(user_id=user_id).order_by(Appointment.start_time.desc()).all()
+    appointments += AppointmentArchive.query.filter_by(user_id=user_id).order_by(AppointmentArchive.start_time.desc()).all()
+    treatments = Treatment.query.filter_by(user_id=user_id).order_by(Treatment.date.desc()).all()
+    treatments += TreatmentArchive.query.filter_by(user_id=user_id).order_by(TreatmentArchive.date.desc()).all()
+    appointments.sort(key=lambda a: a.start_time, reverse=True)
+    treatments.sort(key=lambda t: t.date, reverse=True)
+    return appointments, treatments
+
+
+def archive_stats():
+    return {model.__tablename__: {'hot': db.session.query(func.count(model.id)).scalar(),
+                                  'archive': db.session.query(func.count(archive.id)).scalar()}
+            for model, archive in ARCHIVES.items()}
+
+
+def init_archive(app):
+    """`flask archive ...` komutları. Düzenli taşıma `archive_history` görevi ile yapılır (app/jobs.py)."""
+
+    @app.cli.group('archive')
+    def archive_cli():
+        """Eski randevu / tedavi arşivi."""
+
+    def scoped(slug, func, *args):
+        if slug is None:
+            return for_each_tenant(func, *args)
+        if slug not in clinics():
+            raise click.BadParameter(f"Bilinmeyen şube: {slug}", param_hint='--clinic')
+        with tenant(clinics()[slug][0]):
+            return func(*args)
+
+    @archive_cli.command('run')
+    @click.option('--clinic', default=None, help='Yalnızca bu şube (slug)')
+    @click.option('--batch', default=None, type=int, help='Parti büyüklüğü')
+    def run_cmd(clinic, batch):
+        click.echo(f"{scoped(clinic, archive_old_rows, None, batch)} kayıt arşivlendi (ufuk: {horizon():%Y-%m-%d})")
+
+    @archive_cli.command('restore')
+    @click.option('--clinic', default=None, help='Yalnızca bu şube (slug)')
+    @click.option('--patient', default=None, type=int, help='Hasta id')
+    @click.option('--since', default=None, type=click.DateTime(formats=['%Y-%m-%d']), help='Bu tarihten yeni kayıtlar')
+    def restore_cmd(clinic, patient, since):
+        if patient is None and since is None:
+            raise click.UsageError('--patient ya da --since verilmeli.')
+        click.echo(f"{scoped(clinic, restore, patient, since)} kayıt geri yüklendi")
+
+    @archive_cli.command('stats')
+    @click.option('--clinic', default=None, help='Yalnızca bu şube (slug)')
+    def stats_cmd(clinic):
+        def show():
+            for table, counts in archive_stats().items():
+                click.echo(f"{table:<12} sıcak: {counts['hot']:>8}  arşiv: {counts['archive']:>8}")
+        scoped(clinic, show)
@@ -0,0 +1,253 @@
+"""Asenkron API katmanı (ASGI).
+
+Takvim akışları (sık yoklanan, salt okuma) ve Clerk girişi (dış HTTP çağrısı) tek bir event loop'ta
+çalışır: istek beklerken thread tutmaz. Diğer tüm yollar aynı süreçteki Flask uygulamasına
+(thread havuzunda) aktarılır; modeller, şablonlar ve oturum çerezi ortaktır.
+
+Çalıştırma: `uvicorn asgi:app --port 5003` (bkz. kökteki asgi.py)
+"""
+import os
+import time
+import logging
+from contextlib import asynccontextmanager
+import httpx
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import Response, JSONResponse, RedirectResponse
+from starlette.routing import Route, Mount
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import joinedload, selectinload
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from flask import url_for
+from app import create_app
+from app.extensions import db
+from app.models import User, Appointment, Resource, Clinic
+from app.feeds import build_feed, parse_range
+from app.resources import overlap_criteria
+from app.replica import replica_url
+from app.tenancy import slug_from, split_user_id
+from app.routes.admin_routes import ADMIN_FEED, admin_feed_row
+from app.routes.user_routes import USER_FEED, user_feed_row
+from app.routes.auth_routes import CLERK_API, CLERK_TIMEOUT, decode_clerk_token, primary_email, clerk_role
+
+# Senkron sürücü -> asenkron sürücü
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg', 'mysql': 'mysql+aiomysql'}
+# Flask'a aktarılan istekler için thread sayısı
+WSGI_THREADS = 10
+# Clerk API'ye aynı anda açık bağlantı
+CLERK_CONNECTIONS = 100
+
+log = logging.getLogger(__name__)
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def _scope(model, clinic_id):
+    """app/tenancy.py'deki otomatik kapsamın karşılığı (bu katmanda session olayları yok)."""
+    return model.clinic_id.is_(None) if clinic_id is None else model.clinic_id == clinic_id
+
+
+class AsyncTier:
+    """Flask uygulamasının yapılandırmasından türetilen asenkron engine'ler, oturum çerezi ve HTTP istemcisi."""
+
+    def __init__(self, flask_app):
+        self.flask = flask_app
+        self.config = flask_app.config
+        with flask_app.app_context():
+            self.primary = db.engine.url  # Flask-SQLAlchemy göreli SQLite yolunu instance/ altına çözer
+        with flask_app.test_request_context():
+            self.urls = {name: url_for(name) for name in ('auth.login', 'admin.dashboard', 'user.dashboard')}
+        self.serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        self.engines = {}
+        self.sessionmakers = {}
+        self.clinics = None
+        self.http = None
+
+    # --- Veritabanı ---
+    def sessionmaker(self, uri, readonly):
+        """(veritabanı, salt-okunur) başına AsyncSession üreticisi. Okumalar mode=ro bağlantısından yapılır."""
+        key = (str(uri), readonly)
+        if key not in self.sessionmakers:
+            url = replica_url(uri) if readonly and self.config.get('READ_REPLICA', True) else None
+            self.engines[key] = create_async_engine(async_url(url or uri))
+            self.sessionmakers[key] = async_sessionmaker(self.engines[key], expire_on_commit=False)
+        return self.sessionmakers[key]
+
+    async def clinic(self, request, authenticated=False):
+        """(clinic_id, veritabanı adresi). Klinik tanımlı değilse tek şube (None, birincil).
+
+        Oturum açmış isteklerde X-Clinic dikkate alınmaz (bkz. app/tenancy.resolve_slug).
+        """
+        header = None if authenticated else request.headers.get('x-clinic')
+        slug = slug_from(header, request.headers.get('host', ''), self.config.get('DEFAULT_CLINIC'))
+        if self.clinics is None or (slug and self.clinics and slug not in self.clinics):
+            async with self.sessionmaker(self.primary, True)() as session:
+                self.clinics = {c.slug: (c.id, c.database_uri) for c in await session.scalars(select(Clinic))}
+        if not self.clinics:
+            return None, self.primary
+        if slug not in self.clinics:
+            raise HTTPException(404, 'Klinik bulunamadı.')
+        clinic_id, uri = self.clinics[slug]
+        return clinic_id, uri or self.primary
+
+    @asynccontextmanager
+    async def reader(self, request):
+        """(AsyncSession, clinic_id, Flask oturumu). Yakın zamanda yazan kullanıcı birincilden okur."""
+        data = self.load_session(request)
+        clinic_id, uri = await self.clinic(request, authenticated='_user_id' in data)
+        readonly = data.get('rw_until', 0) < time.time()
+        async with self.sessionmaker(uri, readonly)() as session:
+            yield session, clinic_id, data
+
+    async def current_user(self, session, data, clinic_id):
+        if not data.get('_user_id'):
+            return None
+        user_clinic, user_id = split_user_id(data['_user_id'])
+        if user_clinic != clinic_id:  # Çerez başka şubede verilmiş: oradaki aynı id'li kullanıcı açılmaz
+            return None
+        return await session.scalar(select(User).where(User.id == int(user_id), _scope(User, clinic_id)))
+
+    # --- Flask oturum çerezi ---
+    def load_session(self, request):
+        cookie = request.cookies.get(self.config['SESSION_COOKIE_NAME'])
+        if not cookie:
+            return {}
+        try:
+            return self.serializer.loads(cookie, max_age=int(self.flask.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return {}
+
+    def save_session(self, response, data):
+        lifetime = int(self.flask.permanent_session_lifetime.total_seconds())
+        response.set_cookie(
+            self.config['SESSION_COOKIE_NAME'], self.serializer.dumps(dict(data)),
+            max_age=lifetime if data.get('_permanent') else None, path=self.config['SESSION_COOKIE_PATH'] or '/',
+            domain=self.config['SESSION_COOKIE_DOMAIN'], secure=self.config['SESSION_COOKIE_SECURE'],
+            httponly=self.config['SESSION_COOKIE_HTTPONLY'], samesite=(self.config['SESSION_COOKIE_SAMESITE'] or 'lax').lower(),
+        )
+        return response
+
+    # --- Yanıtlar ---
+    def feed(self, request, rows, schema):
+        body, mimetype, encoding = build_feed(rows, schema, parse_accept_header(request.headers.get('accept'), MIMEAccept),
+                                              parse_accept_header(request.headers.get('accept-encoding')))
+        headers = {'Vary': 'Accept, Accept-Encoding'}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, media_type=mimetype, headers=headers)
+
+    # --- Clerk ---
+    async def clerk_email(self, clerk_user_id):
+        secret_key = os.environ.get('CLERK_SECRET_KEY')
+        if not secret_key:
+            return None
+        try:
+            response = await self.http.get(f"{CLERK_API}/users/{clerk_user_id}", headers={'Authorization': f'Bearer {secret_key}'})
+        except httpx.HTTPError as e:
+            log.warning("Clerk API hatası: %s", e)
+            return None
+        return primary_email(response.json()) if response.status_code == 200 else None
+
+
+def _unauthorized():
+    return JSONResponse({'error': 'Login required'}, status_code=401)
+
+
+# --- TAKVİM AKIŞLARI ---
+async def admin_feed(request):
+    """GET /api/appointments (bkz. admin_routes.get_appointments): 3 sorgu, thread tutmaz."""
+    tier = request.app.state.tier
+    async with tier.reader(request) as (session, clinic_id, data):
+        user = await tier.current_user(session, data, clinic_id)
+        if user is None: return _unauthorized()
+        if not user.is_admin: return JSONResponse({'error': 'Unauthorized'}, status_code=403)
+        start, end = parse_range(request.query_params)
+        stmt = (select(Appointment).where(_scope(Appointment, clinic_id))
+                .options(joinedload(Appointment.patient), selectinload(Appointment.resources)))
+        stmt = stmt.where(*overlap_criteria(start, end)) if start and end else stmt.where(Appointment.status != 'cancelled')
+        if request.query_params.get('resource', '').isdigit():
+            stmt = stmt.where(Appointment.resources.any(Resource.id == int(request.query_params['resource'])))
+        rows = [admin_feed_row(appt) for appt in await session.scalars(stmt)]
+    return tier.feed(request, rows, ADMIN_FEED)
+
+
+async def user_feed(request):
+    """GET /api/user/calendar (bkz. user_routes.get_calendar_events)."""
+    tier = request.app.state.tier
+    async with tier.reader(request) as (session, clinic_id, data):
+        user = await tier.current_user(session, data, clinic_id)
+        if user is None: return _unauthorized()
+        start, end = parse_range(request.query_params)
+        stmt = select(Appointment).where(_scope(Appointment, clinic_id))
+        stmt = stmt.where(*overlap_criteria(start, end)) if start and end else stmt.where(Appointment.status != 'cancelled')
+        if request.query_params.get('resource', '').isdigit():
+            stmt = stmt.where(Appointment.resources.any(Resource.id == int(request.query_params['resource'])))
+        rows = [user_feed_row(appt, user.id) for appt in await session.scalars(stmt)]
+    return tier.feed(request, rows, USER_FEED)
+
+
+# --- CLERK GİRİŞİ ---
+async def check_clerk(request):
+    """GET /auth/check-clerk (bkz. auth_routes.check_clerk_session). Clerk çağrısı beklenirken thread tutulmaz;
+    giriş Flask-Login'in okuduğu oturum çerezine yazılır.
+    """
+    tier = request.app.state.tier
+    login = RedirectResponse(tier.urls['auth.login'], status_code=302)
+    token = request.cookies.get('__session')
+    payload = decode_clerk_token(token) if token else None
+    if not payload or 'sub' not in payload:
+        return login
+
+    data = tier.load_session(request)
+    email = await tier.clerk_email(payload['sub'])
+    if not email:
+        data.setdefault('_flashes', []).append(('error', "Email alınamadı."))
+        return tier.save_session(login, data)
+
+    clinic_id, uri = await tier.clinic(request, authenticated='_user_id' in data)
+    target_role = clerk_role(email)
+    async with tier.sessionmaker(uri, False)() as session:
+        user = await session.scalar(select(User).where(User.username == email, _scope(User, clinic_id)))
+        if user is None:
+            user = User(username=email, email=email, full_name=email.split('@')[0], role=target_role,
+                        password_hash="clerk", clinic_id=clinic_id)
+            session.add(user)
+            await session.commit()
+        elif user.role != target_role:
+            user.role = target_role
+            await session.commit()
+
+    data.update(_user_id=user.get_id(), _fresh=True, rw_until=time.time() + tier.config.get('READ_YOUR_WRITES_SECONDS', 3))
+    target = tier.urls['admin.dashboard' if user.role == 'admin' else 'user.dashboard']
+    return tier.save_session(RedirectResponse(target, status_code=302), data)
+
+
+def create_asgi_app(flask_app=None):
+    """Asenkron yollar + geri kalanı için Flask (thread havuzunda). ASYNC_WSGI_THREADS: Flask thread sayısı."""
+    flask_app = flask_app or create_app()
+    tier = AsyncTier(flask_app)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        tier.http = httpx.AsyncClient(timeout=CLERK_TIMEOUT, limits=httpx.Limits(max_connections=CLERK_CONNECTIONS))
+        yield
+        await tier.http.aclose()
+        for engine in tier.engines.values():
+            await engine.dispose()
+
+    app = Starlette(routes=[
+        Route('/api/appointments', admin_feed, methods=['GET']),
+        Route('/api/user/calendar', user_feed, methods=['GET']),
+        Route('/auth/check-clerk', check_clerk, methods=['GET']),
+        Mount('/', app=WSGIMiddleware(flask_app, workers=flask_app.config.get('ASYNC_WSGI_THREADS', WSGI_THREADS))),
+    ], lifespan=lifespan)
+    app.state.tier = tier
+    return app
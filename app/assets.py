@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import hashlib
+import posixpath
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+import click
+from flask import request, url_for
+
+try:  # İsteğe bağlı: küçültme. Yoksa dosyalar olduğu gibi (yalnızca parmak izli) yazılır.
+    import rjsmin
+except ImportError:
+    rjsmin = None
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+# Birleştirilen dosyalar: mantıksal ad -> kaynaklar (static/ altına göre)
+BUNDLES = {
+    'bundle/calendar.js': ['js/event-feed.js'],
+    'bundle/member.css': ['css/calendar-member.css', 'css/mobile-calendar.css'],
+}
+# CDN'den alınan kütüphaneler: `flask assets vendor` static/vendor altına indirir.
+# İndirilmemişse şablonlar CDN adresini kullanır.
+VENDOR = {
+    'vendor/tailwind.js': 'https://cdn.tailwindcss.com',
+    'vendor/tailwind-plugins.js': 'https://cdn.tailwindcss.com?plugins=forms,container-queries',
+    'vendor/fullcalendar.js': 'https://cdn.jsdelivr.net/npm/fullcalendar@6.1.10/index.global.min.js',
+    'vendor/font-awesome/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    'vendor/fonts/manrope.css': 'https://fonts.googleapis.com/css2?family=Manrope:wght@200..800&display=swap',
+    'vendor/fonts/material-symbols.css': 'https://fonts.googleapis.com/css2?family=Material+Symbols+Outlined:wght,FILL@100..700,0..1&display=swap',
+}
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Google Fonts, tarayıcıya göre farklı CSS döner; woff2 için güncel bir tarayıcı gibi istenir
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+# --- DERLEME ---
+# Satır bazlı "yorum/boşluk temizliği" string ve regex içeriğini bozabildiği için yedek küçültücü yok
+def _minify_js(text):
+    return rjsmin.jsmin(text) if rjsmin else text
+
+
+def _minify_css(text):
+    return rcssmin.cssmin(text) if rcssmin else text
+
+
+def _fingerprinted(name, data):
+    root, ext = posixpath.splitext(name)
+    return posixpath.join(DIST, f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}")
+
+
+def _rewrite_css(text, source, output, manifest):
+    """Göreli url() referanslarını parmak izli dosyalara, çıktının konumuna göre yeniden yazar."""
+    def replace(match):
+        ref = match.group(2).strip()
+        if ref.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(source), urlsplit(ref).path))
+        if target not in manifest:
+            return match.group(0)
+        return f"url({posixpath.relpath(manifest[target], posixpath.dirname(output))})"
+    return CSS_URL.sub(replace, text)
+
+
+def _write(static, name, data):
+    path = os.path.join(static, name)
+    if os.path.exists(path):  # İçerik adresli: aynı ad aynı içerik
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _sources(static):
+    for root, dirs, files in os.walk(static):
+        rel = os.path.relpath(root, static).replace(os.sep, '/')
+        if rel == DIST or rel.startswith(DIST + '/'):
+            dirs[:] = []
+            continue
+        for f in files:
+            yield posixpath.normpath(posixpath.join(rel, f))
+
+
+def build(static, prune=False):
+    """static/ altındaki dosyaları ve BUNDLES'ı küçültüp parmak izli adlarla static/dist'e yazar.
+
+    Önce CSS dışı dosyalar (fontlar, resimler, JS), sonra url() referansları yeniden yazılan
+    CSS'ler, en son paketler işlenir. Dönüş: manifest {mantıksal ad: dist/... yolu}.
+    """
+    manifest = {}
+    names = sorted(_sources(static))
+    css = [n for n in names if n.endswith('.css')]
+    for name in [n for n in names if not n.endswith('.css')] + css:
+        with open(os.path.join(static, name), 'rb') as f:
+            data = f.read()
+        if name.endswith('.css'):
+            text = _minify_css(data.decode('utf-8')) if not name.endswith('.min.css') else data.decode('utf-8')
+            output = _fingerprinted(name, text.encode())
+            data = _rewrite_css(text, name, output, manifest).encode()
+        elif name.endswith('.js') and not name.startswith('vendor/'):
+            data = _minify_js(data.decode('utf-8')).encode()
+        manifest[name] = _fingerprinted(name, data)
+        _write(static, manifest[name], data)
+
+    for bundle, members in BUNDLES.items():
+        parts = []
+        for member in members:
+            with open(os.path.join(static, member), encoding='utf-8') as f:
+                text = f.read()
+            if bundle.endswith('.css'):
+                parts.append(_rewrite_css(_minify_css(text), member, posixpath.join(DIST, bundle), manifest))
+            else:
+                parts.append(_minify_js(text).rstrip().rstrip(';') + ';\n')
+        data = ''.join(parts).encode()
+        manifest[bundle] = _fingerprinted(bundle, data)
+        _write(static, manifest[bundle], data)
+
+    _write_manifest(static, manifest)
+    if prune:
+        keep = {os.path.normpath(os.path.join(static, p)) for p in manifest.values()}
+        for root, _, files in os.walk(os.path.join(static, DIST)):
+            for f in files:
+                path = os.path.normpath(os.path.join(root, f))
+                if f != MANIFEST and path not in keep:
+                    os.remove(path)
+    return manifest
+
+
+def _write_manifest(static, manifest):
+    path = os.path.join(static, DIST, MANIFEST)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_manifest(static):
+    try:
+        with open(os.path.join(static, DIST, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _stale(static, manifest):
+    """Kaynak dosyalardan biri manifest'ten yeniyse ya da paket eksikse True."""
+    if manifest is None or any(b not in manifest for b in BUNDLES):
+        return True
+    built = os.path.getmtime(os.path.join(static, DIST, MANIFEST))
+    return any(os.path.getmtime(os.path.join(static, n)) > built for n in _sources(static))
+
+
+# --- KÜTÜPHANELERİ YEREL KOPYALAMA ---
+def _fetch(url):
+    with urllib.request.urlopen(urllib.request.Request(url, headers={'User-Agent': USER_AGENT}), timeout=30) as res:
+        return res.read()
+
+
+def vendor(static):
+    """VENDOR listesini indirir; CSS'lerin url() ile çektiği font dosyalarını yanına alıp referansları yerelleştirir."""
+    for name, url in VENDOR.items():
+        path = os.path.join(static, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = _fetch(url)
+        if name.endswith('.css'):
+            def localize(match, base=url, folder=os.path.dirname(path)):
+                ref = match.group(2).strip()
+                if ref.startswith('data:'):
+                    return match.group(0)
+                local = posixpath.join('files', posixpath.basename(urlsplit(ref).path))
+                target = os.path.join(folder, local)
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with open(target, 'wb') as f:
+                        f.write(_fetch(urljoin(base, ref)))
+                return f"url({local})"
+            data = CSS_URL.sub(localize, data.decode('utf-8')).encode()
+        with open(path, 'wb') as f:
+            f.write(data)
+        yield name, len(data)
+
+
+# --- FLASK ---
+def init_assets(app):
+    """Parmak izli statik dosyalar.
+
+    `url_for('static', filename='js/x.js')` manifest'teki dist/js/x.<hash>.js adresine çözülür ve bu
+    dosyalar `Cache-Control: immutable` ile bir yıllık önbelleğe alınır; tekrar ziyarette istek gitmez.
+    static/dist yalnızca `flask assets build` ile yazılır (dağıtım adımı; kütüphaneler için bir kez
+    `flask assets vendor`). Derlenmemişse kaynak dosyalar parmak izsiz sunulur, paketler tek tek
+    yüklenir. ASSETS_AUTO_BUILD açıkça verilirse kaynak değiştikçe istek sırasında yeniden derlenir.
+    """
+    static = app.static_folder
+    state = {'manifest': load_manifest(static) or {}}
+    auto = app.config.get('ASSETS_AUTO_BUILD', False)
+    app.extensions['assets'] = state
+
+    def manifest():
+        if auto and _stale(static, state['manifest'] or None):
+            state['manifest'] = build(static)
+        return state['manifest']
+
+    @app.url_defaults
+    def _fingerprint(endpoint, values):
+        if endpoint == 'static':
+            values['filename'] = manifest().get(values.get('filename'), values.get('filename'))
+
+    def asset_url(name):
+        """Şablonlar için: yerel (parmak izli) dosya; kütüphane indirilmemişse CDN adresi."""
+        if name not in manifest() and name in VENDOR:
+            return VENDOR[name]
+        return url_for('static', filename=name)
+
+    def asset_urls(name):
+        """Paketler için adres listesi: derlenmişse tek dosya, değilse paketin kaynakları sırayla."""
+        if name in BUNDLES and name not in manifest():
+            return [url_for('static', filename=member) for member in BUNDLES[name]]
+        return [asset_url(name)]
+
+    app.jinja_env.globals.update(asset_url=asset_url, asset_urls=asset_urls)
+
+    @app.after_request
+    def _immutable(response):
+        if request.endpoint == 'static' and (request.view_args or {}).get('filename', '').startswith(DIST + '/'):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    @app.cli.group('assets')
+    def assets_cli():
+        """Statik dosya derleme."""
+
+    @assets_cli.command('build')
+    @click.option('--prune', is_flag=True, help='Manifest dışındaki eski dosyaları sil')
+    def build_assets(prune):
+        state['manifest'] = build(static, prune=prune)
+        for name, path in sorted(state['manifest'].items()):
+            click.echo(f"{name:<40} {path}")
+
+    @assets_cli.command('vendor')
+    def vendor_assets():
+        """CDN kütüphanelerini static/vendor altına indirir (ardından build çalıştırın)."""
+        for name, size in vendor(static):
+            click.echo(f"{name:<40} {size // 1024} KB")
+        state['manifest'] = build(static)
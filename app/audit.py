@@ -0,0 +1,387 @@
+import os
+import json
+import uuid
+import queue
+import atexit
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, request, current_app, has_app_context, has_request_context
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.engine import make_url
+from app.extensions import db, RoutingSession
+from app.models import AuditLog, Appointment, Treatment
+from app.tenancy import tenant_engine
+
+# Değişiklikleri kaydedilen modeller
+AUDITED = {Appointment: 'appointment', Treatment: 'treatment'}
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0  # saniye; yazıcı kuyruk boşken bu aralıkla uyanır
+PAGE_SIZE = 50
+_STOP = object()  # close(): kuyruğu bekleyen yazıcıyı uyandırır
+
+
+# --- YAKALAMA (session olayları) ---
+def _json(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ids(objects):
+    return sorted(inspect(o).identity[0] for o in objects if inspect(o).identity)
+
+
+def _snapshot(state):
+    """Nesnenin yüklü kolon değerleri (yeni sorgu çalıştırmaz)."""
+    data = {a.key: _json(state.dict[a.key]) for a in state.mapper.column_attrs if a.key in state.dict}
+    for rel in state.mapper.relationships:
+        if rel.secondary is not None and rel.key in state.dict:
+            data[rel.key] = _ids(state.dict[rel.key])
+    return data
+
+
+def _diff(state):
+    """Güncellenen alanlar: {alan: [eski, yeni]}; çoka-çok ilişkilerde eklenen / çıkarılan id'ler."""
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.added or history.deleted:
+            changes[attr.key] = [_json(history.deleted[0]) if history.deleted else None,
+                                 _json(history.added[0]) if history.added else None]
+    for rel in state.mapper.relationships:
+        if rel.secondary is None:
+            continue
+        history = state.attrs[rel.key].history
+        if history.added or history.deleted:
+            changes[rel.key] = {'added': _ids(history.added), 'removed': _ids(history.deleted)}
+    return changes
+
+
+def _actor():
+    """İstekteki kullanıcı; flush sırasında sorgu tetiklememek için sadece yüklü değerler okunur."""
+    user = g.get('_login_user') if has_request_context() else None  # Flask-Login'in istek önbelleği
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None, None
+    state = inspect(user)
+    return state.identity[0], state.dict.get('full_name') or state.dict.get('username')
+
+
+def _source():
+    return g.get('audit_source') or (request.endpoint if has_request_context() else None) or 'system'
+
+
+def _record(entity, entity_id, action, changes, clinic_id):
+    actor_id, actor_name = _actor()
+    return {
+        'event_id': uuid.uuid4().hex, 'clinic_id': clinic_id, 'entity': entity, 'entity_id': entity_id,
+        'action': action, 'actor_id': actor_id, 'actor_name': actor_name, 'source': _source(),
+        'changes': changes or None,
+        'created_at': datetime.utcnow().isoformat(),
+    }
+
+
+def _after_flush(session, flush_context):
+    if not has_app_context() or 'audit' not in current_app.extensions:
+        return
+    records = []
+    for action, objects in (('create', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            entity = AUDITED.get(type(obj))
+            if entity is None:
+                continue
+            state = inspect(obj)
+            changes = _snapshot(state) if action != 'update' else _diff(state)
+            if action == 'update' and not changes:
+                continue
+            # Kimlik anahtarı flush sonunda atanır; yeni nesnelerin id'si dict'te
+            records.append(_record(entity, state.dict.get('id'), action, changes,
+                                   state.dict.get('clinic_id', g.get('clinic_id'))))
+    if records:
+        session.info.setdefault('audit', []).extend(records)
+
+
+def _bulk_insert(state, entity):
+    """Toplu INSERT (ör. randevu serisi): satırlar RETURNING ile geri okunur, satır başına 'create' kaydı.
+
+    Kayıt dönen satırdan kurulur (id ve varsayılanlar dahil); tek çok-satırlı INSERT korunur.
+    """
+    action = state.execution_options.get('audit_action') or 'create'
+    if state.statement._returning:  # Çağıran kendi RETURNING'ini istemiş: satır başına kayıt kurulamaz
+        result = state.invoke_statement()
+        records = [_record(entity, None, action, {'rows': result.rowcount}, g.get('clinic_id'))]
+    else:
+        columns = state.bind_mapper.local_table.columns
+        frozen = state.invoke_statement(statement=state.statement.returning(*columns)).freeze()
+        result = frozen()
+        records = [_record(entity, row['id'], action, {k: _json(v) for k, v in row.items()}, row.get('clinic_id'))
+                   for row in frozen().mappings()]
+    state.session.info.setdefault('audit', []).extend(records)
+    return result
+
+
+def _bulk_statement(orm_execute_state):
+    """Toplu INSERT / UPDATE / DELETE (ör. seri oluşturma / iptali, no-show görevi): çalıştırır ve kaydeder."""
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete) or state.bind_mapper is None:
+        return None
+    entity = AUDITED.get(state.bind_mapper.class_)
+    if entity is None or not has_app_context() or 'audit' not in current_app.extensions:
+        return None
+    if state.is_insert:
+        return _bulk_insert(state, entity)
+    result = state.invoke_statement()
+    # audit_action: ör. arşive taşıma (app/archive.py) silme olarak görünmesin
+    action = state.execution_options.get('audit_action') or ('bulk_update' if state.is_update else 'bulk_delete')
+    clinic_id = g.get('clinic_id')
+    if isinstance(state.parameters, list):  # PK'ye göre toplu güncelleme: satır başına kayıt
+        records = [_record(entity, row.get('id'), 'update', {k: _json(v) for k, v in row.items() if k != 'id'}, clinic_id)
+                   for row in state.parameters]
+    else:
+        columns = {c.key for c in state.bind_mapper.column_attrs}
+        params = state.statement.compile().params
+        values = {k: _json(v) for k, v in params.items() if k in columns} if state.is_update else {}
+        records = [_record(entity, None, action, dict(values, rows=result.rowcount), clinic_id)] if result.rowcount else []
+    state.session.info.setdefault('audit', []).extend(records)
+    return result
+
+
+def _coalesce(records):
+    """Aynı transaction'daki ardışık flush'larda (autoflush) aynı nesnenin güncellemeleri tek kayıtta birleşir."""
+    out, updates = [], {}
+    for r in records:
+        key = (r['entity'], r['entity_id'])
+        if r['action'] != 'update' or r['entity_id'] is None:
+            updates.pop(key, None)
+            out.append(r)
+        elif key in updates:
+            merged = updates[key]['changes']
+            for field, change in r['changes'].items():
+                merged[field] = [merged[field][0], change[1]] if isinstance(change, list) and field in merged else change
+        else:
+            updates[key] = r
+            out.append(r)
+    return out
+
+
+def _after_commit(session):
+    records = session.info.pop('audit', None)
+    if records and has_app_context() and 'audit' in current_app.extensions:
+        current_app.extensions['audit'].submit(_coalesce(records))
+
+
+def _after_rollback(session):
+    session.info.pop('audit', None)
+
+
+@contextmanager
+def source(name):
+    """Blok içindeki değişiklikleri verilen kaynağa (ör. 'job:mark_no_shows') atfeder."""
+    previous = g.get('audit_source')
+    g.audit_source = name
+    try:
+        yield
+    finally:
+        g.audit_source = previous
+
+
+# --- YAZICI (arka plan, toplu) ---
+class AuditWriter:
+    """Commit edilen denetim kayıtlarını kuyruktan alıp toplu INSERT ile yazar.
+
+    İstek thread'i sadece kayıtları süreç günlüğüne (journal) ekler ve kuyruğa koyar.
+    Günlük, kuyruk tamamen yazıldığında silinir; süreç çökerse bir sonraki süreç
+    sahipsiz günlükleri devralıp yeniden yazar (event_id sayesinde çift kayıt oluşmaz).
+    Günlük işletim sistemine flush edilir, fsync yapılmaz: süreç çökmesine karşı korur,
+    elektrik kesintisine karşı değil.
+
+    threaded=False (tek bağlantılı bellek içi SQLite): thread açılmaz, kuyruk app context
+    kapanırken (yanıt gönderildikten sonra) aynı thread'de yazılır.
+    """
+    def __init__(self, app, journal_dir=None, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL, threaded=True):
+        self.app = app
+        self.threaded = threaded
+        self.journal_dir = journal_dir
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.stopped = threading.Event()
+        self.claimed = []
+        self.thread = None
+        self.pid = None
+
+    def _journal(self):
+        return os.path.join(self.journal_dir, f'audit-{os.getpid()}.jsonl') if self.journal_dir else None
+
+    def submit(self, records):
+        with self.lock:
+            self._start()
+            path = self._journal()
+            if path:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(r, ensure_ascii=False, default=str) + '\n' for r in records))
+            self.idle.clear()
+            for r in records:
+                self.queue.put(r)
+
+    def _start(self):
+        """Yazıcı thread'ini (fork sonrası da) başlatır; önce sahipsiz günlükleri devralır."""
+        if self.pid == os.getpid() and (self.thread and self.thread.is_alive() or not self.threaded):
+            return
+        self.pid = os.getpid()
+        self._recover()
+        if not self.threaded:
+            return
+        self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self.thread.start()
+
+    def _recover(self):
+        if not self.journal_dir:
+            return
+        os.makedirs(self.journal_dir, exist_ok=True)
+        own = f'audit-{os.getpid()}.'
+        for name in sorted(os.listdir(self.journal_dir)):
+            if not (name.startswith('audit-') and name.endswith('.jsonl')) or name.startswith(own):
+                continue
+            claimed = os.path.join(self.journal_dir, f'{own}{len(self.claimed)}.jsonl')
+            try:
+                os.rename(os.path.join(self.journal_dir, name), claimed)  # Aynı anda başlayan süreçlerden biri alır
+            except OSError:
+                continue
+            with open(claimed, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.queue.put(json.loads(line))
+                    except ValueError:
+                        pass  # Çökme anında yarım kalan son satır
+            self.claimed.append(claimed)
+            self.idle.clear()
+
+    def _run(self):
+        pending, stopping = [], False
+        while True:
+            if not pending:
+                if stopping:
+                    self._checkpoint()  # Son parti _STOP kuyruktayken yazıldıysa günlük silinmemişti
+                    return
+                try:
+                    item = self.queue.get(timeout=self.interval)
+                except queue.Empty:
+                    if self.stopped.is_set():
+                        return
+                    continue
+                if item is _STOP:
+                    stopping = True
+                    continue
+                pending.append(item)
+            while len(pending) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:  # Önündeki kayıtlar bu partiyle yazılır
+                    stopping = True
+                    break
+                pending.append(item)
+            try:
+                self.write(pending)
+            except Exception:
+                self.app.logger.exception("Denetim kaydı yazılamadı; tekrar denenecek")
+                if self.stopped.is_set():
+                    return  # Günlükte duruyor, sonraki süreç yazar
+                self.stopped.wait(self.interval)
+                continue
+            pending = []
+            self._checkpoint()
+
+    def write(self, records):
+        """Kayıtları klinik başına tek executemany INSERT ile yazar."""
+        by_clinic = {}
+        for r in records:
+            by_clinic.setdefault(r['clinic_id'], []).append(dict(
+                r, created_at=datetime.fromisoformat(r['created_at']),
+                changes=json.dumps(r['changes'], ensure_ascii=False, default=str) if r['changes'] else None))
+        stmt = insert(AuditLog.__table__).prefix_with('OR IGNORE', dialect='sqlite')
+        with self.app.app_context():
+            for clinic_id, rows in by_clinic.items():
+                engine = (tenant_engine(clinic_id) if clinic_id is not None else None) or db.engine
+                with engine.begin() as conn:
+                    conn.execute(stmt, rows)
+
+    def _checkpoint(self):
+        """Kuyruk boşaldıysa yazılmış günlükleri siler."""
+        with self.lock:
+            if not self.queue.empty():
+                return
+            for path in [self._journal()] + self.claimed:
+                try:
+                    if path:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.claimed = []
+            self.idle.set()
+
+    def flush(self, timeout=10):
+        """Kuyruktaki kayıtlar yazılana kadar bekler (testler, CLI); thread'siz modda hemen yazar."""
+        if self.threaded:
+            return self.idle.wait(timeout)
+        records = []
+        while not self.queue.empty():
+            records.append(self.queue.get_nowait())
+        if records:
+            self.write(records)
+            self._checkpoint()
+        return True
+
+    def close(self, timeout=5):
+        if not self.threaded:
+            self.flush()
+        self.stopped.set()
+        if self.thread and self.thread.is_alive():
+            self.queue.put(_STOP)  # Kuyruk boşsa FLUSH_INTERVAL beklenmez; doluysa önce kayıtlar yazılır
+            self.thread.join(timeout)
+
+
+# --- SORGU ---
+def history(entity=None, entity_id=None, actor_id=None, before=None, limit=PAGE_SIZE):
+    """Yeniden eskiye denetim kayıtları; `before` (son görülen id) ile sayfalanır.
+
+    Dönüş: (kayıtlar, sonraki sayfa için id ya da None). ix_audit_clinic_entity / _actor kullanır.
+    """
+    query = AuditLog.query
+    if entity:
+        query = query.filter(AuditLog.entity == entity)
+    if entity_id is not None:
+        query = query.filter(AuditLog.entity_id == entity_id)
+    if actor_id is not None:
+        query = query.filter(AuditLog.actor_id == actor_id)
+    if before:
+        query = query.filter(AuditLog.id < before)
+    rows = query.order_by(AuditLog.id.desc()).limit(limit + 1).all()
+    return rows[:limit], (rows[limit - 1].id if len(rows) > limit else None)
+
+
+def init_audit(app):
+    """Session olaylarını bağlar ve uygulamaya özel arka plan yazıcısını kurar.
+
+    Günlük dizini: AUDIT_JOURNAL_DIR (varsayılan instance/audit; testlerde kapalı).
+    Bellek içi SQLite tek bağlantıyı paylaştığından orada kayıtlar thread'siz yazılır (AUDIT_ASYNC).
+    """
+    journal_dir = app.config.get('AUDIT_JOURNAL_DIR',
+                                 None if app.config.get('TESTING') else os.path.join(app.instance_path, 'audit'))
+    in_memory = make_url(app.config['SQLALCHEMY_DATABASE_URI']).database in (None, '', ':memory:')
+    writer = AuditWriter(app, journal_dir, app.config.get('AUDIT_BATCH_SIZE', BATCH_SIZE),
+                         app.config.get('AUDIT_FLUSH_INTERVAL', FLUSH_INTERVAL),
+                         threaded=app.config.get('AUDIT_ASYNC', not in_memory))
+    app.extensions['audit'] = writer
+    atexit.register(writer.close)
+    if not writer.threaded:
+        @app.teardown_appcontext
+        def _write_audit(exc):
+            writer.flush()
+    for name, listener in (('after_flush', _after_flush), ('do_orm_execute', _bulk_statement),
+                           ('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
@@ -0,0 +1,372 @@
+import os
+import json
+import gzip
+import time
+import fcntl
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime
+import click
+from flask import current_app
+from sqlalchemy.engine import make_url
+from app.extensions import db
+from app.tenancy import clinics
+
+# Canlı veritabanının yedeği: SQLite online backup API. Dosya kopyalamak (cp) yazma sırasında yarım
+# sayfa / WAL'a düşmüş ama dosyaya geçmemiş değişiklikler yüzünden bozuk yedek verir.
+#
+# WAL modunda (app/replica.py açar) kaynak bağlantı yedek boyunca tek bir okuma transaction'ı tutar:
+# yedek o anın tutarlı görüntüsüdür ve yazarlar hiç beklemez (WAL okuyucusu yazarı engellemez).
+# Kopya sayfa gruplarıyla yapılır, arada kısa bir ara verilir: disk G/Ç'si isteklere de pay bırakır.
+# Rollback journal modunda her adım kısa bir paylaşımlı kilit alır; adımlar arasında başka bağlantı
+# yazarsa SQLite yedeği baştan başlatır (en fazla MAX_RESTARTS kez).
+
+# Adım başına kopyalanan sayfa (4 KB sayfada ~4 MB) ve adımlar arası bekleme (saniye)
+BACKUP_PAGES = 1024
+BACKUP_PAUSE = 0.005
+MAX_RESTARTS = 20
+# gzip seviyesi: 1, 6'ya göre ~6 kat hızlı, dosya ~%40 büyük (tek çekirdekte sıkıştırma asıl süreyi belirler)
+COMPRESS_LEVEL = 1
+# 'integrity' tam kontrol; çok büyük dosyalarda 'quick' (indeks/kayıt uyumu hariç) seçilebilir
+VERIFY = 'integrity'
+# Saklama: son N saatin, günün, haftanın her birinden en yeni yedek kalır
+RETENTION = {'hourly': 24, 'daily': 14, 'weekly': 8}
+CHUNK = 1024 * 1024
+SUFFIX = '.db.gz'
+
+
+class BackupError(RuntimeError):
+    """Yedek alınamadı / doğrulanamadı."""
+
+
+def _config(key, default):
+    return current_app.config.get(f'BACKUP_{key}', default)
+
+
+def backup_dir():
+    return _config('DIR', os.path.join(current_app.instance_path, 'backups'))
+
+
+def _sqlite_path(uri):
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or url.database.startswith('file:'):
+        return None
+    return url.database
+
+
+def databases():
+    """Yedeklenecek dosyalar: ad -> yol. Ortak veritabanı 'main'; ayrı dosyalı şubeler slug ile."""
+    found = {}
+    main = _sqlite_path(db.engine.url)
+    if main:
+        found['main'] = main
+    for slug, (_, uri) in clinics().items():
+        path = uri and _sqlite_path(uri)
+        if path:
+            found[slug] = path
+    return found
+
+
+# --- KOPYA ---
+class _Progress:
+    """backup() geri çağrısı: adımlar arası ara ve yeniden başlama sayımı."""
+
+    def __init__(self, pause, max_restarts):
+        self.pause, self.max_restarts = pause, max_restarts
+        self.steps = self.restarts = 0
+        self.remaining = None
+
+    def __call__(self, status, remaining, total):
+        self.steps += 1
+        if self.remaining is not None and remaining > self.remaining:
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise BackupError('Kaynak sürekli değiştiği için yedek tamamlanamadı (WAL modu önerilir).')
+        self.remaining = remaining
+        if self.pause and remaining:
+            time.sleep(self.pause)
+
+
+def copy_database(source, target, pages=None, pause=None):
+    """source -> target (yeni dosya) tutarlı kopya. Sayaçları döner."""
+    src = sqlite3.connect(f'file:{source}?mode=ro', uri=True, isolation_level=None)
+    dst = sqlite3.connect(target, isolation_level=None)
+    progress = _Progress(_config('PAUSE', BACKUP_PAUSE) if pause is None else pause, MAX_RESTARTS)
+    try:
+        wal = src.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        if wal:
+            # Okuma görüntüsünü sabitle: adımlar arasındaki yazmalar yedeği baştan başlatmaz
+            src.execute('BEGIN')
+            src.execute('SELECT count(*) FROM sqlite_master').fetchone()
+        src.backup(dst, pages=pages or _config('PAGES', BACKUP_PAGES), progress=progress)
+        if wal:
+            src.execute('COMMIT')
+        page_size, page_count = dst.execute('PRAGMA page_size').fetchone()[0], dst.execute('PRAGMA page_count').fetchone()[0]
+        # Kopya tek dosya olsun (kaynağın WAL modu hedefe geçer)
+        dst.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        src.close()
+        dst.close()
+    return {'wal': wal, 'steps': progress.steps, 'restarts': progress.restarts,
+            'page_size': page_size, 'pages': page_count}
+
+
+def verify_database(path, mode=None):
+    """PRAGMA integrity_check / quick_check; sorun varsa BackupError."""
+    pragma = 'quick_check' if (mode or _config('VERIFY', VERIFY)) == 'quick' else 'integrity_check'
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = [row[0] for row in conn.execute(f'PRAGMA {pragma}')]
+    finally:
+        conn.close()
+    if result != ['ok']:
+        raise BackupError(f'{os.path.basename(path)}: {pragma} başarısız: ' + '; '.join(result[:5]))
+    return pragma
+
+
+class _HashingWriter:
+    def __init__(self, fileobj):
+        self.fileobj, self.hash, self.size = fileobj, hashlib.sha256(), 0
+
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot(name, source, directory=None, now=None, label=None):
+    """Tek veritabanının yedeği: kopya -> bütünlük kontrolü -> gzip + sha256 -> yan dosya (.json).
+
+    Yarım kalan dosyalar '.' ile başlar ve listelenmez; son adımda yerine taşınır.
+    """
+    now = now or datetime.now()
+    directory = os.path.join(directory or backup_dir(), name)
+    os.makedirs(directory, exist_ok=True)
+    base = f"{name}-{now:%Y%m%d-%H%M%S}" + (f'-{label}' if label else '')
+    raw = os.path.join(directory, f'.{base}.db')
+    compress = _config('COMPRESS', True)
+    final = os.path.join(directory, base + (SUFFIX if compress else '.db'))
+    timings = {}
+    try:
+        started = time.perf_counter()
+        info = copy_database(source, raw)
+        timings['copy'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        info['verify'] = verify_database(raw)
+        timings['verify'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        partial = os.path.join(directory, f'.{os.path.basename(final)}')
+        if compress:
+            with open(partial, 'wb') as out, open(raw, 'rb') as src:
+                writer = _HashingWriter(out)
+                with gzip.GzipFile(fileobj=writer, mode='wb', compresslevel=_config('COMPRESSLEVEL', COMPRESS_LEVEL),
+                                   filename=base + '.db', mtime=int(now.timestamp())) as gz:
+                    shutil.copyfileobj(src, gz, CHUNK)
+            sha256, size = writer.hash.hexdigest(), writer.size
+            os.remove(raw)
+        else:
+            os.replace(raw, partial)
+            sha256, size = _sha256(partial), os.path.getsize(partial)
+        timings['compress'] = time.perf_counter() - started
+        os.replace(partial, final)
+    except BaseException:
+        for leftover in (raw, os.path.join(directory, f'.{os.path.basename(final)}')):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+
+    meta = dict(info, database=name, source=source, file=os.path.basename(final), created_at=now.isoformat(),
+                label=label, size=size, raw_size=info['pages'] * info['page_size'], sha256=sha256,
+                seconds={k: round(v, 3) for k, v in timings.items()})
+    with open(final + '.json', 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# --- LİSTE / SAKLAMA ---
+def snapshots(name, directory=None):
+    """Veritabanının yedekleri (yan dosyalarıyla), yeniden eskiye."""
+    directory = os.path.join(directory or backup_dir(), name)
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for entry in os.listdir(directory):
+        if entry.endswith('.json') and not entry.startswith('.'):
+            with open(os.path.join(directory, entry)) as f:
+                meta = json.load(f)
+            meta['path'] = os.path.join(directory, meta['file'])
+            found.append(meta)
+    return sorted(found, key=lambda m: m['created_at'], reverse=True)
+
+
+def _bucket(kind, created):
+    if kind == 'hourly':
+        return created.strftime('%Y%m%d%H')
+    if kind == 'daily':
+        return created.strftime('%Y%m%d')
+    return '%d-%02d' % created.isocalendar()[:2]
+
+
+def prune(name, directory=None, retention=None):
+    """Saklama kuralı dışındaki yedekleri siler; silinen sayısını döner. En yeni yedek hep kalır.
+
+    Her kural (saatlik / günlük / haftalık) kendi dilimindeki en yeni yedeği, en yeni N dilim için tutar.
+    """
+    retention = retention or _config('RETENTION', RETENTION)
+    # Etiketli yedekler (elle / geri yükleme öncesi alınanlar) kurala girmez, silinmez
+    items = [meta for meta in snapshots(name, directory) if not meta.get('label')]
+    keep = {items[0]['file']} if items else set()
+    for kind, count in retention.items():
+        seen = set()
+        for meta in items:
+            bucket = _bucket(kind, datetime.fromisoformat(meta['created_at']))
+            if bucket not in seen and len(seen) < count:
+                seen.add(bucket)
+                keep.add(meta['file'])
+    removed = 0
+    for meta in items:
+        if meta['file'] not in keep:
+            os.remove(meta['path'])
+            os.remove(meta['path'] + '.json')
+            removed += 1
+    return removed
+
+
+def backup_all(directory=None):
+    """Tüm veritabanlarının yedeği + saklama. Aynı dizinde başka bir süreç yedek alıyorsa atlanır."""
+    directory = directory or backup_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        taken = 0
+        for name, path in databases().items():
+            snapshot(name, path, directory)
+            prune(name, directory)
+            taken += 1
+        return taken
+
+
+# --- DOĞRULAMA / GERİ YÜKLEME ---
+def _meta_for(path):
+    sidecar = path + '.json'
+    if not os.path.exists(sidecar):
+        return None
+    with open(sidecar) as f:
+        return json.load(f)
+
+
+def extract(path, target):
+    """Yedeği target'a açar; sha256 (yan dosya varsa) ve bütünlük kontrolü yapılır."""
+    meta = _meta_for(path)
+    if meta and _sha256(path) != meta['sha256']:
+        raise BackupError(f'{os.path.basename(path)}: sha256 uyuşmuyor, dosya bozulmuş.')
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as src, open(target, 'wb') as out:
+        shutil.copyfileobj(src, out, CHUNK)
+    verify_database(target)
+    return meta
+
+
+def restore(path, name, directory=None, safety=True):
+    """Yedeği çalışan veritabanına geri yükler.
+
+    Dosya değiştirilmez (açık bağlantılar ve WAL dosyası bozulurdu); açılan yedek backup API ile
+    hedefe tek adımda yazılır. Diğer bağlantılar geri yükleme bitene kadar bekler, sonra yeni içeriği
+    görür. safety açıksa önce mevcut hâlin 'pre-restore' etiketli yedeği alınır.
+    """
+    target = databases().get(name)
+    if target is None:
+        raise BackupError(f'Bilinmeyen veritabanı: {name}')
+    before = snapshot(name, target, directory, label='pre-restore') if safety else None
+    temp = os.path.join(os.path.dirname(os.path.abspath(target)), f'.restore-{os.getpid()}.db')
+    try:
+        extract(path, temp)
+        src = sqlite3.connect(f'file:{temp}?mode=ro', uri=True)
+        dst = sqlite3.connect(target, timeout=30)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+    return before
+
+
+def init_backup(app):
+    """`flask backup ...` komutları. Düzenli yedek `backup_databases` görevi ile alınır (app/jobs.py)."""
+
+    @app.cli.group('backup')
+    def backup_cli():
+        """Canlı veritabanı yedekleri (SQLite online backup)."""
+
+    def _names(database):
+        known = databases()
+        if database and database not in known:
+            raise click.BadParameter(f"Bilinmeyen veritabanı: {database} ({', '.join(known) or '-'})", param_hint='--database')
+        return [database] if database else list(known)
+
+    @backup_cli.command('run')
+    @click.option('--database', default=None, help="Yalnızca bu veritabanı ('main' ya da şube slug'ı)")
+    @click.option('--label', default=None, help='Etiket (etiketli yedekler otomatik silinmez)')
+    def run_cmd(database, label):
+        for name in _names(database):
+            meta = snapshot(name, databases()[name], label=label)
+            s = meta['seconds']
+            click.echo(f"{meta['file']}: {meta['raw_size'] / 1e6:.1f} MB -> {meta['size'] / 1e6:.1f} MB, "
+                       f"kopya {s['copy']}s ({meta['steps']} adım, {meta['restarts']} yeniden başlama), "
+                       f"{meta['verify']} {s['verify']}s, sıkıştırma {s['compress']}s")
+            if not label:
+                prune(name)
+
+    @backup_cli.command('list')
+    @click.option('--database', default=None)
+    def list_cmd(database):
+        for name in _names(database):
+            for meta in snapshots(name):
+                click.echo(f"{meta['created_at'][:19]}  {meta['size'] / 1e6:>9.1f} MB  {meta['path']}")
+
+    @backup_cli.command('verify')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    def verify_cmd(path):
+        temp = os.path.join(os.path.dirname(os.path.abspath(path)), f'.verify-{os.getpid()}.db')
+        try:
+            extract(path, temp)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        click.echo(f'{path}: sağlam')
+
+    @backup_cli.command('prune')
+    @click.option('--database', default=None)
+    def prune_cmd(database):
+        click.echo(f"{sum(prune(name) for name in _names(database))} yedek silindi")
+
+    @backup_cli.command('restore')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--database', default='main', help="Hedef ('main' ya da şube slug'ı)")
+    @click.option('--no-safety', is_flag=True, help='Önce mevcut hâlin yedeğini alma')
+    @click.confirmation_option(prompt='Mevcut veriler yedektekilerle değiştirilecek. Devam edilsin mi?')
+    def restore_cmd(path, database, no_safety):
+        before = restore(path, _names(database)[0], safety=not no_safety)
+        if before:
+            click.echo(f"Önceki hâl: {before['file']}")
+        click.echo(f'{database} geri yüklendi: {os.path.basename(path)}')
@@ -0,0 +1,191 @@
+from datetime import datetime
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload, selectinload
+from app.extensions import db
+from app.models import Appointment, appointment_resource
+from app.catalog import get_procedure, block_length, UnknownProcedure
+from app.resources import active_resources, MAX_APPOINTMENT
+from app.outbox import cancel_reminders, enqueue_many
+from app.waitlist import promote
+from app.concurrency import CONFLICT_MESSAGE
+
+# Tek istekte en fazla işlem (bir hekimin bir günü rahatça sığar)
+MAX_OPERATIONS = 100
+ACTIONS = ('move', 'edit', 'cancel')
+# Düzenlenebilir alanlar (bkz. admin_routes.update_appointment)
+FIELDS = ('title', 'guest_name', 'guest_phone', 'notes')
+
+
+class BatchError(ValueError):
+    """Toplu işlem geçersiz; errors: [{'index', 'id', 'message'}]. Hiçbir şey yazılmaz.
+
+    status 409: istemcinin gördüğü sürüm eski (hatalarda `current` güncel kayıttır).
+    """
+
+    def __init__(self, errors, status=400):
+        super().__init__(errors[0]['message'] if errors else 'Geçersiz işlem.')
+        self.errors = errors
+        self.status = status
+
+
+def _shares(a, b):
+    """İki randevu aynı kaynağı kullanıyor mu? Kaynaksız randevu tüm kaynakları tutar."""
+    return not a or not b or bool(a & b)
+
+
+def parse_operations(payload):
+    """JSON gövdesini [{'id', 'action', 'start', 'resources', alanlar...}] listesine çevirir."""
+    operations = (payload or {}).get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise BatchError([{'index': None, 'id': None, 'message': 'İşlem listesi boş.'}])
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError([{'index': None, 'id': None, 'message': f'En fazla {MAX_OPERATIONS} işlem gönderilebilir.'}])
+    errors, parsed, seen = [], [], set()
+    for index, op in enumerate(operations):
+        fail = lambda message: errors.append({'index': index, 'id': op.get('id') if isinstance(op, dict) else None, 'message': message})
+        if not isinstance(op, dict) or not isinstance(op.get('id'), int):
+            fail('Randevu id eksik.')
+            continue
+        if op.get('action') not in ACTIONS:
+            fail(f"Bilinmeyen işlem: {op.get('action')}")
+            continue
+        if op['id'] in seen:
+            fail('Aynı randevu birden fazla işlemde.')
+            continue
+        seen.add(op['id'])
+        start = None
+        if op.get('start'):
+            try:
+                start = datetime.fromisoformat(op['start'])
+            except (TypeError, ValueError):
+                fail('Geçersiz başlangıç zamanı.')
+                continue
+        elif op['action'] == 'move':
+            fail('Taşıma için başlangıç zamanı gerekli.')
+            continue
+        resources = op.get('resources') or {}
+        if not isinstance(resources, dict) or not all(isinstance(v, int) for v in resources.values()):
+            fail('Geçersiz kaynak.')
+            continue
+        parsed.append({'index': index, 'id': op['id'], 'action': op['action'], 'start': start, 'resources': resources,
+                       'version': op.get('version'), 'fields': {k: op[k] for k in FIELDS if op.get(k)}})
+    if errors:
+        raise BatchError(errors)
+    return parsed
+
+
+def _existing(intervals, exclude_ids):
+    """Aralıklarla çakışan, partide olmayan aktif randevular: [(id, başlangıç, bitiş, {kaynak id})]. Tek sorgu."""
+    lo = min(s for s, _ in intervals)
+    hi = max(e for _, e in intervals)
+    rows = (
+        db.session.query(Appointment.id, Appointment.start_time, Appointment.end_time, appointment_resource.c.resource_id)
+        .outerjoin(appointment_resource, appointment_resource.c.appointment_id == Appointment.id)
+        .filter(Appointment.status != 'cancelled', Appointment.start_time < hi, Appointment.start_time > lo - MAX_APPOINTMENT,
+                Appointment.end_time > lo, Appointment.id.notin_(exclude_ids),
+                or_(*[and_(Appointment.start_time < e, Appointment.end_time > s) for s, e in intervals]))
+    )
+    found = {}
+    for appt_id, s, e, resource_id in rows:
+        entry = found.setdefault(appt_id, (appt_id, s, e, set()))
+        if resource_id is not None:
+            entry[3].add(resource_id)
+    return list(found.values())
+
+
+def apply_batch(operations):
+    """Taşıma / düzenleme / iptal işlemlerini birlikte doğrular ve tek transaction'da uygular.
+
+    Çakışma kontrolü hem veritabanındaki diğer randevulara hem de partideki randevuların yeni
+    konumlarına karşı yapılır (partide iptal edilen ya da taşınan randevunun eski yeri boş sayılır).
+    Bir işlem bile geçersizse BatchError; hiçbir şey yazılmaz. Commit çağıranda.
+
+    Okumalar ve yan etkiler işlem sayısından bağımsız: randevular + kaynaklar, çakışma SELECT'i,
+    hatırlatmalar için bir UPDATE + bir INSERT ve boşalan aralıklar için bekleme listesi. Randevu
+    UPDATE'leri satır başınadır: sürüm kontrolü (WHERE version = ?) her satırın etkilendiğini doğrular.
+    """
+    ids = [op['id'] for op in operations]
+    appts = {a.id: a for a in Appointment.query.options(joinedload(Appointment.patient), selectinload(Appointment.resources))
+             .filter(Appointment.id.in_(ids))}
+    by_id = {r.id: r for r in active_resources()}
+
+    # Takvimdeki kopya eskiyse (başkası arada düzenledi) hiçbir şey yapılmaz
+    stale = [{'index': op['index'], 'id': op['id'], 'message': CONFLICT_MESSAGE, 'current': appts[op['id']].to_dict()}
+             for op in operations if op['id'] in appts and op['version'] is not None and op['version'] != appts[op['id']].version]
+    if stale:
+        raise BatchError(stale, status=409)
+
+    errors, plans = [], []
+    for op in operations:
+        fail = lambda message: errors.append({'index': op['index'], 'id': op['id'], 'message': message})
+        appt = appts.get(op['id'])
+        if appt is None:
+            fail('Randevu bulunamadı.')
+            continue
+        if appt.status == 'cancelled':
+            fail('Randevu zaten iptal edilmiş.')
+            continue
+        if op['action'] == 'cancel':
+            plans.append((op, appt, None, None, None))
+            continue
+        title = op['fields'].get('title', appt.title)
+        try:
+            length = block_length(get_procedure(title))
+        except UnknownProcedure as e:
+            if title != appt.title:
+                fail(str(e))
+                continue
+            length = appt.end_time - appt.start_time  # Katalogdan kaldırılmış eski işlem: mevcut süre korunur
+        resources = list(appt.resources)
+        for kind, resource_id in op['resources'].items():
+            resource = by_id.get(resource_id)
+            if resource is None or resource.kind != kind:
+                fail(f'Geçersiz kaynak: {kind}')
+                break
+            resources = [r for r in resources if r.kind != kind] + [resource]
+        else:
+            start = op['start'] or appt.start_time
+            plans.append((op, appt, start, start + length, resources))
+
+    # Partinin son hâli: iptal edilmeyen her randevunun aralığı ve kaynakları
+    final = {appt.id: (start, end, {r.id for r in resources}) for _, appt, start, end, resources in plans if start}
+    moved = [(op, appt) for op, appt, start, end, _ in plans
+             if start and ((start, end) != (appt.start_time, appt.end_time) or op['resources'])]
+    if moved and not errors:
+        shares = (lambda a, b: True) if not by_id else _shares  # Kaynak tanımlı değilse her çakışma sayılır
+        existing = _existing([final[appt.id][:2] for _, appt in moved], ids)
+        for op, appt in moved:
+            s, e, mine = final[appt.id]
+            clash = next((other_id for other_id, os_, oe, theirs in existing if os_ < e and oe > s and shares(mine, theirs)), None)
+            if clash:
+                errors.append({'index': op['index'], 'id': appt.id,
+                               'message': f"{s.strftime('%d.%m.%Y %H:%M')} saatinde başka randevu var (#{clash})."})
+                continue
+            clash = next((other_id for other_id, (os_, oe, theirs) in final.items()
+                          if other_id != appt.id and os_ < e and oe > s and shares(mine, theirs)), None)
+            if clash:
+                errors.append({'index': op['index'], 'id': appt.id, 'message': f'Seçilen randevulardan #{clash} ile çakışıyor.'})
+    if errors:
+        raise BatchError(sorted(errors, key=lambda err: err['index']))
+
+    freed = {}  # kaynak id'leri -> (kaynaklar, boşalan aralıklar)
+    for op, appt, start, end, resources in plans:
+        if appt.status in ('confirmed', 'held') and (start is None or (start, end) != (appt.start_time, appt.end_time)
+                                                    or set(resources) != set(appt.resources)):
+            key = tuple(sorted(r.id for r in appt.resources))
+            freed.setdefault(key, (list(appt.resources), []))[1].append((appt.start_time, appt.end_time))
+        if start is None:
+            appt.status = 'cancelled'
+            continue
+        for field, value in op['fields'].items():
+            setattr(appt, field, value)
+        appt.start_time, appt.end_time = start, end
+        if op['resources']:
+            appt.resources = resources
+
+    # Saat / kişi bilgisi değişmiş olabilir: bekleyen hatırlatmalar yeniden kurulur
+    cancel_reminders(ids)
+    enqueue_many([appt for _, appt, start, *_ in plans if start])
+    for resources, intervals in freed.values():
+        promote(intervals, resources=resources)  # Boşalan saatler bekleme listesine açılır
+    return len(plans)
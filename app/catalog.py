@@ -0,0 +1,148 @@
+import time
+import click
+from datetime import timedelta
+from flask import g, current_app, request
+from sqlalchemy import update, insert
+from app.extensions import db
+from app.models import Procedure, CacheVersion
+from app.resources import MAX_APPOINTMENT_MINUTES
+
+# Boş kataloğa bir kez yazılan varsayılan işlemler (`flask procedures seed`, kurulum, ilk yönetici kaydı)
+DEFAULT_PROCEDURES = [
+    {'name': 'Muayene', 'icon': '🔍', 'duration': 30},
+    {'name': 'Diş Taşı Temizliği', 'icon': '✨', 'duration': 30},
+    {'name': 'Diş Çekimi', 'icon': '🦷', 'duration': 30},
+    {'name': 'Dolgu', 'icon': '⚒️', 'duration': 45},
+    {'name': 'Kanal Tedavisi', 'icon': '⚡', 'duration': 60},
+    {'name': 'İmplant', 'icon': '⚙️', 'duration': 90},
+]
+# Sürüm damgası en fazla bu sıklıkta kontrol edilir (saniye)
+CHECK_INTERVAL = 5.0
+
+
+
+class UnknownProcedure(ValueError):
+    """Katalogda olmayan işlem adı."""
+
+
+def _key(clinic_id):
+    return f"procedures:{clinic_id or 0}"
+
+
+def _load():
+    rows = Procedure.query.order_by(Procedure.sort_order, Procedure.name).all()
+    return {p.name: p.to_dict() for p in rows}
+
+
+def _cache():
+    """Süreç içi önbellek: klinik -> {'version', 'checked', 'procedures': {isim: dict}}"""
+    return current_app.extensions['catalog']
+
+
+def refresh(force=False):
+    """Önbelleği gerekirse yeniler: CHECK_INTERVAL'de bir sürüm damgasına bakar, değiştiyse yeniden yükler."""
+    clinic_id = g.get('clinic_id')
+    entry = _cache().get(clinic_id)
+    now = time.monotonic()
+    interval = current_app.config.get('PROCEDURE_CACHE_CHECK', CHECK_INTERVAL)
+    if entry and not force and now - entry['checked'] < interval:
+        return entry
+    version = db.session.query(CacheVersion.version).filter_by(key=_key(clinic_id)).scalar() or 0
+    if entry is None or force or entry['version'] != version:
+        entry = {'version': version, 'procedures': _load()}
+    entry['checked'] = now
+    _cache()[clinic_id] = entry
+    return entry
+
+
+def bump_version():
+    """Katalog değiştiğinde çağrılır (commit çağıranda); diğer worker'lar bir sonraki kontrolde yeniler."""
+    key = _key(g.get('clinic_id'))
+    updated = db.session.execute(
+        update(CacheVersion).where(CacheVersion.key == key).values(version=CacheVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.session.add(CacheVersion(key=key, version=1))
+    _cache().pop(g.get('clinic_id'), None)
+
+
+def seed_defaults():
+    """Kliniğin kataloğu boşsa varsayılan işlemleri tabloya yazar (commit çağıranda). Eklenen sayı.
+
+    Varsayılanlar yalnızca bu yolla, bir kez, gerçek satır olarak girer; yönetici sonradan
+    düzenleyip silebilir ve liste bir daha kendiliğinden geri gelmez.
+    """
+    if Procedure.query.first():
+        return 0
+    db.session.execute(insert(Procedure), [dict(p, sort_order=i) for i, p in enumerate(DEFAULT_PROCEDURES)])
+    bump_version()
+    return len(DEFAULT_PROCEDURES)
+
+
+def _procedures():
+    entry = _cache().get(g.get('clinic_id'))
+    return (entry or refresh())['procedures']
+
+
+def procedures(include_inactive=False):
+    """Sıralı işlem listesi (bellekten)."""
+    return [p for p in _procedures().values() if include_inactive or p['active']]
+
+
+def get_procedure(name):
+    """İşlemi bellekten döndürür; katalogda yoksa ya da pasifse UnknownProcedure."""
+    procedure = _procedures().get(name)
+    if not procedure or not procedure['active']:
+        raise UnknownProcedure(f"Bilinmeyen işlem: {name}")
+    return procedure
+
+
+def block_minutes(procedure):
+    """Randevunun takvimde kapladığı dakika: işlem + hazırlık (buffer)."""
+    return procedure['duration'] + procedure['buffer_minutes']
+
+
+def block_length(procedure):
+    return timedelta(minutes=block_minutes(procedure))
+
+
+def validate_procedure(item):
+    """Kaydedilecek işlem (ValueError). Takvimde kapladığı süre en fazla MAX_APPOINTMENT olabilir."""
+    if not item.name or item.duration <= 0 or item.buffer_minutes < 0:
+        raise ValueError('İsim ve süre zorunlu, süreler pozitif olmalı.')
+    if item.duration + item.buffer_minutes > MAX_APPOINTMENT_MINUTES:
+        raise ValueError(f'Süre hazırlıkla birlikte en fazla {MAX_APPOINTMENT_MINUTES} dakika olabilir.')
+
+
+def init_catalog(app):
+    """İstekten önce önbelleği tazeler, şablonlara `procedures` verir.
+
+    Sürüm damgası kontrolü route'un sorgu bütçesine dahildir (sayaç ilk before_request'te başlar).
+    """
+    app.extensions['catalog'] = {}
+
+    @app.before_request
+    def _refresh_catalog():
+        if request.endpoint != 'static':
+            refresh()
+
+    @app.context_processor
+    def _inject_procedures():
+        return {'procedures': procedures()}
+
+    @app.cli.group('procedures')
+    def procedures_cli():
+        """İşlem kataloğu."""
+
+    @procedures_cli.command('list')
+    def list_procedures():
+        for p in procedures(include_inactive=True):
+            click.echo(f"{p['name']:<24} {p['duration']:>3} dk +{p['buffer_minutes']} dk  {p['price']:.2f} TL  "
+                       f"{','.join(p['required_resources'])}{'' if p['active'] else '  (pasif)'}")
+
+    @procedures_cli.command('seed')
+    def seed_procedures():
+        """Katalog boşsa varsayılan işlemleri yazar."""
+        added = seed_defaults()
+        db.session.commit()
+        click.echo(f"{added} işlem eklendi." if added else "Katalog zaten dolu.")
@@ -0,0 +1,40 @@
+from flask import jsonify
+from sqlalchemy.orm.exc import StaleDataError
+from app.extensions import db
+
+CONFLICT_MESSAGE = 'Bu kayıt siz düzenlerken başka biri tarafından değiştirildi.'
+
+# Not: Sürüm kontrolü ek sorgu gerektirmez. İstemci, akışta gelen `version`'ı formla geri gönderir;
+# okunan satırla karşılaştırılır, asıl garanti de flush'taki "UPDATE ... WHERE id = ? AND version = ?"
+# (mapper version_id_col). Arada başka bir yazma olduysa UPDATE 0 satır etkiler -> StaleDataError.
+
+
+class VersionConflict(Exception):
+    """İstemcinin gördüğü sürüm güncel değil."""
+
+    def __init__(self, obj):
+        super().__init__(CONFLICT_MESSAGE)
+        self.obj = obj
+
+
+def check_version(obj, submitted):
+    """Formdaki / JSON'daki sürümü karşılaştırır. Gönderilmemişse (eski istemci) kontrol yapılmaz."""
+    if submitted in (None, ''):
+        return
+    try:
+        submitted = int(submitted)
+    except (TypeError, ValueError):
+        raise VersionConflict(obj)
+    if submitted != obj.version:
+        raise VersionConflict(obj)
+
+
+def conflict_response(model, obj_id, serialize):
+    """409 + kaydın güncel hâli (`current`; silinmişse None). İstemci formu yenileyip tekrar gönderebilir."""
+    db.session.rollback()
+    current = db.session.get(model, obj_id, populate_existing=True)
+    return jsonify({'status': 'conflict', 'message': CONFLICT_MESSAGE,
+                    'current': serialize(current) if current else None}), 409
+
+
+CONFLICTS = (VersionConflict, StaleDataError)
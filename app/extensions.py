@@ -1,5 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """Sorguyu doğru engine'e yönlendirir: kliniğe özel veritabanı dosyası (app/tenancy.py),
+    okuma isteklerinde salt-okunur bağlantı (app/replica.py).
+    """
+    router = None
+    reader = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engine = RoutingSession.router(mapper, clause) if RoutingSession.router is not None else None
+        engine = engine or super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if RoutingSession.reader is not None:
+            return RoutingSession.reader(self, engine, clause) or engine
+        return engine
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import gzip
+import json
+from datetime import datetime, date
+from flask import request, current_app
+
+# Kompakt takvim akışı: sütun bazlı JSON (bkz. app/static/js/event-feed.js)
+#   {"v": 1, "base": "2026-10-19", "fields": [["id", "raw"], ["start", "time"], ...],
+#    "dicts": {"procedure": ["Dolgu", ...]}, "columns": [[1, 2, ...], [540, 600, ...], ...]}
+# raw : değer olduğu gibi
+# dict: tekrar eden değerler (işlem adı, renk, kaynaklar) "dicts" tablosunda; sütunda sıra numarası
+# time: base gününün gece yarısından itibaren dakika (yerel duvar saati)
+COMPACT_TYPE = 'application/vnd.klinik.events+json'
+# FullCalendar'ın tanıdığı alanlar; gerisi extendedProps'a girer
+TOP_LEVEL = ('id', 'title', 'start', 'end', 'color', 'display')
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def parse_range(args=None):
+    """FullCalendar'ın ?start=...&end=... parametreleri (saat dilimi atılır, yerel saat). Yoksa (None, None)."""
+    args = request.args if args is None else args
+    try:
+        return tuple(datetime.fromisoformat(args[k]).replace(tzinfo=None) for k in ('start', 'end'))
+    except (KeyError, ValueError):
+        return None, None
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def encode_verbose(rows):
+    """FullCalendar'ın doğrudan okuduğu olay listesi (önceki biçim)."""
+    events = []
+    for row in rows:
+        event = {k: _iso(row[k]) for k in TOP_LEVEL if k in row}
+        event['extendedProps'] = {k: _iso(v) for k, v in row.items() if k not in TOP_LEVEL}
+        events.append(event)
+    return events
+
+
+def encode_compact(rows, schema):
+    """Satırları sütun bazlı yapıya çevirir. schema: {alan: 'raw' | 'dict' | 'time'} (sıralı)."""
+    times = [row[k] for row in rows for k, kind in schema.items() if kind == 'time']
+    base = min(times).date() if times else date.today()
+    origin = datetime.combine(base, datetime.min.time())
+    dicts, columns = {}, []
+    for field, kind in schema.items():
+        values = [row.get(field) for row in rows]
+        if kind == 'time':
+            values = [int((v - origin).total_seconds() // 60) for v in values]
+        elif kind == 'dict':
+            table, index = [], {}
+            for i, v in enumerate(values):
+                key = json.dumps(v, sort_keys=True)
+                if key not in index:
+                    index[key] = len(table)
+                    table.append(v)
+                values[i] = index[key]
+            dicts[field] = table
+        columns.append(values)
+    return {'v': 1, 'base': base.isoformat(), 'fields': [[f, k] for f, k in schema.items()],
+            'dicts': dicts, 'columns': columns}
+
+
+def build_feed(rows, schema, accept, accept_encodings):
+    """(gövde, mimetype, Content-Encoding ya da None). accept / accept_encodings: werkzeug Accept nesneleri.
+
+    Flask route'ları ve ASGI katmanı (app/asgi.py) aynı müzakereyi kullanır.
+    """
+    compact = accept.best_match(['application/json', COMPACT_TYPE]) == COMPACT_TYPE
+    payload = encode_compact(rows, schema) if compact else encode_verbose(rows)
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+    mimetype = COMPACT_TYPE if compact else 'application/json'
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in accept_encodings:
+        return gzip.compress(body, GZIP_LEVEL), mimetype, 'gzip'
+    return body, mimetype, None
+
+
+def feed_response(rows, schema):
+    """Accept başlığına göre kompakt ya da klasik olay listesi döner; istemci destekliyorsa gzip'ler."""
+    body, mimetype, encoding = build_feed(rows, schema, request.accept_mimetypes, request.accept_encodings)
+    response = current_app.response_class(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
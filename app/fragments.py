@@ -0,0 +1,143 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+from flask import g, current_app
+from jinja2 import nodes, FileSystemBytecodeCache
+from jinja2.ext import Extension
+from markupsafe import Markup
+from werkzeug.local import LocalProxy
+
+# Bellekte tutulan en fazla parça (LRU)
+FRAGMENT_CACHE_SIZE = 512
+# Model -> (tablo adı, kolon değerleri itemgetter'ı)
+_COLUMNS = {}
+
+
+class _Uncacheable(Exception):
+    """Bağımlılıklardan biri sürüm damgası çıkarılamayacak durumda (ör. süresi dolmuş kolon)."""
+
+
+def _columns(mapper):
+    """Model başına (tablo adı, kolon değerlerini sırayla alan itemgetter); ilk kullanımda hesaplanır."""
+    entry = _COLUMNS.get(mapper)
+    if entry is None:
+        entry = _COLUMNS[mapper] = (mapper.local_table.name, itemgetter(*mapper.column_attrs.keys()))
+    return entry
+
+
+def _version(value):
+    """Bağımlılığın sürümü (hashlenebilir/repr'lenebilir yapı); veritabanına gitmez.
+
+    Model nesnesi: tablo ve yüklü kolon değerleri (satır değişince değişir). Liste / demet:
+    elemanların sürümleri. Sözlük: sıralı anahtar-değer. Diğerleri: değerin kendisi.
+    """
+    if isinstance(value, LocalProxy):  # current_user
+        value = value._get_current_object()
+    state = getattr(value, '_sa_instance_state', None)
+    if state is not None:
+        table, getter = _columns(state.mapper)
+        try:
+            return table, getter(state.dict)
+        except KeyError:  # Süresi dolmuş / ertelenmiş kolon: okumak sorgu demek
+            raise _Uncacheable(table)
+    if isinstance(value, (list, tuple)):
+        return [_version(item) for item in value]
+    if isinstance(value, dict):
+        return sorted(value.items(), key=lambda kv: str(kv[0]))
+    return value
+
+
+def fragment_key(name, deps):
+    """Parça anahtarı: klinik + parça adı + bağımlılıkların sürümü (blake2b)."""
+    stamp = repr((g.get('clinic_id'), name, [_version(dep) for dep in deps]))
+    return hashlib.blake2b(stamp.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+class FragmentCache:
+    """Süreç içi LRU parça önbelleği. Anahtar verinin kendisinden türediği için silme gerekmez;
+    satır değişince yeni anahtar oluşur, eski parça kullanılmadıkça sıradan düşer.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            html = self.entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def set(self, key, html):
+        with self.lock:
+            self.entries[key] = html
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class FragmentCacheExtension(Extension):
+    """`{% cache 'ad', bağımlılık1, bağımlılık2 %} ... {% endcache %}`
+
+    Blok çıktısı bağımlılıkların damgasıyla saklanır; aynı veriyle tekrar çizilmez.
+    Blok içinde kullanılan her model nesnesi / ilişki bağımlılık olarak verilmelidir.
+    CSRF token gibi isteğe özel değerler parçaya konmamalıdır.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render', [nodes.Const(parser.name), args[0], nodes.List(args[1:])])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, template, name, deps, caller):
+        cache = current_app.extensions.get('fragments')
+        if cache is None:
+            return caller()
+        try:
+            key = fragment_key(f"{template}:{name}", deps)
+        except _Uncacheable:
+            return caller()
+        html = cache.get(key)
+        if html is None:
+            html = Markup(caller())
+            cache.set(key, html)
+        return html
+
+
+def init_fragments(app):
+    """Jinja bytecode önbelleği ve `{% cache %}` parça önbelleği.
+
+    TEMPLATE_CACHE_DIR: derlenmiş şablonların diske yazıldığı dizin (varsayılan instance/jinja;
+    testlerde kapalı). Yeniden başlatmada şablonlar ayrıştırılıp derlenmez, doğrudan yüklenir.
+    FRAGMENT_CACHE: parça önbelleği (varsayılan DEBUG dışında açık; DEBUG'da şablon değişiklikleri
+    anında görünsün diye kapalı). FRAGMENT_CACHE_SIZE: bellekteki en fazla parça.
+    """
+    cache_dir = app.config.get('TEMPLATE_CACHE_DIR',
+                               None if app.config.get('TESTING') else os.path.join(app.instance_path, 'jinja'))
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config.get('FRAGMENT_CACHE', not app.debug):
+        app.extensions['fragments'] = FragmentCache(app.config.get('FRAGMENT_CACHE_SIZE', FRAGMENT_CACHE_SIZE))
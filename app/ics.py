@@ -0,0 +1,183 @@
+import hashlib
+import secrets
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from flask import g, request, current_app, stream_with_context, Response
+from sqlalchemy import select, func
+from app.extensions import db
+from app.models import Appointment, User
+from app.fragments import FragmentCache
+
+# Takvim uygulamalarının (Google, Apple) abone olduğu .ics akışları.
+# Hasta: kendi randevuları. Yönetici: kliniğin tüm randevuları (personel akışı, akıtılarak üretilir).
+#
+# Uygulamalar akışı sık sorar; her istekte tek toplama sorgusu (adet, id toplamı, sürüm toplamı) ETag'i
+# verir. İstemci aynı ETag'le geldiyse 304 döner, gövde üretilmez. Gövde süreç içinde o damgayla
+# saklanır; randevulardan biri eklenince / düzenlenince (sürüm artar) / silinince yeniden üretilir.
+
+# Bu kadar gün önce biten randevular akışa girmez (takvimde zaten kalır)
+FEED_PAST_DAYS = 90
+FEED_CACHE_SIZE = 256
+# Personel akışı bu kadar satırlık parçalarla okunup yazılır
+STREAM_BATCH = 500
+# Randevu saatleri yerel duvar saati olarak saklanır; akışta UTC'ye çevrilir
+DEFAULT_TIMEZONE = 'Europe/Istanbul'
+# Uygulamalara önerilen yenileme aralığı
+REFRESH_INTERVAL = 'PT1H'
+MIMETYPE = 'text/calendar'
+
+STATUS = {'cancelled': 'CANCELLED', 'held': 'TENTATIVE'}  # diğerleri CONFIRMED
+
+_FEEDS = FragmentCache(FEED_CACHE_SIZE)
+
+
+# --- ABONELİK ANAHTARI ---
+def ensure_token(user):
+    """Kullanıcının akış anahtarı; yoksa oluşturur (commit çağıranda)."""
+    if not user.calendar_token:
+        user.calendar_token = secrets.token_urlsafe(32)
+    return user.calendar_token
+
+
+def rotate_token(user):
+    """Eski adresi geçersiz kılar (ör. telefon kaybolduğunda)."""
+    user.calendar_token = secrets.token_urlsafe(32)
+    return user.calendar_token
+
+
+def user_for_token(token):
+    return User.query.filter_by(calendar_token=token).first() if token else None
+
+
+# --- İCALENDAR BİÇİMİ ---
+def _escape(text):
+    return (str(text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """RFC 5545: satırlar 75 sekizliği geçmez; devam satırı boşlukla başlar (UTF-8 karakter bölünmez)."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line + '\r\n'
+    parts, current, limit = [], b'', 75
+    for char in line:
+        encoded = char.encode()
+        if len(current) + len(encoded) > limit:
+            parts.append(current.decode())
+            current, limit = b'', 74
+        current += encoded
+    parts.append(current.decode())
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value, zone):
+    return value.replace(tzinfo=zone).astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _header(name):
+    return ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Dis Klinigi//Randevu Takvimi//TR', 'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH', f'X-WR-CALNAME:{_escape(name)}', f'REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}',
+        f'X-PUBLISHED-TTL:{REFRESH_INTERVAL}'))
+
+
+def _event(row, staff, zone, stamp, domain):
+    appt_id, title, start, end, status, version, guest_name, patient_name = row
+    summary = f"{title} · {guest_name or patient_name or 'Misafir'}" if staff else f'Diş Kliniği: {title}'
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:randevu-{g.get('clinic_id') or 0}-{appt_id}@{domain}",
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{_utc(start, zone)}',
+        f'DTEND:{_utc(end, zone)}',
+        f'SEQUENCE:{max((version or 1) - 1, 0)}',  # Her düzenlemede artar; uygulama eski kopyayı günceller
+        f'STATUS:{STATUS.get(status, "CONFIRMED")}',
+        f'SUMMARY:{_escape(summary)}',
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+# --- SORGULAR ---
+def _cutoff():
+    # Gün hassasiyetinde: damga gün içinde kaymaz
+    return datetime.combine(date.today() - timedelta(days=FEED_PAST_DAYS), datetime.min.time())
+
+
+def _filters(user_id):
+    criteria = [Appointment.end_time >= _cutoff()]
+    if user_id is not None:
+        criteria.append(Appointment.user_id == user_id)
+    return criteria
+
+
+def feed_stamp(user_id):
+    """Akışın sürüm damgası (tek sorgu). user_id None ise tüm klinik."""
+    stamp = db.session.execute(
+        select(func.count(), func.sum(Appointment.id), func.sum(Appointment.version)).where(*_filters(user_id))).one()
+    return tuple(stamp)
+
+
+def _rows(user_id):
+    query = (select(Appointment.id, Appointment.title, Appointment.start_time, Appointment.end_time,
+                    Appointment.status, Appointment.version, Appointment.guest_name, User.full_name)
+             .outerjoin(User, User.id == Appointment.user_id)
+             .where(*_filters(user_id), Appointment.end_time > Appointment.start_time)
+             .order_by(Appointment.start_time)
+             .execution_options(yield_per=STREAM_BATCH))
+    return db.session.execute(query)
+
+
+def generate(user_id, name):
+    """.ics gövdesini parça parça üretir (personel akışında binlerce randevu olabilir)."""
+    zone = ZoneInfo(current_app.config.get('CLINIC_TIMEZONE', DEFAULT_TIMEZONE))
+    domain = current_app.config.get('CALENDAR_UID_DOMAIN', 'dis-klinigi')
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    staff = user_id is None
+    yield _header(name)
+    for rows in _rows(user_id).partitions():
+        yield ''.join(_event(row, staff, zone, stamp, domain) for row in rows)
+    yield 'END:VCALENDAR\r\n'
+
+
+# --- YANIT ---
+def calendar_response(user):
+    """Koşullu .ics yanıtı: ETag / Last-Modified; değişmemişse 304, önbellekte varsa saklanan gövde."""
+    scope = None if user.is_admin else user.id
+    name = 'Klinik Randevuları' if scope is None else 'Diş Kliniği Randevularım'
+    stamp = feed_stamp(scope)
+    key = (g.get('clinic_id'), scope, _cutoff(), stamp)
+    etag = hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+    cached = _FEEDS.get(key)
+
+    if cached is not None:
+        body, generated_at = cached
+        response = Response(body, mimetype=MIMETYPE)
+    elif request.headers.get('If-None-Match') and etag in request.if_none_match:
+        # Başka bir worker üretmiş, istemcide aynısı var: gövde üretmeye gerek yok
+        response, generated_at = Response(status=304), None
+    elif scope is None:
+        # Personel akışı: satırlar okundukça gönderilir, bitince önbelleğe konur
+        generated_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+        def stream():
+            chunks = []
+            for chunk in generate(scope, name):
+                chunks.append(chunk)
+                yield chunk
+            _FEEDS.set(key, (''.join(chunks).encode(), generated_at))
+        response = Response(stream_with_context(stream()), mimetype=MIMETYPE)
+    else:
+        body = ''.join(generate(scope, name)).encode()
+        generated_at = datetime.now(timezone.utc).replace(microsecond=0)
+        _FEEDS.set(key, (body, generated_at))
+        response = Response(body, mimetype=MIMETYPE)
+
+    response.set_etag(etag)
+    if generated_at:
+        response.last_modified = generated_at
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # Her seferinde doğrulansın (304 ucuz)
+    response.headers['Content-Disposition'] = 'inline; filename="randevular.ics"'
+    return response.make_conditional(request)
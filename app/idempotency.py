@@ -0,0 +1,80 @@
+import json
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import g, request, jsonify
+from flask_login import current_user
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+# Çevrimdışı kuyruk bu süreden eski istekleri yeniden göndermez; anahtarlar da bu süre saklanır
+KEY_TTL = timedelta(hours=48)
+MAX_KEY_LENGTH = 64
+
+# Akış: anahtar önce "talep edilir" (boş sonuçlu satır, flush), view aynı transaction'da sonucu
+# `remember` ile yazar ve commit eder. İstek başarısız olursa (commit yok) talep de geri alınır ve
+# aynı anahtarla tekrar denenebilir. Aynı anda gelen iki kopyadan ikincisi benzersizlik kısıtına
+# takılır ve ilkinin sonucunu alır; randevu iki kez oluşmaz.
+
+
+def _replay(row):
+    if row is None or row.status_code is None:
+        return jsonify({'status': 'error', 'message': 'Aynı istek hâlâ işleniyor.'}), 409
+    if row.endpoint != request.endpoint:
+        return jsonify({'status': 'error', 'message': 'Bu istek anahtarı başka bir işlem için kullanılmış.'}), 422
+    response = jsonify(json.loads(row.response))
+    response.status_code = row.status_code
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _lookup(key):
+    return IdempotencyKey.query.filter_by(user_id=current_user.id, key=key).first()
+
+
+def idempotent(view):
+    """`Idempotency-Key` başlıklı tekrarlar saklanan yanıtı alır. Başlık yoksa view olduğu gibi çalışır.
+
+    View, başarılı sonucu commit'ten önce `remember(payload)` ile kaydetmelidir.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER, '').strip()
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'status': 'error', 'message': 'Geçersiz istek anahtarı.'}), 400
+        row = _lookup(key)
+        if row is not None:
+            return _replay(row)
+        claim = IdempotencyKey(user_id=current_user.id, key=key, endpoint=request.endpoint)
+        db.session.add(claim)
+        try:
+            db.session.flush()
+        except IntegrityError:  # Eşzamanlı kopya önce davrandı
+            db.session.rollback()
+            return _replay(_lookup(key))
+        g.idempotency_claim = claim
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def remember(payload, status_code=200):
+    """Yanıtı talep edilen anahtara yazar (view'ın transaction'ında). Anahtarsız istekte bir şey yapmaz."""
+    claim = g.pop('idempotency_claim', None)
+    if claim is not None:
+        claim.status_code = status_code
+        claim.response = json.dumps(payload, ensure_ascii=False)
+    return payload
+
+
+def purge_keys(now=None):
+    """Süresi dolan anahtarları siler (tek DELETE)."""
+    cutoff = (now or datetime.utcnow()) - KEY_TTL
+    deleted = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return deleted
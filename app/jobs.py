@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update, exists, func
+from app.extensions import db
+from app.models import Appointment, Treatment
+from app.scheduler import job
+from app.utils import close_past_sessions_logic
+from app.outbox import drain
+from app.waitlist import expire_offers
+from app.archive import archive_old_rows
+from app.idempotency import purge_keys
+from app.backup import backup_all
+
+# Bitişinden bu kadar sonra hâlâ tedavi kaydı yoksa randevu 'no_show' sayılır
+NO_SHOW_GRACE = timedelta(hours=2)
+
+
+def mark_no_shows(now=None):
+    """Kayıtlı hastanın o gün için tedavi kaydı yoksa randevuyu 'no_show' olarak işaretler (tek UPDATE).
+
+    Ayrı görev değildir: aynı koşuldaki randevuları `close_past_appointments` de kapattığından
+    sonuç görev sırasına bağlı kalmasın diye onun içinde, kapatmadan önce çalışır.
+    """
+    now = now or datetime.now()
+    treated = exists().where(
+        Treatment.user_id == Appointment.user_id,
+        func.date(Treatment.date) == func.date(Appointment.start_time),
+    )
+    return db.session.execute(
+        update(Appointment)
+        .where(
+            Appointment.status == 'confirmed',
+            Appointment.user_id.isnot(None),
+            Appointment.end_time < now - NO_SHOW_GRACE,
+            ~treated,
+        )
+        .values(status='no_show', version=Appointment.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+@job('close_past_appointments', every=15 * 60,
+     description="Bitmiş randevuları kapatır: tedavi kaydı yoksa 'no_show', varsa 'completed'")
+def close_past_appointments(now=None):
+    """Önce gelmeyenleri işaretler, kalan süresi dolmuş onaylı randevuları kapatır (tek işlem, iki UPDATE)."""
+    now = now or datetime.now()
+    marked = mark_no_shows(now)
+    closed = db.session.execute(
+        update(Appointment)
+        .where(Appointment.status == 'confirmed', Appointment.end_time < now - NO_SHOW_GRACE)
+        .values(status='completed', version=Appointment.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return marked + closed
+
+
+@job('close_past_sessions', every=5 * 60, description='Geçmiş grup seanslarını kapatır, katılım ve kredileri işler', per_tenant=False)
+def close_past_sessions():
+    return close_past_sessions_logic()
+
+
+@job('deliver_reminders', every=60, description='Zamanı gelen SMS/e-posta hatırlatmalarını gönderir')
+def deliver_reminders():
+    # Ayrı worker (flask outbox worker) çalışıyorsa bu görev boş kuyrukla hızlıca döner
+    return drain()
+
+
+@job('expire_waitlist_offers', every=60, description='Onaylanmayan bekleme listesi tekliflerini sıradaki hastaya aktarır')
+def expire_waitlist_offers():
+    return expire_offers()
+
+
+@job('archive_history', every=24 * 3600, description='Ufuktan eski randevu ve tedavileri arşiv tablolarına taşır')
+def archive_history():
+    return archive_old_rows()
+
+
+@job('purge_idempotency_keys', every=24 * 3600, description='Süresi dolan istek anahtarlarını (Idempotency-Key) siler')
+def purge_idempotency_keys():
+    return purge_keys()
+
+
+@job('backup_databases', every=3600, description='Veritabanlarının canlı yedeğini alır, saklama süresi dolanları siler', per_tenant=False)
+def backup_databases():
+    return backup_all()
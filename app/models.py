@@ -1,27 +1,128 @@
 from app.extensions import db
+from flask import g, has_app_context
 from flask_login import UserMixin
+from sqlalchemy.orm import declared_attr, validates
+from app.phones import normalize_phone
 from datetime import datetime
+import json
+
+# --- KLİNİKLER (ÇOKLU ŞUBE) ---
+def current_clinic_id():
+    """İsteğin / görevin ait olduğu klinik (app/tenancy.py belirler). Tenancy kapalıysa None."""
+    return g.get('clinic_id') if has_app_context() else None
+
+class Clinic(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(50), unique=True, nullable=False) # Alt alan adı / X-Clinic başlığı
+    name = db.Column(db.String(150))
+    database_uri = db.Column(db.String(300)) # Doluysa şubenin verisi ayrı SQLite dosyasında
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TenantScoped:
+    """Kliniğe ait tablolar. Sorgular app/tenancy.py tarafından otomatik olarak filtrelenir."""
+    @declared_attr
+    def clinic_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('clinic.id'), default=current_clinic_id)
+
+class User(TenantScoped, UserMixin, db.Model):
+    # Kullanıcı adı şube içinde benzersiz
+    __table_args__ = (
+        db.UniqueConstraint('clinic_id', 'username', name='uq_user_clinic_username'),
+        # Tek şubede clinic_id boş: NULL'lar birbirinden farklı sayıldığından yukarıdaki kısıt yetmez
+        db.Index('uq_user_username_single', 'username', unique=True,
+                 sqlite_where=db.text('clinic_id IS NULL'), postgresql_where=db.text('clinic_id IS NULL')),
+        db.Index('ix_user_clinic_role', 'clinic_id', 'role'),
+        db.Index('ix_user_clinic_phone', 'clinic_id', 'phone_normalized', 'role'), # Hasta araması (rol de eşitlikte: rol indeksi seçilmesin)
+    )
 
-class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(150), unique=True, nullable=False)
+    username = db.Column(db.String(150), nullable=False)
     password_hash = db.Column(db.String(256))
     full_name = db.Column(db.String(150))
     email = db.Column(db.String(150))
     phone = db.Column(db.String(20))
+    phone_normalized = db.Column(db.String(20)) # '+905321234567' (bkz. app/phones.py); hasta araması bundan
     role = db.Column(db.String(20), default='patient') # 'admin' veya 'patient'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    calendar_token = db.Column(db.String(64), unique=True) # .ics abonelik adresi (bkz. app/ics.py)
     
     # İlişkiler
     appointments = db.relationship('Appointment', backref='patient', lazy=True)
     treatments = db.relationship('Treatment', backref='patient', lazy=True)
 
+    def get_id(self):
+        # Şubelerin ayrı dosyaları id'leri 1'den sayar: oturum anahtarı kliniği de taşır (bkz. app/tenancy.py)
+        return str(self.id) if self.clinic_id is None else f"{self.clinic_id}:{self.id}"
+
+    @validates('phone')
+    def _normalize_phone(self, key, value):
+        self.phone_normalized = normalize_phone(value)
+        return value
+
     # --- EKLENEN KISIM ---
     @property
     def is_admin(self):
         return self.role == 'admin'
 
-class Appointment(db.Model):
+# Randevu <-> kaynak (hekim, koltuk, oda) eşlemesi
+appointment_resource = db.Table(
+    'appointment_resource',
+    db.Column('appointment_id', db.Integer, db.ForeignKey('appointment.id'), primary_key=True),
+    db.Column('resource_id', db.Integer, db.ForeignKey('resource.id'), primary_key=True),
+    # Kaynak bazlı çakışma sorgusu resource_id üzerinden gelir
+    db.Index('ix_appointment_resource_resource', 'resource_id', 'appointment_id'),
+)
+
+class Resource(TenantScoped, db.Model):
+    """Randevunun ihtiyaç duyduğu kaynak: hekim, koltuk veya oda."""
+    __table_args__ = (db.Index('ix_resource_clinic_kind', 'clinic_id', 'kind'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(20), nullable=False) # dentist, chair, room
+    active = db.Column(db.Boolean, default=True)
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'kind': self.kind, 'active': self.active}
+
+class Procedure(TenantScoped, db.Model):
+    """İşlem kataloğu. Randevu kodu bunu app/catalog.py önbelleği üzerinden okur."""
+    __table_args__ = (db.UniqueConstraint('clinic_id', 'name', name='uq_procedure_clinic_name'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    icon = db.Column(db.String(10))
+    duration = db.Column(db.Integer, nullable=False, default=30)  # dakika
+    buffer_minutes = db.Column(db.Integer, default=0)              # Sonrasında koltuk hazırlığı
+    price = db.Column(db.Float, default=0.0)
+    required_resources = db.Column(db.String(100), default='dentist,chair') # Virgülle ayrılmış kaynak türleri
+    active = db.Column(db.Boolean, default=True)
+    sort_order = db.Column(db.Integer, default=0)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'name': self.name, 'icon': self.icon or '', 'duration': self.duration,
+            'buffer_minutes': self.buffer_minutes or 0, 'price': self.price or 0.0,
+            'required_resources': tuple(k for k in (self.required_resources or '').split(',') if k),
+            'active': self.active, 'sort_order': self.sort_order or 0,
+        }
+
+class CacheVersion(db.Model):
+    """Süreç içi önbelleklerin sürüm damgası; değişince tüm worker'lar kendi kopyasını yeniler."""
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Appointment(TenantScoped, db.Model):
+    # Zaman aralığı çakışma sorguları: klinik + start_time aralık taraması
+    __table_args__ = (
+        db.Index('ix_appointment_clinic_start', 'clinic_id', 'start_time', 'end_time', 'status'),
+        db.Index('ix_appointment_clinic_user_start', 'clinic_id', 'user_id', 'start_time'), # Hastanın randevuları, tarih sıralı
+        db.Index('ix_appointment_clinic_end', 'clinic_id', 'end_time'),                     # .ics akışı, arşivleme
+        db.Index('ix_appointment_clinic_status_end', 'clinic_id', 'status', 'end_time'),    # Geçmiş randevu kapatma görevleri
+        {'sqlite_autoincrement': True}, # Arşive taşınan id'ler yeniden verilmesin (bkz. app/archive.py)
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True) # Kayıtlı hasta ise ID
     
@@ -36,6 +137,17 @@ class Appointment(db.Model):
     notes = db.Column(db.Text)
     status = db.Column(db.String(20), default='confirmed')
 
+    # Tekrarlayan Seri (ör. ortodonti kontrolleri)
+    series_id = db.Column(db.String(36), index=True) # Aynı serideki randevular
+    recurrence = db.Column(db.String(100))           # 'FREQ=WEEKLY;INTERVAL=1;COUNT=8'
+
+    resources = db.relationship('Resource', secondary=appointment_resource, lazy=True)
+
+    # İyimser eşzamanlılık: UPDATE / DELETE "WHERE version = <okunan>" ile yapılır ve sürüm artar;
+    # arada başkası kaydetmişse StaleDataError (bkz. app/concurrency.py). Toplu UPDATE'ler de artırır.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
+
     def to_dict(self):
         """Takvim için veri formatı"""
         display_title = self.guest_name if self.guest_name else (self.patient.full_name if self.patient else "Dolu")
@@ -45,18 +157,27 @@ class Appointment(db.Model):
             'title': display_title, 
             'start': self.start_time.isoformat(),
             'end': self.end_time.isoformat(),
-            'color': '#dc3545' if self.status == 'cancelled' else '#4f46e5',
+            'color': '#dc3545' if self.status == 'cancelled' else '#f59e0b' if self.status == 'held' else '#4f46e5',
             'extendedProps': {
                 'procedure': self.title,
                 'guest_name': self.guest_name or (self.patient.full_name if self.patient else ""),
                 'guest_phone': self.guest_phone or (self.patient.phone if self.patient else ""),
                 'notes': self.notes or "",
-                'user_id': self.user_id 
+                'user_id': self.user_id,
+                'series_id': self.series_id,
+                'resources': {r.kind: r.id for r in self.resources},
+                'version': self.version
             }
         }
 
-class Treatment(db.Model):
+class Treatment(TenantScoped, db.Model):
     """Hasta Tedavi Geçmişi Tablosu"""
+    __table_args__ = (
+        db.Index('ix_treatment_clinic_user_date', 'clinic_id', 'user_id', 'date'),
+        db.Index('ix_treatment_clinic_date', 'clinic_id', 'date'), # Panel ciro özeti, arşivleme
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
@@ -65,4 +186,215 @@ class Treatment(db.Model):
     cost = db.Column(db.Float, default=0.0)    # Ücret
     payment_received = db.Column(db.Float, default=0.0) # Alınan Ödeme
     notes = db.Column(db.Text)                 # Doktor notları
-    date = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1') # bkz. Appointment.version
+    __mapper_args__ = {'version_id_col': version}
+
+# --- GRUP SEANSLARI (app/utils.py ve takvim modülleri bu modelleri kullanır) ---
+class Member(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    full_name = db.Column(db.String(150), nullable=False)
+    credits = db.Column(db.Integer, default=0) # Kalan seans hakkı
+
+    @staticmethod
+    def canonical(name):
+        """İsimdeki fazla boşlukları temizler, kelimeleri büyük harfle başlatır."""
+        return ' '.join(w.capitalize() for w in (name or '').split())
+
+class Session(db.Model):
+    # Haftalık takvim sorguları (date, time) aralığı üzerinden çalışır
+    __table_args__ = (db.Index('ix_session_date_time', 'date', 'time'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    time = db.Column(db.Time, nullable=False)
+    capacity = db.Column(db.Integer, default=4)
+    spots_left = db.Column(db.Integer, default=4)
+    notes = db.Column(db.Text)
+    completed = db.Column(db.Boolean, default=False)
+    is_recurring = db.Column(db.Boolean, default=False)
+    recur_group_id = db.Column(db.String(36))
+
+    reservations = db.relationship('Reservation', backref='session', lazy=True)
+
+    @property
+    def is_past(self):
+        return datetime.combine(self.date, self.time) < datetime.now()
+
+class Reservation(db.Model):
+    # "Bu seansa katıldım mı?" EXISTS sorgusu için
+    __table_args__ = (db.Index('ix_reservation_session_user', 'session_id', 'user_name', 'status'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('session.id'), nullable=False)
+    user_name = db.Column(db.String(150), nullable=False)
+    status = db.Column(db.String(20), default='active') # active, canceled, moved, attended, no_show
+    cancel_status = db.Column(db.String(20))
+    cancel_reason = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# --- ZAMANLANMIŞ GÖREVLER ---
+class JobLock(db.Model):
+    """Aynı görevin birden fazla worker'da aynı anda çalışmasını engeller."""
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(200))
+    locked_until = db.Column(db.DateTime)
+
+class JobRun(db.Model):
+    """Görev çalıştırma geçmişi (admin ekranında gösterilir)."""
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), index=True)
+    worker = db.Column(db.String(200))
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+    status = db.Column(db.String(20), default='running') # running, success, error
+    rows_affected = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+
+
+# --- BİLDİRİM KUYRUĞU (Transactional Outbox) ---
+class OutboxMessage(TenantScoped, db.Model):
+    """Randevuyla aynı transaction'da yazılır, ayrı bir worker tarafından gönderilir."""
+    __table_args__ = (db.Index('ix_outbox_clinic_status_next', 'clinic_id', 'status', 'next_attempt_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'), index=True)
+    kind = db.Column(db.String(30))       # reminder_24h, reminder_2h
+    channel = db.Column(db.String(10))    # sms, email
+    recipient = db.Column(db.String(150))
+    subject = db.Column(db.String(200))
+    body = db.Column(db.Text)
+    status = db.Column(db.String(20), default='pending') # pending, sending, sent, failed, cancelled
+    due_at = db.Column(db.DateTime)
+    next_attempt_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0)
+    claimed_by = db.Column(db.String(200))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+
+# --- BEKLEME LİSTESİ ---
+class WaitlistEntry(TenantScoped, db.Model):
+    """Dolu bir zaman aralığı için sırada bekleyen hasta.
+
+    Randevu [earliest, latest] penceresine sığmalı. Slot boşalınca en uygun kayda
+    'held' durumunda geçici randevu açılır ve teklif gönderilir.
+    """
+    # Eşleştirme sorgusu: status = 'waiting' AND earliest <= slot AND latest > slot
+    __table_args__ = (db.Index('ix_waitlist_match', 'clinic_id', 'status', 'earliest', 'latest'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    name = db.Column(db.String(150))
+    phone = db.Column(db.String(20))
+    procedure = db.Column(db.String(100))
+    duration = db.Column(db.Integer, default=30) # dakika
+    earliest = db.Column(db.DateTime, nullable=False)
+    latest = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), default='waiting') # waiting, offered, booked, declined, expired, cancelled
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id')) # Teklif edilen (held) randevu
+    offer_expires_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'name': self.name, 'phone': self.phone, 'procedure': self.procedure,
+            'duration': self.duration, 'earliest': self.earliest.isoformat(), 'latest': self.latest.isoformat(),
+            'status': self.status, 'appointment_id': self.appointment_id,
+            'offer_expires_at': self.offer_expires_at.isoformat() if self.offer_expires_at else None,
+        }
+
+
+# --- DENETİM KAYDI (AUDIT LOG) ---
+class AuditLog(TenantScoped, db.Model):
+    """Randevu / tedavi değişikliklerinin salt-eklemeli kaydı (app/audit.py arka planda toplu yazar).
+
+    Kayıtlar silinen kullanıcı ve randevulardan sonra da kalsın diye yabancı anahtar yok.
+    """
+    __table_args__ = (
+        db.Index('ix_audit_clinic_entity', 'clinic_id', 'entity', 'entity_id', 'id'),
+        db.Index('ix_audit_clinic_actor', 'clinic_id', 'actor_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(32), unique=True, nullable=False) # Günlükten tekrar yazımda çift kaydı önler
+    entity = db.Column(db.String(30), nullable=False) # appointment, treatment
+    entity_id = db.Column(db.Integer)                 # Toplu güncellemelerde boş
+    action = db.Column(db.String(20), nullable=False) # create, update, delete, bulk_update, bulk_delete, archive
+    actor_id = db.Column(db.Integer)
+    actor_name = db.Column(db.String(150))
+    source = db.Column(db.String(100))                # Endpoint ya da görev adı
+    changes = db.Column(db.Text)                      # JSON: update için {alan: [eski, yeni]}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'entity': self.entity, 'entity_id': self.entity_id, 'action': self.action,
+            'actor_id': self.actor_id, 'actor_name': self.actor_name, 'source': self.source,
+            'changes': json.loads(self.changes) if self.changes else None,
+            'created_at': self.created_at.isoformat(),
+        }
+
+
+# --- ARŞİV (ESKİ RANDEVU VE TEDAVİLER) ---
+class AppointmentArchive(TenantScoped, db.Model):
+    """Ufuk süresinden eski randevular (app/archive.py taşır). Kolonlar Appointment ile aynı, id korunur."""
+    __table_args__ = (
+        db.Index('ix_appointment_archive_clinic_user', 'clinic_id', 'user_id', 'start_time'),
+        db.Index('ix_appointment_archive_clinic_start', 'clinic_id', 'start_time'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    title = db.Column(db.String(100))
+    start_time = db.Column(db.DateTime)
+    end_time = db.Column(db.DateTime)
+    guest_name = db.Column(db.String(100))
+    guest_phone = db.Column(db.String(20))
+    notes = db.Column(db.Text)
+    status = db.Column(db.String(20))
+    series_id = db.Column(db.String(36))
+    recurrence = db.Column(db.String(100))
+    version = db.Column(db.Integer)
+    resource_ids = db.Column(db.String(200)) # appointment_resource satırları: '3,7'
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    patient = db.relationship('User', viewonly=True)
+
+class TreatmentArchive(TenantScoped, db.Model):
+    """Ufuk süresinden eski tedavi kayıtları. Kolonlar Treatment ile aynı, id korunur."""
+    __table_args__ = (db.Index('ix_treatment_archive_clinic_user_date', 'clinic_id', 'user_id', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    procedure_name = db.Column(db.String(100))
+    tooth_number = db.Column(db.String(10))
+    cost = db.Column(db.Float, default=0.0)
+    payment_received = db.Column(db.Float, default=0.0)
+    notes = db.Column(db.Text)
+    date = db.Column(db.DateTime)
+    version = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    patient = db.relationship('User', viewonly=True)
+
+# --- TEKRARLANABİLİR İSTEKLER (ÇEVRİMDIŞI KUYRUK) ---
+class IdempotencyKey(TenantScoped, db.Model):
+    """Idempotency-Key başlığıyla gelen POST'un sonucu; aynı anahtar ikinci kez işlenmez (app/idempotency.py)."""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),
+        db.Index('ix_idempotency_created', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    status_code = db.Column(db.Integer) # İşlem sürerken boş
+    response = db.Column(db.Text)       # JSON gövde
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
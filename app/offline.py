@@ -0,0 +1,38 @@
+import json
+import hashlib
+from flask import current_app, render_template, url_for, make_response
+from app.idempotency import KEY_TTL
+
+# user_dashboard_new.html <head> içindeki dosyalar: kurulumda önbelleğe alınır
+SHELL_ASSETS = ['vendor/fonts/manrope.css', 'vendor/fonts/material-symbols.css', 'vendor/tailwind-plugins.js',
+                'vendor/fullcalendar.js', 'bundle/calendar.js']
+# Önbellekten sunulan takvim verisi bu süreden tazeyse arka planda yeniden sorulmaz (saniye)
+REVALIDATE_AFTER = 5
+
+
+def worker_config():
+    """Service worker'a gömülen adresler. Parmak izli dosya adları değişince sürüm de değişir."""
+    asset_url = current_app.jinja_env.globals['asset_url']
+    config = {
+        'shell': [asset_url(name) for name in SHELL_ASSETS],
+        'pages': [url_for('user.dashboard')],
+        'calendar': url_for('user.get_calendar_events'),
+        'booking': url_for('user.create_appointment'),
+        'csrf': url_for('user.csrf_token'),
+        'logout': url_for('auth.logout'),
+        'queueTtl': int(KEY_TTL.total_seconds()),
+        'revalidateAfter': REVALIDATE_AFTER,
+    }
+    source = current_app.jinja_loader.get_source(current_app.jinja_env, 'sw.js')[0]
+    stamp = json.dumps(config, sort_keys=True) + source
+    config['version'] = hashlib.blake2b(stamp.encode(), digest_size=6).hexdigest()
+    return config
+
+
+def service_worker_response():
+    """/sw.js: her ziyarette tarayıcı sürümü kontrol eder (no-cache); değişmişse yeni worker kurulur."""
+    response = make_response(render_template('sw.js', config=worker_config()))
+    response.mimetype = 'application/javascript'
+    response.cache_control.no_cache = True
+    response.headers['Service-Worker-Allowed'] = '/'
+    return response
@@ -0,0 +1,253 @@
+import time
+import click
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, select, insert, func, or_, and_
+from app.extensions import db
+from app.models import OutboxMessage, Appointment, User
+from app.scheduler import worker_id
+from app.transports import get_transport, TransportError
+from app.tenancy import for_each_tenant
+
+# Randevudan ne kadar önce hatırlatma gönderilir
+REMINDERS = {'reminder_24h': timedelta(hours=24), 'reminder_2h': timedelta(hours=2)}
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = timedelta(seconds=30)  # 30s, 1dk, 2dk, 4dk ...
+STALE_CLAIM = timedelta(minutes=5)    # Çöken worker'ın aldığı mesajlar bu süreden sonra geri alınır
+
+# Not: due_at / next_attempt_at randevu saatleriyle aynı (yerel) saat diliminde tutulur.
+
+
+def reminder_rows(appointment_id, start_time, title, name, phone=None, email=None, now=None):
+    """Bir randevu için gönderilecek hatırlatma satırlarını üretir (geçmişe düşenler hariç)."""
+    now = now or datetime.now()
+    body = (f"Sayın {name or 'Hastamız'}, {start_time.strftime('%d.%m.%Y')} saat {start_time.strftime('%H:%M')} "
+            f"tarihindeki {title or 'randevunuzu'} randevunuzu hatırlatırız. - Diş Kliniği")
+    recipients = []
+    if phone:
+        recipients.append(('sms', phone))
+    if email and not email.endswith('@hasta.com'):  # Otomatik açılan hasta e-postaları gerçek değil
+        recipients.append(('email', email))
+    rows = []
+    for kind, before in REMINDERS.items():
+        due = start_time - before
+        if due <= now:
+            continue
+        for channel, recipient in recipients:
+            rows.append({
+                'appointment_id': appointment_id, 'kind': kind, 'channel': channel, 'recipient': recipient,
+                'subject': 'Randevu Hatırlatma', 'body': body, 'status': 'pending',
+                'due_at': due, 'next_attempt_at': due, 'attempts': 0,
+            })
+    return rows
+
+
+def enqueue_reminders(appt):
+    """Randevunun hatırlatmalarını aynı transaction'a ekler (commit çağıranda)."""
+    if appt.id is None:
+        db.session.flush()
+    patient = appt.patient
+    rows = reminder_rows(
+        appt.id, appt.start_time, appt.title,
+        appt.guest_name or (patient.full_name if patient else None),
+        phone=appt.guest_phone or (patient.phone if patient else None),
+        email=patient.email if patient else None,
+    )
+    if rows:
+        db.session.execute(insert(OutboxMessage), rows)
+    return len(rows)
+
+
+def enqueue_many(appointments):
+    """Birden çok randevunun hatırlatmalarını tek INSERT ile ekler (patient ilişkisi yüklü olmalı)."""
+    rows = []
+    for appt in appointments:
+        patient = appt.patient
+        rows += reminder_rows(appt.id, appt.start_time, appt.title, appt.guest_name or (patient.full_name if patient else None),
+                              phone=appt.guest_phone or (patient.phone if patient else None),
+                              email=patient.email if patient else None)
+    if rows:
+        db.session.execute(insert(OutboxMessage), rows)
+    return len(rows)
+
+
+def cancel_reminders(appointment_ids):
+    """Bekleyen ve gönderilmek üzere alınmış hatırlatmaları tek UPDATE ile iptal eder (silme / iptal / saat değişikliği).
+
+    Gönderimi sürmekte olan mesajın sonucu iptali ezmez (bkz. process_batch).
+    appointment_ids bir liste ya da id döndüren bir select olabilir.
+    """
+    return db.session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.appointment_id.in_(appointment_ids), OutboxMessage.status.in_(('pending', 'sending')))
+        .values(status='cancelled')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def claim_batch(limit=50, owner=None, now=None):
+    """Zamanı gelmiş mesajları atomik olarak bu worker adına kilitler ve döndürür.
+
+    Aday id'ler (klinik, durum) indeksinden okunur, UPDATE id listesiyle birincil anahtardan yapılır
+    (alt sorgulu UPDATE'te SQLite kliniğin tüm kuyruğunu tarıyordu). Aynı adayları okuyan iki worker'dan
+    yalnızca biri kilitler: UPDATE zamanı gelmiş olma koşulunu yeniden denetler.
+    """
+    owner = owner or worker_id()
+    now = now or datetime.now()
+    due = or_(
+        and_(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now),
+        and_(OutboxMessage.status == 'sending', OutboxMessage.claimed_at < now - STALE_CLAIM),
+    )
+    due_ids = db.session.scalars(
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status.in_(('pending', 'sending')), due)
+        .order_by(OutboxMessage.next_attempt_at)
+        .limit(limit)
+    ).all()
+    if not due_ids:
+        db.session.commit()
+        return []
+    db.session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due_ids), due)
+        .values(status='sending', claimed_by=owner, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return [
+        {c.name: getattr(m, c.name) for c in OutboxMessage.__table__.columns}
+        for m in OutboxMessage.query.filter_by(status='sending', claimed_by=owner, claimed_at=now)
+    ]
+
+
+def _deliver(transports, message):
+    try:
+        transports[message['channel']].send(message)
+        return message['id'], None
+    except TransportError as e:
+        return message['id'], str(e)
+    except Exception as e:  # Beklenmeyen hata da tekrar denensin
+        return message['id'], f"{type(e).__name__}: {e}"
+
+
+def process_batch(limit=50, concurrency=8):
+    """Bir parti mesajı paralel gönderir, sonuçları toplu günceller. Gönderilen/başarısız sayısını döner.
+
+    Sonuçlar yalnızca hâlâ bu worker'da olan mesajlara yazılır: arada iptal edilen ya da süresi
+    dolduğu için başka bir worker'ın devraldığı mesaj değiştirilmez.
+    """
+    owner = worker_id()
+    messages = claim_batch(limit, owner)
+    if not messages:
+        return 0, 0
+    config = current_app.config
+    transports = {ch: get_transport(ch, config) for ch in {m['channel'] for m in messages}}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda m: _deliver(transports, m), messages))
+
+    now = datetime.now()
+    attempts = {m['id']: (m['attempts'] or 0) + 1 for m in messages}
+    still_ours = (OutboxMessage.status == 'sending', OutboxMessage.claimed_by == owner)
+    sent = [mid for mid, err in results if err is None]
+    if sent:
+        db.session.execute(
+            update(OutboxMessage).where(OutboxMessage.id.in_(sent), *still_ours)
+            .values(status='sent', sent_at=now, attempts=OutboxMessage.attempts + 1, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+    failed = [
+        {
+            'id': mid, 'attempts': attempts[mid], 'last_error': err,
+            'status': 'failed' if attempts[mid] >= MAX_ATTEMPTS else 'pending',
+            'next_attempt_at': now + BACKOFF_BASE * (2 ** (attempts[mid] - 1)),
+        }
+        for mid, err in results if err is not None
+    ]
+    if failed:
+        db.session.execute(  # PK'ye göre toplu güncelleme
+            update(OutboxMessage).where(*still_ours).execution_options(synchronize_session=None), failed)
+    db.session.commit()
+    return len(sent), len(failed)
+
+
+def drain(limit=50, concurrency=8, max_batches=100):
+    """Kuyrukta zamanı gelmiş mesaj kalmayana kadar parti parti gönderir."""
+    total_sent = total_failed = 0
+    started = time.perf_counter()
+    for _ in range(max_batches):
+        sent, failed = process_batch(limit, concurrency)
+        total_sent += sent
+        total_failed += failed
+        if sent + failed < limit:
+            break
+    elapsed = time.perf_counter() - started
+    if total_sent or total_failed:
+        current_app.logger.info(
+            f"Outbox: {total_sent} gönderildi, {total_failed} hata, {elapsed:.2f}s "
+            f"({total_sent / elapsed if elapsed else 0:.1f} mesaj/s)")
+    return total_sent + total_failed
+
+
+def outbox_stats(now=None):
+    """Kuyruk durumu: bekleyen sayısı, gecikme (lag) ve son bir saatteki teslimat hızı."""
+    now = now or datetime.now()
+    counts = dict(db.session.query(OutboxMessage.status, func.count(OutboxMessage.id)).group_by(OutboxMessage.status).all())
+    oldest_due = db.session.query(func.min(OutboxMessage.next_attempt_at)).filter(
+        OutboxMessage.status.in_(('pending', 'sending')), OutboxMessage.next_attempt_at <= now).scalar()
+    sent_last_hour = OutboxMessage.query.filter(
+        OutboxMessage.status == 'sent', OutboxMessage.sent_at >= now - timedelta(hours=1)).count()
+    return {
+        'counts': counts,
+        'due_now': OutboxMessage.query.filter(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now).count(),
+        'lag_seconds': (now - oldest_due).total_seconds() if oldest_due else 0,
+        'sent_last_hour': sent_last_hour,
+        'throughput_per_min': round(sent_last_hour / 60, 2),
+    }
+
+
+def enqueue_series(series_id, from_start=None):
+    """Serinin (from_start'tan itibaren) randevuları için hatırlatmaları tek SELECT + tek INSERT ile ekler."""
+    query = (
+        db.session.query(Appointment.id, Appointment.start_time, Appointment.title, Appointment.guest_name,
+                         Appointment.guest_phone, User.full_name, User.phone, User.email)
+        .outerjoin(User, Appointment.user_id == User.id)
+        .filter(Appointment.series_id == series_id, Appointment.status != 'cancelled')
+    )
+    if from_start:
+        query = query.filter(Appointment.start_time >= from_start)
+    rows = []
+    for a in query.all():
+        rows += reminder_rows(a.id, a.start_time, a.title, a.guest_name or a.full_name,
+                              phone=a.guest_phone or a.phone, email=a.email)
+    if rows:
+        db.session.execute(insert(OutboxMessage), rows)
+    return len(rows)
+
+
+def init_outbox(app):
+    """`flask outbox ...` komutları. Worker ayrı süreçte: `flask outbox worker`"""
+
+    @app.cli.group('outbox')
+    def outbox_cli():
+        """Hatırlatma kuyruğu."""
+
+    @outbox_cli.command('worker')
+    @click.option('--batch', default=50, help='Parti büyüklüğü')
+    @click.option('--concurrency', default=8, help='Paralel gönderim sayısı')
+    @click.option('--idle', default=5.0, help='Kuyruk boşken bekleme (saniye)')
+    def worker(batch, concurrency, idle):
+        click.echo(f"Outbox worker başladı ({worker_id()})")
+        while True:
+            if not for_each_tenant(drain, batch, concurrency):
+                time.sleep(idle)
+            db.session.remove()
+
+    @outbox_cli.command('drain')
+    def drain_cmd():
+        click.echo(f"{for_each_tenant(drain)} mesaj işlendi")
+
+    @outbox_cli.command('stats')
+    def stats_cmd():
+        for key, value in outbox_stats().items():
+            click.echo(f"{key}: {value}")
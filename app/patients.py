@@ -0,0 +1,134 @@
+from itertools import groupby
+import click
+from flask import current_app
+from sqlalchemy import select, update, delete, func, case
+from app.extensions import db
+from app.models import (User, Appointment, Treatment, AppointmentArchive, TreatmentArchive, WaitlistEntry,
+                        IdempotencyKey)
+from app.phones import normalize_phone
+from app.tenancy import for_each_tenant, clinics, tenant
+from app.audit import source
+
+# Aynı telefon numarasıyla açılmış mükerrer hasta kayıtlarının birleştirilmesi.
+# Eskiden hasta numara metniyle arandığından "0532 123 45 67" ve "05321234567" iki ayrı (otomatik,
+# @hasta.com) hasta açıyordu. Numara artık normalize edilerek saklanıyor (app/phones.py); bu modül
+# mevcut kayıtları doldurur ve kümeleri tek kayıtta toplar.
+
+# Hastaya bağlı satırlar birleştirmede tutulan kayda aktarılır
+REFERENCES = (Appointment, Treatment, AppointmentArchive, TreatmentArchive, WaitlistEntry)
+# Birleştirilen hasta id'leri bu kadarlık partilerle işlenir (her parti ayrı transaction)
+MERGE_BATCH = 500
+BACKFILL_BATCH = 1000
+# Otomatik açılan hasta (randevu formundan); giriş yapan gerçek hesaplar silinmez
+AUTO_PASSWORD = 'auto'
+
+
+# --- MEVCUT KAYITLAR ---
+def backfill_phones(batch_size=BACKFILL_BATCH):
+    """Normalize edilmemiş telefonları doldurur (aktif klinik kapsamında). Güncellenen kayıt sayısı."""
+    updated, last_id = 0, 0
+    while rows := db.session.execute(
+            select(User.id, User.phone)
+            .where(User.id > last_id, User.phone.isnot(None), User.phone_normalized.is_(None))
+            .order_by(User.id).limit(batch_size)).all():
+        last_id = rows[-1].id
+        values = [{'id': r.id, 'phone_normalized': n} for r in rows if (n := normalize_phone(r.phone))]
+        if values:
+            db.session.execute(update(User), values)  # Birincil anahtara göre toplu güncelleme
+        db.session.commit()
+        updated += len(values)
+    return updated
+
+
+# --- MÜKERRER KÜMELER ---
+def duplicate_clusters():
+    """Aynı numaralı hasta kümeleri (tek sorgu, (klinik, telefon) indeksinden).
+
+    [{'phone', 'keep', 'merge', 'skipped'}] — tutulan: giriş yapan gerçek hesap, yoksa en eski kayıt.
+    Birden fazla gerçek hesap varsa (ör. aynı numarayı kullanan aile bireyleri) fazlalar birleştirilmez.
+    """
+    patients = (User.role == 'patient', User.phone_normalized.isnot(None))
+    numbers = select(User.phone_normalized).where(*patients).group_by(User.phone_normalized).having(func.count() > 1)
+    rows = db.session.execute(
+        select(User.id, User.phone_normalized, User.password_hash)
+        .where(*patients, User.phone_normalized.in_(numbers))
+        .order_by(User.phone_normalized, User.id)).all()
+    clusters = []
+    for phone, group in groupby(rows, key=lambda r: r.phone_normalized):
+        group = list(group)
+        real = [r.id for r in group if r.password_hash != AUTO_PASSWORD]
+        keep = real[0] if real else group[0].id
+        clusters.append({
+            'phone': phone, 'keep': keep,
+            'merge': [r.id for r in group if r.password_hash == AUTO_PASSWORD and r.id != keep],
+            'skipped': real[1:],
+        })
+    return clusters
+
+
+def merge_batch(mapping):
+    """{silinecek id: tutulan id} — bağlı satırlar model başına tek UPDATE ile aktarılır, kayıtlar silinir."""
+    ids = list(mapping)
+    target = {model: case(mapping, value=model.user_id) for model in REFERENCES}
+    for model in REFERENCES:
+        values = {'user_id': target[model]}
+        if model in (Appointment, Treatment):
+            values['version'] = model.version + 1  # Açık formlar eski sürümle kaydedemesin, önbellek damgaları değişsin
+        db.session.execute(update(model).where(model.user_id.in_(ids)).values(**values)
+                           .execution_options(synchronize_session=False, audit_action='merge'))
+    # Tekrar gönderim anahtarları kısa ömürlü; (kullanıcı, anahtar) tekilliği aktarımda çakışabilir
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id.in_(ids)))
+    db.session.execute(delete(User).where(User.id.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+    return len(ids)
+
+
+def merge_duplicates(clusters=None, batch_size=None):
+    """Mükerrer hastaları birleştirir (aktif klinik kapsamında). Silinen kayıt sayısı."""
+    clusters = duplicate_clusters() if clusters is None else clusters
+    batch_size = batch_size or current_app.config.get('PATIENT_MERGE_BATCH', MERGE_BATCH)
+    mapping = [(dup, c['keep']) for c in clusters for dup in c['merge']]
+    merged = 0
+    with source('cli:patients-merge'):
+        for i in range(0, len(mapping), batch_size):
+            merged += merge_batch(dict(mapping[i:i + batch_size]))
+    return merged
+
+
+def init_patients(app):
+    """`flask patients ...`: telefon normalizasyonu ve mükerrer hasta birleştirme."""
+
+    @app.cli.group('patients')
+    def patients_cli():
+        """Hasta kayıtları."""
+
+    def scoped(slug, func, *args):
+        if slug is None:
+            return for_each_tenant(func, *args)
+        if slug not in clinics():
+            raise click.BadParameter(f"Bilinmeyen şube: {slug}", param_hint='--clinic')
+        with tenant(clinics()[slug][0]):
+            return func(*args)
+
+    @patients_cli.command('normalize')
+    @click.option('--clinic', default=None, help='Yalnızca bu şube (slug)')
+    def normalize_cmd(clinic):
+        """Mevcut telefonları normalize eder (sütun ve indeks `flask db upgrade` ile gelir)."""
+        click.echo(f"{scoped(clinic, backfill_phones)} telefon normalize edildi")
+
+    @patients_cli.command('duplicates')
+    @click.option('--clinic', default=None, help='Yalnızca bu şube (slug)')
+    def duplicates_cmd(clinic):
+        def show():
+            clusters = duplicate_clusters()
+            for c in clusters:
+                note = f"  (gerçek hesap, birleştirilmez: {c['skipped']})" if c['skipped'] else ''
+                click.echo(f"{c['phone']}: tutulan {c['keep']} <- {c['merge']}{note}")
+            return sum(len(c['merge']) for c in clusters)
+        click.echo(f"{scoped(clinic, show)} kayıt birleştirilecek")
+
+    @patients_cli.command('merge')
+    @click.option('--clinic', default=None, help='Yalnızca bu şube (slug)')
+    @click.option('--batch', default=None, type=int, help='Parti büyüklüğü')
+    def merge_cmd(clinic, batch):
+        click.echo(f"{scoped(clinic, merge_duplicates, None, batch)} mükerrer hasta birleştirildi")
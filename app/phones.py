@@ -0,0 +1,44 @@
+import re
+from flask import current_app, has_app_context
+
+# Telefon numaralarının karşılaştırılabilir (E.164) biçimi: "0532 123 45 67", "+90 (532) 123-4567",
+# "905321234567" ve "5321234567" aynı hastayı gösterir: "+905321234567".
+# Kayıtta User.phone_normalized alanına yazılır (app/models.py); hasta araması bu alanın indeksinden yapılır.
+
+DEFAULT_COUNTRY_CODE = '90'
+# Ülke kodu olmadan yazılan ulusal numara uzunluğu (baştaki 0 hariç)
+NATIONAL_LENGTH = 10
+# E.164: en fazla 15 hane; daha kısası bir numara olamaz
+MIN_DIGITS, MAX_DIGITS = 8, 15
+
+_NON_DIGIT = re.compile(r'\D')
+
+
+def country_code():
+    if has_app_context():
+        return str(current_app.config.get('PHONE_COUNTRY_CODE', DEFAULT_COUNTRY_CODE))
+    return DEFAULT_COUNTRY_CODE
+
+
+def normalize_phone(raw, country=None):
+    """'+<ülke><numara>' ya da numara anlaşılamıyorsa None."""
+    if not raw:
+        return None
+    raw = str(raw).strip()
+    country = country or country_code()
+    digits = _NON_DIGIT.sub('', raw)
+    if raw.startswith('+'):
+        international = digits
+    elif digits.startswith('00'):
+        international = digits[2:]
+    elif digits.startswith('0') and len(digits) == NATIONAL_LENGTH + 1:
+        international = country + digits[1:]
+    elif len(digits) == NATIONAL_LENGTH:
+        international = country + digits
+    elif digits.startswith(country) and len(digits) == len(country) + NATIONAL_LENGTH:
+        international = digits
+    else:
+        return None
+    if not MIN_DIGITS <= len(international) <= MAX_DIGITS or international.startswith('0'):
+        return None
+    return '+' + international
@@ -0,0 +1,111 @@
+from contextlib import contextmanager
+from flask import g, request, current_app, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Bir route, tanımlı sorgu bütçesini aştığında fırlatılır."""
+
+
+class QueryCounter:
+    """Engine üzerinde çalışan SQL ifadelerini sayar."""
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=Engine):
+    """Blok içinde çalışan sorguları sayar: `with count_queries() as c: ...; c.count`. Varsayılan: tüm
+    engine'ler (okuma replikası ve şube veritabanları dahil)."""
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=Engine, label='blok'):
+    """Blok `limit` adetten fazla sorgu çalıştırırsa QueryBudgetExceeded fırlatır."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise QueryBudgetExceeded(_report(label, counter, limit))
+
+
+def query_budget(limit):
+    """View'a izin verilen en fazla SQL sorgu sayısını iliştirir.
+
+    load_user ve before_request'lerdeki sorgular dahil: katalog sürüm damgası kontrolü (app/catalog.py)
+    her istekte bir sorgu sayılır.
+    """
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+
+def _report(label, counter, limit):
+    lines = [f"{label}: {counter.count} sorgu çalıştı, bütçe {limit}"]
+    lines += [f"  {i}. {s}" for i, s in enumerate(counter.statements, 1)]
+    return '\n'.join(lines)
+
+
+def missing_budgets(app):
+    """Bütçe tanımlanmamış endpoint'leri döndürür (static hariç)."""
+    return sorted(
+        name for name, view in app.view_functions.items()
+        if name != 'static' and getattr(view, 'query_budget', None) is None
+    )
+
+
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    """Süreçte tek dinleyici: bütçesi açık uygulamanın isteğindeki sorguyu o isteğin sayacına ekler."""
+    if has_request_context() and 'query_budget' in current_app.extensions:
+        counter = g.get('query_counter')
+        if counter is not None:
+            counter(conn, cursor, statement, parameters, context, executemany)
+
+
+def init_query_budget(app):
+    """İstek başına sorgu sayacını bağlar.
+
+    TESTING ya da QUERY_BUDGET_ENFORCE açıkken bütçeyi aşan istek hata fırlatır,
+    DEBUG modunda ise sadece uyarı loglanır.
+    """
+    enforce = app.config.get('QUERY_BUDGET_ENFORCE', app.config.get('TESTING', False))
+    if not (enforce or app.config.get('DEBUG')):
+        return
+
+    app.extensions['query_budget'] = {'enforce': enforce}
+    # Tüm engine'ler dinlenir: şubelere özel veritabanı dosyalarındaki sorgular da sayılır
+    if not event.contains(Engine, 'before_cursor_execute', _on_execute):
+        event.listen(Engine, 'before_cursor_execute', _on_execute)
+
+    def _start_query_counter():
+        g.query_counter = QueryCounter()
+
+    # İlk before_request: şube çözümleme ve katalog sürüm kontrolü de bütçeye dahil
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_query_counter)
+
+    @app.after_request
+    def _check_query_budget(response):
+        counter = g.pop('query_counter', None)
+        view = current_app.view_functions.get(request.endpoint)
+        limit = getattr(view, 'query_budget', None)
+        if counter is None or limit is None or counter.count <= limit:
+            return response
+        message = _report(request.endpoint, counter, limit)
+        if current_app.extensions['query_budget']['enforce']:
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+        return response
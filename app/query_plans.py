@@ -0,0 +1,262 @@
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+import click
+from flask_login import FlaskLoginClient
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from app.extensions import db
+
+# Sorgu planı kontrolü: sık çalışan route ve görevlerin gerçekten çalıştırdığı SQL yakalanır ve her
+# biri için EXPLAIN QUERY PLAN alınır. Büyüyen bir tabloyu baştan sona okuyan (SCAN) plan hata sayılır.
+# Sorgu bütçesi (app/query_budget.py) sorgu SAYISINI, bu kontrol her sorgunun MALİYETİNİ korur.
+
+# Satır sayısı klinik başına birkaç düzinede kalan tablolar: tam tarama sorun değil
+SMALL_TABLES = {'clinic', 'cache_version', 'job_lock', 'resource', 'procedure', 'member'}
+# "SCAN appointment", "SCAN a USING COVERING INDEX ix" (tüm indeks okunur). Alt sorgu / sabit satır hariç.
+SCAN = re.compile(r'^SCAN (?!CONSTANT ROW|\()(\w+)')
+# Tüm indeksler clinic_id ile başlar: yalnızca ona bağlı arama tek şubeli kurulumda tablonun tamamını okur
+TENANT_SCAN = re.compile(r'^SEARCH (\w+) USING (?:COVERING )?INDEX \w+ \(clinic_id=\?\)$')
+# Kontrol edilen ifade türleri (INSERT planı tablo taramaz)
+PLANNED = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+# Bilerek tümünü okuyan sorgular (route yolu -> tablo): liste sayfası her randevuyu gösterir,
+# kuyruk metriği durum başına sayar (kapsayan indeksten, satıra gitmeden)
+KNOWN_SCANS = {
+    '/admin/appointments-list': {'appointment'},
+    '/api/admin/outbox/stats': {'outbox_message'},
+}
+# Yerini yeni (daha geniş) bir indekse bırakan indeksler: `flask indexes sync` bunları kaldırır
+RETIRED_INDEXES = {'appointment': ('ix_appointment_clinic_user',)}
+# Veritabanı dışı iş yapan / dosya yazan görevler kontrol dışı
+SKIP_JOBS = {'backup_databases'}
+
+
+class QueryPlanRegression(AssertionError):
+    """Sık çalışan bir sorgu tablo taramasına düştüğünde fırlatılır."""
+
+
+class PlanCollector:
+    """Engine üzerinde çalışan ifadeleri parametreleriyle toplar (ilk görülen hâli)."""
+
+    def __init__(self):
+        self.statements = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(PLANNED) and statement not in self.statements:
+            self.statements[statement] = parameters[0] if executemany else parameters
+
+
+@contextmanager
+def collect_statements(engine=Engine):
+    """`with collect_statements() as c: ...; c.statements` (ifade -> parametreler). Varsayılan: tüm engine'ler
+    (okuma replikası ve şube veritabanları dahil)."""
+    collector = PlanCollector()
+    event.listen(engine, 'before_cursor_execute', collector)
+    try:
+        yield collector
+    finally:
+        event.remove(engine, 'before_cursor_execute', collector)
+
+
+def explain(statement, parameters, engine=None):
+    """EXPLAIN QUERY PLAN satırlarının açıklama sütunu."""
+    with (engine or db.engine).connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+def full_scans(plan, allowed=()):
+    """Plandaki büyük tablo taramaları (tam tarama ya da şubenin tüm satırları)."""
+    return [line for line in plan
+            if (m := SCAN.match(line) or TENANT_SCAN.match(line)) and m.group(1) not in SMALL_TABLES | set(allowed)]
+
+
+def check_statements(statements, label, engine=None, allowed=()):
+    """[(etiket, ifade, plan, taramalar)] — yalnızca tarama içerenler."""
+    problems = []
+    for statement, parameters in statements.items():
+        plan = explain(statement, parameters, engine)
+        scans = full_scans(plan, allowed)
+        if scans:
+            problems.append((label, statement, plan, scans))
+    return problems
+
+
+@contextmanager
+def assert_index_only(label='blok', engine=None):
+    """Blok içindeki sorgulardan biri büyük tabloyu tararsa QueryPlanRegression fırlatır."""
+    with collect_statements(engine or Engine) as collector:
+        yield collector
+    problems = check_statements(collector.statements, label, engine)
+    if problems:
+        raise QueryPlanRegression(report(problems))
+
+
+def report(problems):
+    lines = []
+    for label, statement, plan, scans in problems:
+        lines.append(f"{label}: {', '.join(scans)}")
+        lines.append('  ' + ' '.join(statement.split())[:400])
+        lines += [f'    {line}' for line in plan]
+    return '\n'.join(lines)
+
+
+# --- ÖRNEK VERİ VE SIK İSTEKLER ---
+def seed_sample():
+    """Her route'un tüm sorgu yollarını çalıştıracak kadar veri. (hasta id, randevu id, takvim anahtarı)"""
+    from app.models import (User, Appointment, Treatment, Resource, WaitlistEntry, OutboxMessage,
+                            AppointmentArchive, TreatmentArchive, Session, Reservation)
+    from app.catalog import seed_defaults
+    now = datetime.now().replace(second=0, microsecond=0)
+    seed_defaults()
+    admin = User(username='plan-admin', full_name='Yönetici', role='admin', calendar_token='plan-admin')
+    patient = User(username='plan-hasta', full_name='Hasta', role='patient', phone='05550000000', calendar_token='plan-hasta')
+    chair, dentist = Resource(name='Koltuk 1', kind='chair'), Resource(name='Dr. A', kind='dentist')
+    db.session.add_all([admin, patient, chair, dentist])
+    db.session.flush()
+    appts = [Appointment(title='Muayene', start_time=now + timedelta(hours=h), end_time=now + timedelta(hours=h, minutes=30),
+                         user_id=patient.id, status='confirmed', resources=[chair, dentist]) for h in (-30, -3, 2, 26)]
+    db.session.add_all(appts)
+    db.session.add(Treatment(user_id=patient.id, procedure_name='Dolgu', cost=100, date=now - timedelta(days=1)))
+    db.session.add(WaitlistEntry(procedure='Muayene', duration=30, earliest=now, latest=now + timedelta(days=2),
+                                 user_id=patient.id, name='Hasta', phone='0555', status='waiting'))
+    db.session.flush()
+    db.session.add(OutboxMessage(appointment_id=appts[-1].id, kind='reminder_24h', channel='sms', recipient='0555',
+                                 body='x', status='pending', due_at=now, next_attempt_at=now, attempts=0))
+    db.session.add(AppointmentArchive(id=10 ** 6, user_id=patient.id, title='Dolgu', start_time=now - timedelta(days=800),
+                                      end_time=now - timedelta(days=800, minutes=-30), status='completed', version=1))
+    db.session.add(TreatmentArchive(id=10 ** 6, user_id=patient.id, procedure_name='Dolgu', cost=50, date=now - timedelta(days=800)))
+    session = Session(date=now.date(), time=time(10, 0))
+    db.session.add(session)
+    db.session.flush()
+    db.session.add(Reservation(session_id=session.id, user_name='Hasta', status='active'))
+    db.session.commit()
+    return admin.id, patient.id, appts[2].id
+
+
+def hot_requests(patient_id, appointment_id):
+    """(kullanıcı, yöntem, adres, form) — panellerin ve takvimlerin sık çağırdıkları."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    week = f"start={today}T00:00:00&end={(datetime.now() + timedelta(days=7)):%Y-%m-%d}T00:00:00"
+    return [
+        ('admin', 'get', '/admin/dashboard', None),
+        ('admin', 'get', '/admin/appointments-list', None),
+        ('admin', 'get', '/admin/patients-list', None),
+        ('admin', 'get', f'/admin/patient/{patient_id}', None),
+        ('admin', 'get', f'/admin/appointment/{appointment_id}', None),
+        ('admin', 'get', f'/api/appointments?{week}', None),
+        ('admin', 'get', '/api/admin/waitlist', None),
+        ('admin', 'get', '/api/admin/outbox/stats', None),
+        ('admin', 'get', f'/api/admin/audit?entity=appointment&entity_id={appointment_id}', None),
+        ('admin', 'get', '/api/admin/analytics/utilization', None),
+        ('admin', 'post', f'/api/appointments/{appointment_id}/update', {'notes': 'plan'}),
+        ('admin', 'post', '/api/appointments/create', {'appt_date': today, 'appt_time': '22:00', 'title': 'Muayene',
+                                                      'guest_phone': '0555 000 00 00', 'guest_name': 'Hasta'}),
+        ('patient', 'get', '/dashboard', None),
+        ('patient', 'get', f'/api/user/calendar?{week}', None),
+        ('patient', 'get', f'/api/availability?date={today}&title=Muayene', None),
+        ('patient', 'get', '/api/user/waitlist', None),
+        ('patient', 'post', '/api/user/appointment/create', {'appt_date': today, 'appt_time': '23:00', 'title': 'Muayene'}),
+        ('patient', 'get', '/sessions/calendar', None),
+        (None, 'get', '/calendar/plan-hasta.ics', None),
+        (None, 'get', '/calendar/plan-admin.ics', None),
+    ]
+
+
+def check_hot_paths(config=None):
+    """Geçici veritabanında sık istekleri ve bakım görevlerini çalıştırır; tarama içeren sorguları döner."""
+    from app import create_app
+    from app.models import User
+    from app.scheduler import JOBS, run_job
+    work = tempfile.mkdtemp()
+    app = create_app(dict({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(work, 'plan.db')}", 'TESTING': True,
+                           'WTF_CSRF_ENABLED': False, 'QUERY_BUDGET_ENFORCE': False, 'READ_REPLICA': False, 'AUDIT_JOURNAL_DIR': None,
+                           'BACKUP_DIR': os.path.join(work, 'backups')}, **(config or {})))
+    app.test_client_class = FlaskLoginClient
+    problems = []
+    try:
+        with app.app_context():
+            db.create_all()
+            admin_id, patient_id, appointment_id = seed_sample()
+            users = {'admin': db.session.get(User, admin_id), 'patient': db.session.get(User, patient_id)}
+            db.session.expunge_all()
+        for who, method, url, form in hot_requests(patient_id, appointment_id):
+            client = app.test_client(user=users[who]) if who else app.test_client()
+            with app.app_context():
+                with collect_statements() as collector:
+                    response = getattr(client, method)(url, data=form)
+                if response.status_code >= 500:
+                    raise click.ClickException(f'{method.upper()} {url}: {response.status_code}')
+                problems += check_statements(collector.statements, f'{method.upper()} {url}',
+                                             allowed=KNOWN_SCANS.get(url.split('?')[0], ()))
+        for name in sorted(set(JOBS) - SKIP_JOBS):
+            with app.app_context():
+                with collect_statements() as collector:
+                    run_job(name)
+                problems += check_statements(collector.statements, f'görev {name}')
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(work, ignore_errors=True)
+    return problems
+
+
+# --- MEVCUT VERİTABANLARINA İNDEKS EKLEME ---
+def missing_indexes(engine):
+    """Modellerde tanımlı olup veritabanında olmayan indeksler (tablosu olanlar)."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        missing += [ix for ix in table.indexes if ix.name not in existing]
+    return missing
+
+
+def retired_indexes(engine):
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    return [name for table, names in RETIRED_INDEXES.items() if table in tables
+            for name in names if name in {ix['name'] for ix in inspector.get_indexes(table)}]
+
+
+def sync_indexes(engine):
+    """create_all mevcut tablolara indeks eklemez: eksikleri oluşturur, emekli olanları kaldırır,
+    planlayıcı istatistiklerini yeniler. (oluşturulan, kaldırılan) adlar."""
+    created, dropped = missing_indexes(engine), retired_indexes(engine)
+    with engine.begin() as conn:
+        for index in created:
+            index.create(conn, checkfirst=True)
+        for name in dropped:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+        if created or dropped:
+            conn.execute(text('ANALYZE'))
+    return [ix.name for ix in created], dropped
+
+
+def init_query_plans(app):
+    """`flask indexes check` (sorgu planı kontrolü) ve `flask indexes sync` (eksik indeksler)."""
+
+    @app.cli.group('indexes')
+    def indexes_cli():
+        """Sorgu planları ve indeksler."""
+
+    @indexes_cli.command('check')
+    def check_cmd():
+        problems = check_hot_paths()
+        if problems:
+            click.echo(report(problems), err=True)
+            raise SystemExit(1)
+        click.echo('Tüm sık sorgular indeks kullanıyor.')
+
+    @indexes_cli.command('sync')
+    def sync_cmd():
+        from app.tenancy import tenant_engine, clinics
+        engines = [('main', db.engine)] + [(slug, tenant_engine(cid)) for slug, (cid, uri) in clinics().items() if uri]
+        for name, engine in engines:
+            created, dropped = sync_indexes(engine)
+            click.echo(f"{name}: eklenen {', '.join(created) or '-'}; kaldırılan {', '.join(dropped) or '-'}")
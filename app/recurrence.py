@@ -0,0 +1,201 @@
+import calendar
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, insert, func, select
+from app.extensions import db
+from app.models import Appointment
+from app.resources import holding, link, MAX_APPOINTMENT_MINUTES
+
+# Tek seride oluşturulabilecek en fazla randevu (yaklaşık 2 yıl haftalık)
+MAX_OCCURRENCES = 104
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+
+
+class RecurrenceError(ValueError):
+    """Geçersiz tekrar kuralı."""
+
+
+def build_rule(freq, interval=1, count=None, until=None):
+    """Form alanlarından 'FREQ=WEEKLY;INTERVAL=1;COUNT=8' biçiminde kural üretir."""
+    parts = [f"FREQ={freq.upper()}", f"INTERVAL={int(interval or 1)}"]
+    if count:
+        parts.append(f"COUNT={int(count)}")
+    if until:
+        parts.append(f"UNTIL={until.strftime('%Y%m%d')}")
+    return ';'.join(parts)
+
+
+def parse_rule(rule):
+    """RRULE benzeri kuralı sözlüğe çevirir. COUNT veya UNTIL zorunludur."""
+    try:
+        fields = dict(part.split('=', 1) for part in rule.upper().split(';') if part)
+        parsed = {
+            'freq': fields['FREQ'],
+            'interval': int(fields.get('INTERVAL', 1)),
+            'count': int(fields['COUNT']) if 'COUNT' in fields else None,
+            'until': datetime.strptime(fields['UNTIL'], '%Y%m%d') if 'UNTIL' in fields else None,
+        }
+    except (KeyError, ValueError):
+        raise RecurrenceError(f"Geçersiz tekrar kuralı: {rule}")
+    if parsed['freq'] not in FREQUENCIES or parsed['interval'] < 1:
+        raise RecurrenceError(f"Geçersiz tekrar kuralı: {rule}")
+    if not parsed['count'] and not parsed['until']:
+        raise RecurrenceError("Tekrar sayısı (COUNT) veya bitiş tarihi (UNTIL) gerekli.")
+    if parsed['count'] is not None and not 1 <= parsed['count'] <= MAX_OCCURRENCES:
+        raise RecurrenceError(f"Tekrar sayısı 1 ile {MAX_OCCURRENCES} arasında olmalı.")
+    return parsed
+
+
+def _add_months(dt, months):
+    """Ay ekler; 31'i olmayan aylarda ayın son gününe sabitler."""
+    month_index = dt.month - 1 + months
+    year, month = dt.year + month_index // 12, month_index % 12 + 1
+    day = min(dt.day, calendar.monthrange(year, month)[1])
+    return dt.replace(year=year, month=month, day=day)
+
+
+def expand(start, rule):
+    """Kuralın ürettiği tüm başlangıç zamanlarını döndürür (ilk randevu dahil).
+
+    Bitiş tarihine kadar MAX_OCCURRENCES'tan fazla randevu düşüyorsa seri kısaltılmaz, RecurrenceError.
+    """
+    r = parse_rule(rule)
+    until = r['until'] + timedelta(days=1) if r['until'] else None
+    out = []
+    for i in range(r['count'] or MAX_OCCURRENCES + 1):
+        if r['freq'] == 'MONTHLY':
+            dt = _add_months(start, i * r['interval'])
+        else:
+            step = timedelta(days=1) if r['freq'] == 'DAILY' else timedelta(weeks=1)
+            dt = start + step * (i * r['interval'])
+        if until and dt >= until:
+            break
+        out.append(dt)
+    if len(out) > MAX_OCCURRENCES:
+        raise RecurrenceError(f"Bu bitiş tarihine kadar {MAX_OCCURRENCES}'ten fazla randevu düşüyor; "
+                              "daha yakın bir tarih seçin.")
+    return out
+
+
+def find_conflicts(intervals, exclude_ids=None, resource_ids=None):
+    """Verilen (başlangıç, bitiş) aralıklarıyla çakışan randevuları TEK sorguda bulur.
+
+    resource_ids verilirse yalnızca bu kaynakları kullanan (ya da kaynaksız) randevulara bakılır.
+    Dönen sözlük: aralık indeksi -> çakışan Appointment.
+    """
+    if not intervals:
+        return {}
+    lo = min(s for s, _ in intervals)
+    hi = max(e for _, e in intervals)
+    query = Appointment.query.filter(
+        Appointment.status != 'cancelled',
+        Appointment.start_time < hi, Appointment.end_time > lo,
+        or_(*[and_(Appointment.start_time < e, Appointment.end_time > s) for s, e in intervals]),
+    )
+    if exclude_ids:
+        query = query.filter(Appointment.id.notin_(exclude_ids))
+    if resource_ids:
+        query = query.filter(holding(resource_ids))
+    existing = query.order_by(Appointment.start_time).all()
+
+    conflicts = {}
+    for i, (s, e) in enumerate(intervals):
+        for appt in existing:
+            if appt.start_time < e and appt.end_time > s:
+                conflicts[i] = appt
+                break
+    return conflicts
+
+
+def _check_duration(duration):
+    if duration > MAX_APPOINTMENT_MINUTES:
+        raise RecurrenceError(f"Randevu süresi en fazla {MAX_APPOINTMENT_MINUTES} dakika olabilir.")
+
+
+def create_series(start, duration, rule, skip_conflicts=False, resources=None, **fields):
+    """Serinin tüm randevularını tek çakışma sorgusu ve toplu INSERT ile oluşturur.
+
+    Tüm seri aynı kaynakları (hekim, koltuk) kullanır.
+    Çakışma varsa ve skip_conflicts kapalıysa hiçbir şey yazılmaz;
+    (None, çakışan başlangıç zamanları) döner.
+    """
+    _check_duration(duration)
+    resources = resources or []
+    starts = expand(start, rule)
+    intervals = [(s, s + timedelta(minutes=duration)) for s in starts]
+    conflicts = find_conflicts(intervals, resource_ids=[r.id for r in resources])
+    if conflicts and not skip_conflicts:
+        return None, [intervals[i][0] for i in sorted(conflicts)]
+
+    series_id = str(uuid.uuid4())
+    rows = [
+        dict(fields, start_time=s, end_time=e, series_id=series_id, recurrence=rule, status='confirmed')
+        for i, (s, e) in enumerate(intervals) if i not in conflicts
+    ]
+    if rows:
+        db.session.execute(insert(Appointment), rows)
+        if resources:
+            link(db.session.scalars(select(Appointment.id).where(Appointment.series_id == series_id)), resources)
+    return series_id, [intervals[i][0] for i in sorted(conflicts)]
+
+
+def _shifted(column, *modifiers):
+    """SQLite tarih aritmetiği; SQLAlchemy'nin sakladığı biçimi korur (mikrosaniye dahil)."""
+    return func.strftime('%Y-%m-%d %H:%M:%S.000000', column, *modifiers)
+
+
+def _following(appt):
+    """Bu randevu ve serideki sonraki randevular için filtre."""
+    return Appointment.query.filter(
+        Appointment.series_id == appt.series_id,
+        Appointment.start_time >= appt.start_time,
+        Appointment.status != 'cancelled',
+    )
+
+
+def following_ids(appt):
+    """'Bu ve sonrakiler'in id'lerini veren select (alt sorgu olarak kullanılır)."""
+    return _following(appt).with_entities(Appointment.id).scalar_subquery()
+
+
+def following_intervals(appt):
+    """'Bu ve sonrakiler'in (başlangıç, bitiş) aralıkları; iptal/taşıma öncesi boşalacak slotlar."""
+    return [tuple(r) for r in _following(appt).with_entities(Appointment.start_time, Appointment.end_time)]
+
+
+def cancel_following(appt):
+    """'Bu ve sonrakiler'i tek UPDATE ile iptal eder. Etkilenen satır sayısını döner."""
+    return _following(appt).update({Appointment.status: 'cancelled', Appointment.version: Appointment.version + 1},
+                                   synchronize_session=False)
+
+
+def update_following(appt, shift=None, duration=None, **fields):
+    """'Bu ve sonrakiler'i tek UPDATE ile düzenler.
+
+    shift: tüm randevuları kaydıracak timedelta, duration: yeni süre (dakika).
+    Zaman değişiyorsa yeni aralıklar tek sorguda çakışma kontrolünden geçer;
+    çakışma varsa (0, çakışan başlangıçlar) döner ve hiçbir şey yazılmaz.
+    """
+    if duration:
+        _check_duration(duration)
+    values = {getattr(Appointment, k): v for k, v in fields.items() if v is not None}
+    if shift or duration:
+        shift = shift or timedelta(0)
+        rows = _following(appt).with_entities(Appointment.id, Appointment.start_time, Appointment.end_time).all()
+        intervals = [
+            (s + shift, s + shift + (timedelta(minutes=duration) if duration else e - s))
+            for _, s, e in rows
+        ]
+        conflicts = find_conflicts(intervals, exclude_ids=[r.id for r in rows], resource_ids=[r.id for r in appt.resources])
+        if conflicts:
+            return 0, [intervals[i][0] for i in sorted(conflicts)]
+        offset = f"{int(shift.total_seconds()):+d} seconds"
+        values[Appointment.start_time] = _shifted(Appointment.start_time, offset)
+        if duration:
+            values[Appointment.end_time] = _shifted(Appointment.start_time, offset, f"+{int(duration)} minutes")
+        else:
+            values[Appointment.end_time] = _shifted(Appointment.end_time, offset)
+    if not values:
+        return 0, []
+    values[Appointment.version] = Appointment.version + 1  # Açık düzenleme formları çakışma alsın
+    return _following(appt).update(values, synchronize_session=False), []
@@ -0,0 +1,104 @@
+import time
+import threading
+from flask import g, request, session, current_app, has_request_context
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from app.extensions import db, RoutingSession
+
+# Bu metotlardaki isteklerin SELECT'leri salt-okunur bağlantıdan okunur
+READ_METHODS = ('GET', 'HEAD')
+# Yazan kullanıcı bu süre boyunca birincil veritabanından okur (replika gecikmesine karşı)
+READ_YOUR_WRITES = 3  # saniye
+READ_POOL_SIZE = 10
+
+
+def replica_url(url):
+    """SQLite dosyası için salt-okunur (mode=ro) bağlantı adresi; bellek içi veritabanında None."""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or url.database.startswith('file:'):
+        return None
+    return url.set(database=f'file:{url.database}', query=dict(url.query, mode='ro', uri='true'))
+
+
+def read_engine(primary):
+    """Birincil engine'in okuma engine'i (yoksa None). İlk çağrıda SQLite dosyası WAL moduna alınır:
+    WAL'da okuyucular yazarı, yazar okuyucuları beklemez.
+    """
+    state = current_app.extensions['replica']
+    if primary not in state['engines']:
+        with state['lock']:
+            if primary not in state['engines']:
+                url = state['uri'] if primary is db.engine and state['uri'] else replica_url(primary.url)
+                engine = None
+                if url:
+                    if primary.url.get_backend_name() == 'sqlite':
+                        with primary.begin() as conn:
+                            conn.exec_driver_sql('PRAGMA journal_mode=WAL')  # Dosyada kalıcı
+                    engine = create_engine(url, pool_size=state['pool_size'])
+                state['engines'][primary] = engine
+    return state['engines'][primary]
+
+
+def _reader(db_session, primary, clause):
+    """RoutingSession için: okuma isteklerindeki SELECT'leri okuma engine'ine yönlendirir.
+
+    Flush ve UPDATE/DELETE gibi yazmalar birincile gider; istek içinde bir kez yazıldıktan
+    sonra kalan sorgular da birincilden okunur (kendi yazdığını görsün).
+    """
+    if not has_request_context() or not g.get('read_only') or db_session.info.get('wrote'):
+        return None
+    if clause is None or not getattr(clause, 'is_select', False):
+        db_session.info['wrote'] = True
+        return None
+    return read_engine(primary)
+
+
+def _after_flush(db_session, flush_context):
+    """Flush gerçekten satır yazdıysa işaretler (değişmemiş 'dirty' nesneler yazma sayılmaz)."""
+    if db_session.new or db_session.deleted or any(db_session.is_modified(o) for o in db_session.dirty):
+        db_session.info['pending_write'] = True
+
+
+def _bulk_write(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info['pending_write'] = True
+
+
+def _after_commit(db_session):
+    """Yalnızca satır yazan commit'ler okuma-yazdığını-gör penceresini açar."""
+    if db_session.info.pop('pending_write', False) and has_request_context():
+        g.wrote = True
+
+
+def _after_rollback(db_session):
+    db_session.info.pop('pending_write', None)
+
+
+def init_replica(app):
+    """GET isteklerini salt-okunur bağlantıya, yazmaları birincile yönlendirir.
+
+    READ_REPLICA=False kapatır; READ_REPLICA_URI ana veritabanı için ayrı bir replika verir
+    (verilmezse SQLite dosyası mode=ro ile ayrıca açılır). Bellek içi veritabanında etkisizdir.
+    """
+    app.extensions['replica'] = {
+        'engines': {}, 'lock': threading.Lock(), 'uri': app.config.get('READ_REPLICA_URI'),
+        'pool_size': app.config.get('READ_POOL_SIZE', READ_POOL_SIZE),
+    }
+    if not app.config.get('READ_REPLICA', True):
+        return
+    RoutingSession.reader = staticmethod(_reader)
+    for name, listener in (('after_flush', _after_flush), ('do_orm_execute', _bulk_write),
+                           ('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
+    window = app.config.get('READ_YOUR_WRITES_SECONDS', READ_YOUR_WRITES)
+
+    @app.before_request
+    def _choose_reader():
+        g.read_only = request.method in READ_METHODS and session.get('rw_until', 0) < time.time()
+
+    @app.after_request
+    def _read_your_writes(response):
+        if g.get('wrote') and window:
+            session['rw_until'] = time.time() + window
+        return response
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, exists, or_
+from app.extensions import db
+from app.models import Appointment, Resource, appointment_resource
+
+# Her randevu için her türden bir kaynak gerekir; oda isteğe bağlı
+REQUIRED_KINDS = ('dentist', 'chair')
+RESOURCE_KINDS = {'dentist': 'Hekim', 'chair': 'Koltuk', 'room': 'Oda'}
+# En uzun randevu süresi; çakışma sorgusunda start_time taramasını alttan sınırlar. Daha uzun randevu
+# yazılamaz: işlem kataloğu, seri ve bekleme listesi süreleri bu sınırla doğrulanır.
+MAX_APPOINTMENT = timedelta(hours=4)
+MAX_APPOINTMENT_MINUTES = int(MAX_APPOINTMENT.total_seconds() // 60)
+SLOT_STEP = timedelta(minutes=15)
+OPENING_HOURS = (9, 18)
+
+# Not: Kaynağı olmayan (eski) randevular tüm kaynakları meşgul sayılır; klinikte hiç
+# kaynak tanımlı değilse takvim eskisi gibi tek zaman çizelgesi olarak çalışır.
+
+
+def overlap_criteria(start, end):
+    """[start, end) ile çakışan aktif randevu koşulları (ix_appointment_clinic_start üzerinde sınırlı tarama)."""
+    return (
+        Appointment.start_time < end, Appointment.start_time > start - MAX_APPOINTMENT,
+        Appointment.end_time > start, Appointment.status != 'cancelled',
+    )
+
+
+def overlapping(start, end):
+    return Appointment.query.filter(*overlap_criteria(start, end))
+
+
+def _unassigned():
+    return ~exists().where(appointment_resource.c.appointment_id == Appointment.id)
+
+
+def holding(resource_ids):
+    """Verilen kaynaklardan birini kullanan ya da hiç kaynağı olmayan randevular için filtre."""
+    return or_(
+        Appointment.id.in_(
+            select(appointment_resource.c.appointment_id).where(appointment_resource.c.resource_id.in_(resource_ids))),
+        _unassigned(),
+    )
+
+
+def check_conflict(start, end, resource_ids=None, ignore_id=None):
+    """Aynı kaynağı kullanan çakışan randevu. resource_ids boşsa tüm randevulara bakar."""
+    query = overlapping(start, end)
+    if resource_ids:
+        query = query.filter(holding(resource_ids))
+    if ignore_id:
+        query = query.filter(Appointment.id != ignore_id)
+    return query.first()
+
+
+def requested_resources(data):
+    """Formdaki dentist_id / chair_id / room_id alanlarını {tür: id} sözlüğüne çevirir."""
+    out = {}
+    for kind in RESOURCE_KINDS:
+        value = data.get(f'{kind}_id')
+        if value:
+            out[kind] = int(value)
+    return out
+
+
+def active_resources():
+    return Resource.query.filter_by(active=True).order_by(Resource.kind, Resource.id).all()
+
+
+def _busy(start, end, ignore_id=None):
+    """Aralıkta meşgul kaynak id'leri (tek sorgu). Kaynağı olmayan bir randevu varsa None (hepsi meşgul)."""
+    query = (
+        db.session.query(Appointment.id, appointment_resource.c.resource_id)
+        .outerjoin(appointment_resource, appointment_resource.c.appointment_id == Appointment.id)
+        .filter(Appointment.start_time < end, Appointment.start_time > start - MAX_APPOINTMENT,
+                Appointment.end_time > start, Appointment.status != 'cancelled')
+    )
+    if ignore_id:
+        query = query.filter(Appointment.id != ignore_id)
+    busy = set()
+    for _, resource_id in query:
+        if resource_id is None:
+            return None
+        busy.add(resource_id)
+    return busy
+
+
+def _pick(resources, requested, free, kinds=None):
+    """Her gerekli tür için serbest bir kaynak seçer; biri bile yoksa None."""
+    chosen = []
+    for kind in sorted(set(kinds or REQUIRED_KINDS) | set(requested)):
+        candidates = [r for r in resources if r.kind == kind and (kind not in requested or r.id == requested[kind])]
+        if not candidates and kind not in requested:
+            continue  # Bu türde kaynak tanımlı değil
+        match = next((r for r in candidates if free(r.id)), None)
+        if match is None:
+            return None
+        chosen.append(match)
+    return chosen
+
+
+def assign(start, end, requested=None, ignore_id=None, kinds=None):
+    """Aralık için gerekli tüm kaynakların aynı anda boş olduğu bir kombinasyon seçer.
+
+    kinds: işlemin ihtiyaç duyduğu kaynak türleri (Procedure.required_resources).
+
+    Dönüş: Resource listesi (kaynak tanımlı değilse boş liste) ya da uygun kombinasyon yoksa None.
+    İki sorgu: aktif kaynaklar + aralıktaki meşgul kaynaklar.
+    """
+    requested = requested or {}
+    resources = active_resources()
+    if not resources:
+        return None if check_conflict(start, end, ignore_id=ignore_id) else []
+    busy = _busy(start, end, ignore_id)
+    if busy is None:
+        return None
+    return _pick(resources, requested, lambda rid: rid not in busy, kinds)
+
+
+def default_resources(requested=None, kinds=None):
+    """Müsaitliğe bakmadan her türden bir kaynak (seride çakışanlar zaten atlanır)."""
+    return _pick(active_resources(), requested or {}, lambda rid: True, kinds) or []
+
+
+def link(appointment_ids, resources):
+    """Toplu eklenen (ör. seri) randevulara kaynakları tek INSERT ile bağlar."""
+    rows = [{'appointment_id': aid, 'resource_id': r.id} for aid in appointment_ids for r in resources]
+    if rows:
+        db.session.execute(insert(appointment_resource), rows)
+
+
+def find_slots(day, duration, requested=None, step=SLOT_STEP, hours=OPENING_HOURS, now=None, kinds=None):
+    """Günün, gerekli tüm kaynakların aynı anda boş olduğu başlangıç saatleri.
+
+    Günün meşgul aralıkları tek sorguda çekilir, tarama bellekte yapılır; maliyet
+    (slot sayısı x kaynak sayısı x o kaynağın o günkü randevu sayısı) ile sınırlıdır.
+    """
+    requested = requested or {}
+    now = now or datetime.now()
+    opening = datetime.combine(day, datetime.min.time()).replace(hour=hours[0])
+    closing = opening.replace(hour=hours[1])
+    length = timedelta(minutes=duration)
+
+    resources = active_resources()
+    rows = (
+        db.session.query(Appointment.start_time, Appointment.end_time, appointment_resource.c.resource_id)
+        .outerjoin(appointment_resource, appointment_resource.c.appointment_id == Appointment.id)
+        .filter(Appointment.start_time < closing, Appointment.start_time > opening - MAX_APPOINTMENT,
+                Appointment.end_time > opening, Appointment.status != 'cancelled')
+        .all()
+    )
+    blocked, busy = [], {}
+    for s, e, resource_id in rows:
+        if resource_id is None or not resources:
+            blocked.append((s, e))  # Kaynaksız randevu herkesi bloke eder
+        else:
+            busy.setdefault(resource_id, []).append((s, e))
+
+    slots = []
+    start = opening
+    while start + length <= closing:
+        end = start + length
+        overlaps = lambda intervals: any(s < end and e > start for s, e in intervals)
+        if start >= now and not overlaps(blocked):
+            if not resources or _pick(resources, requested, lambda rid: not overlaps(busy.get(rid, ())), kinds) is not None:
+                slots.append(start)
+        start += step
+    return slots
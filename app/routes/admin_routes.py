@@ -1,31 +1,55 @@
-from flask import Blueprint, render_template, redirect, url_for, jsonify, request
+from flask import Blueprint, render_template, redirect, url_for, jsonify, request, flash, abort
 from flask_login import login_required, current_user
-from app.models import Appointment, User, Treatment
+from app.models import Appointment, User, Treatment, JobRun, WaitlistEntry, Resource, Procedure
 from app.extensions import db
+from app.query_budget import query_budget
+from app.scheduler import JOBS, run_job, last_runs
+from app.recurrence import build_rule, create_series, update_following, cancel_following, following_ids, following_intervals, RecurrenceError
+from app.outbox import enqueue_reminders, enqueue_series, cancel_reminders, outbox_stats
+from app.waitlist import add_entry, release, promote, accept_offer, decline_offer, WaitlistError
+from app.resources import assign, default_resources, requested_resources, overlapping, RESOURCE_KINDS
+from app.feeds import feed_response, parse_range
+from app.catalog import get_procedure, block_length, block_minutes, bump_version, seed_defaults, procedures, validate_procedure, UnknownProcedure
+from app.audit import history, PAGE_SIZE
+from app.archive import patient_history
+from app.batch import parse_operations, apply_batch, BatchError, MAX_OPERATIONS
+from app.concurrency import check_version, conflict_response, CONFLICTS
+from app.analytics import utilization, parse_month, default_range, AnalyticsError
+from app.phones import normalize_phone
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__)
 
-# --- İŞLEM SÜRELERİ ---
-PROCEDURE_DURATIONS = {
-    'Muayene': 30, 'Diş Taşı Temizliği': 30, 'Diş Çekimi': 30,
-    'Dolgu': 45, 'Kanal Tedavisi': 60, 'İmplant': 90
-}
+def get_or_create_patient(phone, name):
+    """Telefon numarasına göre hastayı bulur, yoksa otomatik hasta kaydı açar.
 
-def check_conflict(start, end, ignore_id=None):
-    query = Appointment.query.filter(Appointment.start_time < end, Appointment.end_time > start, Appointment.status != 'cancelled')
-    if ignore_id: query = query.filter(Appointment.id != ignore_id)
-    return query.first()
+    Numara yazılış biçiminden bağımsız karşılaştırılır (normalize_phone); arama (klinik, telefon) indeksinden.
+    Aynı numaralı birden fazla kayıt varsa en eskisi kullanılır (birleştirme: `flask patients merge`).
+    """
+    if not phone: return None
+    normalized = normalize_phone(phone)
+    if normalized:
+        user = User.query.filter_by(phone_normalized=normalized, role='patient').order_by(User.id).first()
+    else:  # Anlaşılamayan numara: eskisi gibi olduğu gibi eşleşir
+        user = User.query.filter_by(username=phone).first()
+    if not user:
+        username = normalized or phone
+        user = User(username=username, email=f"{username}@hasta.com", full_name=name, phone=phone, role='patient', password_hash="auto")
+        db.session.add(user)
+        db.session.flush()
+    return user
 
 # --- DASHBOARD ---
 @admin_bp.route('/admin/dashboard')
+@query_budget(5)
 @login_required
 def dashboard():
     if not current_user.is_admin: return redirect(url_for('user.dashboard'))
     today = datetime.now().date()
     today_start = datetime.combine(today, datetime.min.time())
     today_end = datetime.combine(today, datetime.max.time())
-    todays_appointments = Appointment.query.filter(Appointment.start_time >= today_start, Appointment.start_time <= today_end, Appointment.status != 'cancelled').order_by(Appointment.start_time).all()
+    todays_appointments = Appointment.query.options(joinedload(Appointment.patient)).filter(Appointment.start_time >= today_start, Appointment.start_time <= today_end, Appointment.status != 'cancelled').order_by(Appointment.start_time).all()
     monthly_treatments = Treatment.query.filter(Treatment.date >= today.replace(day=1)).all()
     monthly_income = sum(t.cost for t in monthly_treatments)
     total_patients = User.query.filter_by(role='patient').count()
@@ -33,6 +57,7 @@ def dashboard():
 
 # --- TAKVİM ---
 @admin_bp.route('/admin/calendar')
+@query_budget(2)
 @login_required
 def calendar_view():
     if not current_user.is_admin: return redirect(url_for('user.dashboard'))
@@ -40,14 +65,16 @@ def calendar_view():
 
 # --- RANDEVU LİSTESİ ---
 @admin_bp.route('/admin/appointments-list')
+@query_budget(3)
 @login_required
 def appointment_list():
     if not current_user.is_admin: return redirect(url_for('user.dashboard'))
-    appointments = Appointment.query.order_by(Appointment.start_time.desc()).all()
+    appointments = Appointment.query.options(joinedload(Appointment.patient)).order_by(Appointment.start_time.desc()).all()
     return render_template('admin_appointments.html', appointments=appointments)
 
 # --- HASTA LİSTESİ ---
 @admin_bp.route('/admin/patients-list')
+@query_budget(3)
 @login_required
 def patients_list():
     if not current_user.is_admin: return redirect(url_for('user.dashboard'))
@@ -56,17 +83,19 @@ def patients_list():
 
 # --- HASTA DETAY ---
 @admin_bp.route('/admin/patient/<int:user_id>')
+@query_budget(8)
 @login_required
 def patient_detail(user_id):
     if not current_user.is_admin: return redirect(url_for('user.dashboard'))
     patient = User.query.get_or_404(user_id)
     all_patients = User.query.filter_by(role='patient').order_by(User.full_name).all()
-    appointments = Appointment.query.filter_by(user_id=user_id).order_by(Appointment.start_time.desc()).all()
-    treatments = Treatment.query.filter_by(user_id=user_id).order_by(Treatment.date.desc()).all()
+    # Geçmişin tamamı: arşive taşınmış eski kayıtlar da listelenir
+    appointments, treatments = patient_history(user_id)
     return render_template('admin_patient_detail.html', patient=patient, all_patients=all_patients, appointments=appointments, treatments=treatments)
 
 # --- YENİ EKLENEN: RANDEVU DETAY ---
 @admin_bp.route('/admin/appointment/<int:appt_id>')
+@query_budget(4)
 @login_required
 def appointment_detail(appt_id):
     if not current_user.is_admin: return redirect(url_for('user.dashboard'))
@@ -76,79 +105,235 @@ def appointment_detail(appt_id):
     return render_template('admin_appointment_detail.html', appointment=appointment, patient=patient)
 
 # --- API ---
+# Takvim akışı alanları (kompakt biçimde sütun türleri; bkz. app/feeds.py)
+ADMIN_FEED = {'id': 'raw', 'title': 'raw', 'start': 'time', 'end': 'time', 'guest_name': 'raw', 'guest_phone': 'raw',
+              'procedure': 'dict', 'notes': 'raw', 'series_id': 'raw', 'resources': 'dict', 'version': 'raw'}
+
+def admin_feed_row(appt):
+    """Yönetici takvimi satırı (patient ve resources önceden yüklenmiş olmalı; ASGI katmanı da kullanır)."""
+    display_title = appt.guest_name if appt.guest_name else (appt.patient.full_name if appt.patient else "Bilinmeyen")
+    return {
+        'id': appt.id, 'title': f"{display_title} - {appt.title}", 'start': appt.start_time, 'end': appt.end_time,
+        'guest_name': appt.guest_name or (appt.patient.full_name if appt.patient else ""),
+        'guest_phone': appt.guest_phone or (appt.patient.phone if appt.patient else ""),
+        'procedure': appt.title, 'notes': appt.notes or "",
+        'series_id': appt.series_id,
+        'resources': {r.kind: r.id for r in appt.resources},
+        'version': appt.version
+    }
+
 @admin_bp.route('/api/appointments')
+@query_budget(4)
 @login_required
 def get_appointments():
+    """Takvim akışı. FullCalendar'ın ?start/?end aralığıyla sınırlanır; Accept ile kompakt biçim seçilebilir."""
     if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
-    appointments = Appointment.query.filter(Appointment.status != 'cancelled').all()
-    events = []
-    for appt in appointments:
-        display_title = appt.guest_name if appt.guest_name else (appt.patient.full_name if appt.patient else "Bilinmeyen")
-        events.append({
-            'id': appt.id, 'title': f"{display_title} - {appt.title}",
-            'start': appt.start_time.isoformat(), 'end': appt.end_time.isoformat(),
-            'extendedProps': {
-                'guest_name': appt.guest_name or (appt.patient.full_name if appt.patient else ""),
-                'guest_phone': appt.guest_phone or (appt.patient.phone if appt.patient else ""),
-                'procedure': appt.title, 'notes': appt.notes or ""
-            }
-        })
-    return jsonify(events)
+    start, end = parse_range()
+    query = overlapping(start, end) if start and end else Appointment.query.filter(Appointment.status != 'cancelled')
+    query = query.options(joinedload(Appointment.patient), selectinload(Appointment.resources))
+    if request.args.get('resource'): # Hekim / koltuk takvimi
+        query = query.filter(Appointment.resources.any(Resource.id == request.args.get('resource', type=int)))
+    return feed_response([admin_feed_row(appt) for appt in query.all()], ADMIN_FEED)
 
 @admin_bp.route('/api/appointments/create', methods=['POST'])
+@query_budget(9)
 @login_required
 def create_appointment():
     try:
         data = request.form
         start_time = datetime.strptime(f"{data.get('appt_date')} {data.get('appt_time')}", '%Y-%m-%d %H:%M')
-        duration = PROCEDURE_DURATIONS.get(data.get('title'), 30)
-        end_time = start_time + timedelta(minutes=duration)
-        if check_conflict(start_time, end_time): return jsonify({'status': 'error', 'message': 'Bu saatte başka randevu var!'}), 400
-        user_id = None
-        if data.get('guest_phone'):
-            user = User.query.filter_by(username=data.get('guest_phone')).first()
-            if not user:
-                user = User(username=data.get('guest_phone'), email=f"{data.get('guest_phone')}@hasta.com", full_name=data.get('guest_name'), phone=data.get('guest_phone'), role='patient', password_hash="auto")
-                db.session.add(user)
-                db.session.flush()
-            user_id = user.id
-        new_appt = Appointment(title=data.get('title'), start_time=start_time, end_time=end_time, user_id=user_id, guest_name=data.get('guest_name'), guest_phone=data.get('guest_phone'), notes=data.get('notes'), status='confirmed')
+        procedure = get_procedure(data.get('title'))
+        end_time = start_time + block_length(procedure)
+        resources = assign(start_time, end_time, requested_resources(data), kinds=procedure['required_resources']) # Hekim + koltuk aynı anda boş olmalı
+        if resources is None: return jsonify({'status': 'error', 'message': 'Bu saatte başka randevu var!'}), 400
+        user = get_or_create_patient(data.get('guest_phone'), data.get('guest_name'))
+        user_id = user.id if user else None
+        new_appt = Appointment(title=data.get('title'), start_time=start_time, end_time=end_time, user_id=user_id, guest_name=data.get('guest_name'), guest_phone=data.get('guest_phone'), notes=data.get('notes'), status='confirmed', resources=resources)
         db.session.add(new_appt)
+        enqueue_reminders(new_appt) # Hatırlatmalar aynı transaction'da kuyruğa
         db.session.commit()
         return jsonify({'status': 'success', 'message': 'Randevu oluşturuldu!'})
+    except UnknownProcedure as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @admin_bp.route('/api/appointments/<int:id>/update', methods=['POST'])
+@query_budget(19)
 @login_required
 def update_appointment(id):
+    """Modalda düzenleme. `version` akıştaki sürümdür; arada değişmişse 409 + güncel kayıt."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
     appt = Appointment.query.get_or_404(id)
     try:
         data = request.form
+        check_version(appt, data.get('version'))
         if data.get('guest_name'): appt.guest_name = data.get('guest_name')
         if data.get('guest_phone'): appt.guest_phone = data.get('guest_phone')
-        if data.get('title'): appt.title = data.get('title')
+        if data.get('title') and data.get('title') != appt.title:
+            get_procedure(data.get('title'))
+            appt.title = data.get('title')
         if data.get('notes'): appt.notes = data.get('notes')
-        if data.get('appt_date') and data.get('appt_time'):
-            new_start = datetime.strptime(f"{data.get('appt_date')} {data.get('appt_time')}", '%Y-%m-%d %H:%M')
-            duration = PROCEDURE_DURATIONS.get(appt.title, 30)
-            new_end = new_start + timedelta(minutes=duration)
-            if check_conflict(new_start, new_end, ignore_id=id): return jsonify({'status': 'error', 'message': 'Çakışma var!'}), 400
+        requested = requested_resources(data)
+        if (data.get('appt_date') and data.get('appt_time')) or requested:
+            new_start = datetime.strptime(f"{data.get('appt_date')} {data.get('appt_time')}", '%Y-%m-%d %H:%M') if data.get('appt_date') and data.get('appt_time') else appt.start_time
+            try:
+                procedure = get_procedure(appt.title)
+                length, kinds = block_length(procedure), procedure['required_resources']
+            except UnknownProcedure: # Katalogdan kaldırılmış eski işlem: mevcut süre korunur
+                length, kinds = appt.end_time - appt.start_time, None
+            new_end = new_start + length
+            # Değiştirilmeyen kaynaklar korunur
+            resources = assign(new_start, new_end, dict({r.kind: r.id for r in appt.resources}, **requested), ignore_id=id, kinds=kinds)
+            if resources is None: return jsonify({'status': 'error', 'message': 'Çakışma var!'}), 400
+            freed, freed_resources = (appt.start_time, appt.end_time), list(appt.resources)
             appt.start_time = new_start
             appt.end_time = new_end
+            appt.resources = resources
+            promote([freed], resources=freed_resources) # Eski saat bekleme listesindekilere açılır
+        # Saat / kişi bilgisi değişmiş olabilir: bekleyen hatırlatmaları yeniden kur
+        cancel_reminders([appt.id])
+        enqueue_reminders(appt)
+        db.session.flush() # Yeni sürüm commit sonrası tekrar okumadan alınır
+        version = appt.version
         db.session.commit()
-        return jsonify({'status': 'success', 'message': 'Güncellendi.'})
+        return jsonify({'status': 'success', 'message': 'Güncellendi.', 'version': version})
+    except CONFLICTS: return conflict_response(Appointment, id, Appointment.to_dict)
+    except UnknownProcedure as e: return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e: return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @admin_bp.route('/api/appointments/<int:id>/delete', methods=['POST'])
+@query_budget(15)
 @login_required
 def delete_appointment(id):
-    db.session.delete(Appointment.query.get_or_404(id))
-    db.session.commit()
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    appt = Appointment.query.get_or_404(id)
+    try:
+        check_version(appt, request.form.get('version'))
+        db.session.delete(appt)
+        cancel_reminders([id])
+        release(appt) # Boşalan slot bekleme listesindeki en uygun hastaya teklif edilir
+        db.session.commit()
+    except CONFLICTS: return conflict_response(Appointment, id, Appointment.to_dict)
     return jsonify({'status': 'success'})
 
+@admin_bp.route('/api/appointments/batch', methods=['POST'])
+@query_budget(21 + MAX_OPERATIONS) # Sürümlü UPDATE satır başına bir ifade
+@login_required
+def batch_appointments():
+    """Takvimde çoklu seçim: taşıma / düzenleme / iptal listesini tek transaction'da uygular.
+
+    Gövde: {"operations": [{"id": 5, "action": "move", "start": "2024-05-02T14:00"}, {"id": 6, "action": "cancel"}]}
+    Biri bile geçersizse (çakışma dahil) hiçbiri uygulanmaz; hatalar işlem sırasıyla döner.
+    """
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    try:
+        count = apply_batch(parse_operations(request.get_json(silent=True)))
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': f'{count} randevu güncellendi.', 'count': count})
+    except BatchError as e:
+        db.session.rollback()
+        return jsonify({'status': 'conflict' if e.status == 409 else 'error', 'message': str(e), 'errors': e.errors}), e.status
+    except CONFLICTS as e: # Doğrulamadan sonra başka bir yazma araya girdi
+        db.session.rollback()
+        return jsonify({'status': 'conflict', 'message': 'Seçilen randevulardan biri bu arada değiştirildi; takvim yenilendi.'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# --- TEKRARLAYAN RANDEVU SERİSİ ---
+@admin_bp.route('/api/appointments/series/create', methods=['POST'])
+@query_budget(13)
+@login_required
+def create_appointment_series():
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    try:
+        data = request.form
+        start_time = datetime.strptime(f"{data.get('appt_date')} {data.get('appt_time')}", '%Y-%m-%d %H:%M')
+        procedure = get_procedure(data.get('title'))
+        duration = block_minutes(procedure)
+        until = datetime.strptime(data.get('repeat_until'), '%Y-%m-%d') if data.get('repeat_until') else None
+        rule = build_rule(data.get('repeat_freq') or 'WEEKLY', data.get('repeat_interval'), data.get('repeat_count'), until)
+        user = get_or_create_patient(data.get('guest_phone'), data.get('guest_name'))
+        # Seri boyunca aynı hekim ve koltuk; ilk randevuda boş olan kombinasyon tercih edilir
+        requested = requested_resources(data)
+        kinds = procedure['required_resources']
+        resources = assign(start_time, start_time + timedelta(minutes=duration), requested, kinds=kinds) or default_resources(requested, kinds)
+        series_id, conflicts = create_series(
+            start_time, duration, rule, skip_conflicts=data.get('skip_conflicts') == 'on', resources=resources,
+            title=data.get('title'), user_id=user.id if user else None, guest_name=data.get('guest_name'),
+            guest_phone=data.get('guest_phone'), notes=data.get('notes'))
+        if not series_id:
+            db.session.rollback()
+            dates = ', '.join(c.strftime('%d.%m.%Y %H:%M') for c in conflicts)
+            return jsonify({'status': 'error', 'message': f'Şu tarihlerde başka randevu var: {dates}', 'conflicts': [c.isoformat() for c in conflicts]}), 400
+        enqueue_series(series_id)
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': 'Randevu serisi oluşturuldu!', 'series_id': series_id, 'skipped': [c.isoformat() for c in conflicts]})
+    except (RecurrenceError, UnknownProcedure) as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@admin_bp.route('/api/appointments/<int:id>/series/update', methods=['POST'])
+@query_budget(17)
+@login_required
+def update_appointment_series(id):
+    """Bu randevuyu ve serideki sonrakileri tek seferde günceller."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    appt = Appointment.query.get_or_404(id)
+    if not appt.series_id: return jsonify({'status': 'error', 'message': 'Bu randevu bir seriye ait değil.'}), 400
+    try:
+        data = request.form
+        check_version(appt, data.get('version'))
+        shift, duration = None, None
+        if data.get('appt_date') and data.get('appt_time'):
+            new_start = datetime.strptime(f"{data.get('appt_date')} {data.get('appt_time')}", '%Y-%m-%d %H:%M')
+            shift = new_start - appt.start_time
+        if data.get('title') and data.get('title') != appt.title:
+            duration = block_minutes(get_procedure(data.get('title')))
+        freed = following_intervals(appt) if shift or duration else []
+        cancel_reminders(following_ids(appt))
+        count, conflicts = update_following(appt, shift=shift or None, duration=duration, title=data.get('title') or None,
+                                            guest_name=data.get('guest_name') or None, guest_phone=data.get('guest_phone') or None, notes=data.get('notes') or None)
+        if conflicts:
+            db.session.rollback()
+            dates = ', '.join(c.strftime('%d.%m.%Y %H:%M') for c in conflicts)
+            return jsonify({'status': 'error', 'message': f'Çakışma var: {dates}'}), 400
+        enqueue_series(appt.series_id, from_start=appt.start_time + (shift or timedelta(0)))
+        promote(freed, resources=appt.resources)
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': f'{count} randevu güncellendi.'})
+    except CONFLICTS: return conflict_response(Appointment, id, Appointment.to_dict)
+    except (RecurrenceError, UnknownProcedure) as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@admin_bp.route('/api/appointments/<int:id>/series/cancel', methods=['POST'])
+@query_budget(15)
+@login_required
+def cancel_appointment_series(id):
+    """Bu randevuyu ve serideki sonrakileri iptal eder."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    appt = Appointment.query.get_or_404(id)
+    if not appt.series_id: return jsonify({'status': 'error', 'message': 'Bu randevu bir seriye ait değil.'}), 400
+    try: check_version(appt, request.form.get('version'))
+    except CONFLICTS: return conflict_response(Appointment, id, Appointment.to_dict)
+    freed = following_intervals(appt)
+    cancel_reminders(following_ids(appt))
+    count = cancel_following(appt)
+    promote(freed, resources=appt.resources)
+    db.session.commit()
+    return jsonify({'status': 'success', 'message': f'{count} randevu iptal edildi.'})
+
 @admin_bp.route('/api/patient/<int:user_id>/add_treatment', methods=['POST'])
+@query_budget(3)
 @login_required
 def add_treatment(user_id):
     try:
@@ -160,8 +345,188 @@ def add_treatment(user_id):
 
 # --- AYARLAR SAYFASI ---
 @admin_bp.route('/admin/settings')
+@query_budget(2)
 @login_required
 def settings():
     if not current_user.is_admin:
         return redirect(url_for('user.dashboard'))
-    return render_template('admin_settings.html')
\ No newline at end of file
+    return render_template('admin_settings.html')
+
+# --- ZAMANLANMIŞ GÖREVLER ---
+@admin_bp.route('/admin/jobs')
+@query_budget(9)
+@login_required
+def jobs():
+    if not current_user.is_admin: return redirect(url_for('user.dashboard'))
+    runs = JobRun.query.order_by(JobRun.started_at.desc()).limit(50).all()
+    return render_template('admin_jobs.html', jobs=JOBS, last_runs=last_runs(), runs=runs, outbox=outbox_stats())
+
+@admin_bp.route('/admin/jobs/<name>/run', methods=['POST'])
+@query_budget(13)
+@login_required
+def run_job_now(name):
+    if not current_user.is_admin: abort(403)
+    if name not in JOBS: abort(404)
+    run = run_job(name)
+    if run is None:
+        flash('Görev şu anda başka bir worker tarafından çalıştırılıyor.', 'error')
+    elif run.status == 'error':
+        flash(f'Görev hata verdi: {run.error}', 'error')
+    else:
+        flash(f'{name} tamamlandı: {run.rows_affected} satır, {run.duration_ms:.0f} ms', 'success')
+    return redirect(url_for('admin.jobs'))
+
+@admin_bp.route('/api/admin/outbox/stats')
+@query_budget(7)
+@login_required
+def outbox_stats_api():
+    """Hatırlatma kuyruğu metrikleri (izleme için)."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(outbox_stats())
+
+# --- BEKLEME LİSTESİ ---
+@admin_bp.route('/api/admin/waitlist')
+@query_budget(3)
+@login_required
+def waitlist():
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    entries = WaitlistEntry.query.filter(WaitlistEntry.status.in_(('waiting', 'offered'))).order_by(WaitlistEntry.created_at).all()
+    return jsonify([e.to_dict() for e in entries])
+
+@admin_bp.route('/api/admin/waitlist/add', methods=['POST'])
+@query_budget(5)
+@login_required
+def add_to_waitlist():
+    """Dolu saat isteyen hastayı bekleme listesine alır (earliest / latest: 'YYYY-MM-DDTHH:MM')."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    try:
+        data = request.form
+        earliest = datetime.strptime(data.get('earliest'), '%Y-%m-%dT%H:%M')
+        latest = datetime.strptime(data.get('latest'), '%Y-%m-%dT%H:%M')
+        user = get_or_create_patient(data.get('guest_phone'), data.get('guest_name'))
+        procedure = get_procedure(data.get('title'))
+        entry = add_entry(procedure['name'], block_minutes(procedure), earliest, latest,
+                          user_id=user.id if user else None, name=data.get('guest_name'), phone=data.get('guest_phone'))
+        entry_id = entry.id
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': 'Bekleme listesine eklendi.', 'id': entry_id})
+    except (WaitlistError, TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+@admin_bp.route('/api/admin/waitlist/<int:entry_id>/<action>', methods=['POST'])
+@query_budget(13)
+@login_required
+def waitlist_offer_action(entry_id, action):
+    """Telefonla gelen onay/ret (hasta adına)."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    if action not in ('accept', 'decline'): abort(404)
+    try:
+        if action == 'accept':
+            accept_offer(entry_id)
+        else:
+            decline_offer(entry_id)
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': 'Randevu onaylandı.' if action == 'accept' else 'Teklif reddedildi.'})
+    except WaitlistError as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+# --- KAYNAKLAR (HEKİM / KOLTUK / ODA) ---
+@admin_bp.route('/api/admin/resources')
+@query_budget(3)
+@login_required
+def resources():
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify([r.to_dict() for r in Resource.query.order_by(Resource.kind, Resource.name).all()])
+
+@admin_bp.route('/api/admin/resources/create', methods=['POST'])
+@query_budget(3)
+@login_required
+def create_resource():
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    if request.form.get('kind') not in RESOURCE_KINDS or not request.form.get('name'):
+        return jsonify({'status': 'error', 'message': 'Geçersiz kaynak.'}), 400
+    db.session.add(Resource(name=request.form.get('name'), kind=request.form.get('kind'), active=True))
+    db.session.commit()
+    return jsonify({'status': 'success', 'message': 'Kaynak eklendi.'})
+
+@admin_bp.route('/api/admin/resources/<int:resource_id>/toggle', methods=['POST'])
+@query_budget(4)
+@login_required
+def toggle_resource(resource_id):
+    """Kaynağı devre dışı bırakır / açar (geçmiş randevular korunur)."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    resource = Resource.query.get_or_404(resource_id)
+    resource.active = active = not resource.active
+    db.session.commit()
+    return jsonify({'status': 'success', 'active': active})
+
+# --- İŞLEM KATALOĞU ---
+@admin_bp.route('/admin/procedures')
+@query_budget(3)
+@login_required
+def procedure_catalog():
+    if not current_user.is_admin: return redirect(url_for('user.dashboard'))
+    items = Procedure.query.order_by(Procedure.sort_order, Procedure.name).all()
+    return render_template('admin_procedures.html', items=items, resource_kinds=RESOURCE_KINDS)
+
+@admin_bp.route('/admin/procedures/save', methods=['POST'])
+@query_budget(10)  # 6 + ilk kayıtta varsayılanların yazılması (kontrol, toplu INSERT, sürüm damgası)
+@login_required
+def save_procedure():
+    """İşlem ekler / günceller ve önbellek sürümünü artırır (tüm worker'lar yeniler).
+
+    Katalog hiç doldurulmamışsa ilk kayıtta varsayılan işlemler de yazılır.
+    """
+    if not current_user.is_admin: abort(403)
+    data = request.form
+    if not procedures(include_inactive=True):  # Önbellekten: dolu katalogda ek sorgu yok
+        seed_defaults()
+    item = Procedure.query.get_or_404(int(data.get('id'))) if data.get('id') else Procedure()
+    try:
+        item.name = data.get('name', '').strip()
+        item.icon = data.get('icon') or None
+        item.duration = int(data.get('duration') or 0)
+        item.buffer_minutes = int(data.get('buffer_minutes') or 0)
+        item.price = float(data.get('price') or 0)
+        item.sort_order = int(data.get('sort_order') or 0)
+        item.required_resources = ','.join(k for k in data.getlist('required_resources') if k in RESOURCE_KINDS)
+        item.active = data.get('active') == 'on'
+        validate_procedure(item)
+        db.session.add(item)
+        bump_version()
+        db.session.commit()
+        flash(f'{item.name} kaydedildi.', 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(f'Kaydedilemedi: {e}', 'error')
+    return redirect(url_for('admin.procedure_catalog'))
+
+# --- DENETİM KAYDI ---
+@admin_bp.route('/api/admin/audit')
+@query_budget(3)
+@login_required
+def audit_log():
+    """?entity=appointment&entity_id=5 ya da ?actor_id=1; sonraki sayfa için ?before=<next>."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    args = request.args
+    rows, next_id = history(
+        entity=args.get('entity'), entity_id=args.get('entity_id', type=int), actor_id=args.get('actor_id', type=int),
+        before=args.get('before', type=int), limit=min(args.get('limit', PAGE_SIZE, type=int), 200))
+    return jsonify({'items': [r.to_dict() for r in rows], 'next': next_id})
+
+# --- ANALİZ (KOLTUK DOLULUĞU) ---
+@admin_bp.route('/api/admin/analytics/utilization')
+@query_budget(7)
+@login_required
+def utilization_analytics():
+    """?from=2025-01&to=2025-12 (varsayılan son 12 ay). Isı haritası ve işlem x ay yükü."""
+    if not current_user.is_admin: return jsonify({'error': 'Unauthorized'}), 403
+    first, last = default_range()
+    try:
+        if request.args.get('from'): first = parse_month(request.args['from'])
+        if request.args.get('to'): last = parse_month(request.args['to'])
+        return jsonify(utilization(first, last))
+    except AnalyticsError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
@@ -6,11 +6,19 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import User
 from app.extensions import db
+from app.query_budget import query_budget
 
 auth_bp = Blueprint('auth', __name__)
 
+# Clerk Backend API (yük testlerinde sahte sunucuya yönlendirilebilir)
+CLERK_API = os.environ.get('CLERK_API_URL', 'https://api.clerk.com/v1')
+CLERK_TIMEOUT = 10 # saniye
+# Clerk ile girişte yönetici rolü alan adresler
+ADMIN_EMAILS = {'esranildogan@gmail.com'}
+
 @auth_bp.route('/')
 @auth_bp.route('/login')
+@query_budget(2)
 def login():
     # Eğer kullanıcı zaten içerideyse (ve çıkış yapmıyorsa) yönlendir
     force_signout = request.args.get('force_signout')
@@ -36,22 +44,30 @@ def decode_clerk_token(token):
         return json.loads(base64.urlsafe_b64decode(payload_b64))
     except: return None
 
+def primary_email(clerk_user):
+    """Clerk /users/<id> yanıtındaki ilk e-posta adresi."""
+    emails = clerk_user.get('email_addresses', [])
+    return emails[0].get('email_address') if emails else None
+
+def clerk_role(email):
+    return 'admin' if email in ADMIN_EMAILS else 'patient'
+
 def get_clerk_user_email(user_id):
     try:
         secret_key = os.environ.get('CLERK_SECRET_KEY')
         if not secret_key: return None
         
         headers = {'Authorization': f'Bearer {secret_key}'}
-        response = requests.get(f"https://api.clerk.com/v1/users/{user_id}", headers=headers)
+        response = requests.get(f"{CLERK_API}/users/{user_id}", headers=headers, timeout=CLERK_TIMEOUT)
         
         if response.status_code == 200:
-            emails = response.json().get('email_addresses', [])
-            if emails: return emails[0].get('email_address')
+            return primary_email(response.json())
     except Exception as e:
         print(f"API Error: {e}")
     return None
 
 @auth_bp.route('/auth/check-clerk')
+@query_budget(3)
 def check_clerk_session():
     token = request.cookies.get('__session')
     if not token:
@@ -69,9 +85,7 @@ def check_clerk_session():
     print(f"--- GİRİŞ YAPAN: {email} ---")
 
     # Rol Belirleme
-    target_role = 'patient'
-    if email == 'esranildogan@gmail.com':
-        target_role = 'admin'
+    target_role = clerk_role(email)
 
     # Kullanıcı İşlemleri
     user = User.query.filter_by(username=email).first()
@@ -88,6 +102,7 @@ def check_clerk_session():
     return redirect(url_for('admin.dashboard' if user.role == 'admin' else 'user.dashboard'))
 
 @auth_bp.route('/logout')
+@query_budget(2)
 @login_required
 def logout():
     logout_user()
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask_login import login_required, current_user
+from sqlalchemy import exists, literal, update, func
+from app.models import Session, Reservation, Member
+from app.extensions import db
+from app.query_budget import query_budget
+from app.utils import week_bounds, make_days, time_range
+
+calendar_bp = Blueprint('calendar', __name__)
+
+def parse_anchor(value):
+    """?d= / ?week_start= parametresini datetime'a çevirir, hatalıysa bugün."""
+    try:
+        return datetime.fromisoformat(value) if value else datetime.now()
+    except ValueError:
+        return datetime.now()
+
+def week_sessions(week_start, week_end, member_name=None):
+    """Sadece gösterilen haftanın seansları; 'katıldım' bayrağı aynı sorguda EXISTS ile hesaplanır."""
+    if member_name:
+        joined = exists().where(
+            Reservation.session_id == Session.id,
+            Reservation.user_name == member_name,
+            Reservation.status == 'active',
+        )
+    else:
+        joined = literal(False)
+    rows = (
+        db.session.query(Session, joined.label('joined'))
+        .filter(Session.date >= week_start.date(), Session.date < week_end.date())
+        .order_by(Session.date.asc(), Session.time.asc())
+        .all()
+    )
+    sessions = []
+    for s, is_joined in rows:
+        s.user_joined = bool(is_joined)
+        sessions.append(s)
+    return sessions
+
+def build_grid(anchor):
+    """Takvim şablonları için ortak bağlam (günler, saatler, hücre eşlemesi)."""
+    week_start, week_end = week_bounds(anchor)
+    role = 'admin' if current_user.is_admin else 'member'
+    member_name = None if role == 'admin' else current_user.full_name
+    by_cell = defaultdict(list)
+    for s in week_sessions(week_start, week_end, member_name):
+        by_cell[(s.date.isoformat(), s.time.strftime('%H:%M'))].append(s)
+    return {
+        'days': make_days(week_start),
+        'slots': time_range(start_h=8, end_h=21, step_min=60),
+        'by_cell': by_cell,
+        'role': role,
+        'week_start': week_start,
+    }
+
+# --- GRUP SEANSI TAKVİMİ ---
+@calendar_bp.route('/sessions/calendar')
+@query_budget(3)
+@login_required
+def sessions_calendar():
+    ctx = build_grid(parse_anchor(request.args.get('d')))
+    week_start = ctx['week_start']
+    return render_template(
+        'group_calendar.html',
+        prev_week=(week_start - timedelta(days=7)).date().isoformat(),
+        next_week=(week_start + timedelta(days=7)).date().isoformat(),
+        week_label=f"{week_start.strftime('%d.%m.%Y')} - {(week_start + timedelta(days=5)).strftime('%d.%m.%Y')}",
+        **ctx,
+    )
+
+# AJAX ile hafta değiştirirken sadece grid
+@calendar_bp.route('/calendar/grid')
+@query_budget(3)
+@login_required
+def calendar_grid():
+    ctx = build_grid(parse_anchor(request.args.get('week_start')))
+    return render_template('_calendar_grid.html', **ctx)
+
+# Üye grid'deki "Rezerve Et" formu
+@calendar_bp.route('/reserve/<int:session_id>', methods=['POST'])
+@query_budget(7)
+@login_required
+def reserve(session_id):
+    """Seansa kayıt: kredi ve mükerrer kontrolü, ardından boş yer koşullu UPDATE ile düşülür."""
+    s = db.session.get(Session, session_id) or abort(404)
+    back = redirect(url_for('calendar.sessions_calendar', d=s.date.isoformat()))
+    name = current_user.full_name
+    if s.completed or s.is_past:
+        flash('Geçmiş/bitmiş seansa kayıt olunamaz.', 'error')
+        return back
+    member = Member.query.filter(func.lower(Member.full_name) == (name or '').lower()).first()
+    if not member or (member.credits or 0) <= 0:
+        flash('Seans hakkınız kalmamış. Lütfen hocanızla iletişime geçin.', 'error')
+        return back
+    if Reservation.query.filter_by(user_name=name, session_id=session_id, status='active').first():
+        flash('Zaten bu seanstasınız.', 'info')
+        return back
+    # Aynı anda gelen iki kayıt son yeri birlikte alamasın: okunan değer değil, koşullu UPDATE
+    taken = db.session.execute(
+        update(Session)
+        .where(Session.id == session_id, Session.spots_left > 0, Session.completed.is_(False))
+        .values(spots_left=Session.spots_left - 1)
+    ).rowcount
+    if not taken:
+        flash('Bu seans dolu.', 'error')
+        return back
+    db.session.add(Reservation(user_name=name, session_id=session_id, status='active'))
+    db.session.commit()
+    flash('Kayıt oluşturuldu ✅', 'success')
+    return back
@@ -1,31 +1,24 @@
-from flask import Blueprint, render_template, jsonify, request, redirect, url_for
+from flask import Blueprint, render_template, jsonify, request, redirect, url_for, abort
 from flask_login import login_required, current_user
-from app.models import Appointment
+from app.models import Appointment, WaitlistEntry, Resource
 from app.extensions import db
+from app.query_budget import query_budget
+from app.outbox import enqueue_reminders
+from app.waitlist import add_entry, accept_offer, decline_offer, WaitlistError
+from app.resources import assign, find_slots, requested_resources, overlapping
+from app.feeds import feed_response, parse_range
+from app.idempotency import idempotent, remember
+from app.offline import service_worker_response
+from app.ics import calendar_response, user_for_token, ensure_token, rotate_token
+from flask_wtf.csrf import generate_csrf
+from app.catalog import get_procedure, block_length, block_minutes, UnknownProcedure
 from datetime import datetime, timedelta
 
 user_bp = Blueprint('user', __name__)
 
-# İşlem Süreleri
-PROCEDURE_DURATIONS = {
-    'Muayene': 30,
-    'Diş Taşı Temizliği': 30,
-    'Diş Çekimi': 30,
-    'Dolgu': 45,
-    'Kanal Tedavisi': 60,
-    'İmplant': 90
-}
-
-def check_conflict(start, end):
-    """Çakışma kontrolü: İptal edilmemiş herhangi bir randevu ile çakışıyor mu?"""
-    return Appointment.query.filter(
-        Appointment.start_time < end,
-        Appointment.end_time > start,
-        Appointment.status != 'cancelled'
-    ).first()
-
 # --- HASTA PANELİ (DASHBOARD) ---
 @user_bp.route('/dashboard')
+@query_budget(3)
 @login_required
 def dashboard():
     # Sadece hastanın KENDİ randevularını getir
@@ -40,36 +33,41 @@ def dashboard():
                          today=datetime.now()) 
 
 # --- TAKVİM VERİSİ (GİZLİLİK FİLTRELİ) ---
+# Hasta takvimi akışı (kompakt biçimde sütun türleri; bkz. app/feeds.py)
+USER_FEED = {'id': 'raw', 'title': 'dict', 'start': 'time', 'end': 'time', 'color': 'dict', 'display': 'dict', 'is_mine': 'raw'}
+
+def user_feed_row(appt, user_id):
+    """Hasta takvimi satırı (ASGI katmanı da kullanır)."""
+    # Bu randevu benim mi?
+    is_mine = (appt.user_id == user_id)
+    return {
+        'id': appt.id,
+        # Başkasının randevusuysa ismini gizle, 'DOLU' yaz
+        'title': appt.title if is_mine else "DOLU",
+        'start': appt.start_time,
+        'end': appt.end_time,
+        # Benimki İndigo (Mavi), Başkasınınki Gri
+        'color': '#4f46e5' if is_mine else '#9ca3af',
+        'display': 'block',
+        'is_mine': is_mine # Frontend'de tıklamayı yönetmek için
+    }
+
 @user_bp.route('/api/user/calendar')
+@query_budget(3)
 @login_required
 def get_calendar_events():
-    # Tüm aktif randevuları çek
-    all_appointments = Appointment.query.filter(Appointment.status != 'cancelled').all()
-    events = []
-    
-    for appt in all_appointments:
-        # Bu randevu benim mi?
-        is_mine = (appt.user_id == current_user.id)
-        
-        events.append({
-            'id': appt.id,
-            # Başkasının randevusuysa ismini gizle, 'DOLU' yaz
-            'title': appt.title if is_mine else "DOLU", 
-            'start': appt.start_time.isoformat(),
-            'end': appt.end_time.isoformat(),
-            # Benimki İndigo (Mavi), Başkasınınki Gri
-            'color': '#4f46e5' if is_mine else '#9ca3af', 
-            'display': 'block',
-            'extendedProps': {
-                'is_mine': is_mine # Frontend'de tıklamayı yönetmek için
-            }
-        })
-        
-    return jsonify(events)
+    # Görünen aralıktaki aktif randevular (?resource=ID ile tek hekim/koltuk)
+    start, end = parse_range()
+    query = overlapping(start, end) if start and end else Appointment.query.filter(Appointment.status != 'cancelled')
+    if request.args.get('resource'):
+        query = query.filter(Appointment.resources.any(Resource.id == request.args.get('resource', type=int)))
+    return feed_response([user_feed_row(appt, current_user.id) for appt in query.all()], USER_FEED)
 
 # --- RANDEVU OLUŞTURMA ---
 @user_bp.route('/api/user/appointment/create', methods=['POST'])
+@query_budget(10)
 @login_required
+@idempotent # Çevrimdışı kuyruktan tekrar gönderilebilir (Idempotency-Key)
 def create_appointment():
     try:
         data = request.form
@@ -79,11 +77,12 @@ def create_appointment():
         
         # 1. Zamanı Hesapla
         start_time = datetime.strptime(f"{date_part} {time_part}", '%Y-%m-%d %H:%M')
-        duration = PROCEDURE_DURATIONS.get(title, 30)
-        end_time = start_time + timedelta(minutes=duration)
+        procedure = get_procedure(title)
+        end_time = start_time + block_length(procedure)
         
-        # 2. Çakışma Kontrolü
-        if check_conflict(start_time, end_time):
+        # 2. Çakışma Kontrolü: İşlemin gerektirdiği kaynaklar (hekim, koltuk) aynı anda boş olmalı
+        resources = assign(start_time, end_time, requested_resources(data), kinds=procedure['required_resources'])
+        if resources is None:
             return jsonify({'status': 'error', 'message': 'Seçtiğiniz saat maalesef dolu. Lütfen başka bir saat seçin.'}), 400
             
         # 3. Kayıt (current_user.id ile otomatik bağla)
@@ -95,13 +94,117 @@ def create_appointment():
             guest_name=current_user.full_name, 
             guest_phone=current_user.phone,
             notes=data.get('notes'),
-            status='confirmed'
+            status='confirmed',
+            resources=resources
         )
         
         db.session.add(new_appt)
+        enqueue_reminders(new_appt) # Hatırlatmalar aynı transaction'da kuyruğa
+        payload = remember({'status': 'success', 'message': 'Randevunuz başarıyla oluşturuldu!'})
         db.session.commit()
         
-        return jsonify({'status': 'success', 'message': 'Randevunuz başarıyla oluşturuldu!'})
+        return jsonify(payload)
         
+    except UnknownProcedure as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# --- ÇEVRİMDIŞI (SERVICE WORKER) ---
+@user_bp.route('/sw.js')
+@query_budget(2) # Oturum açıksa kullanıcı yüklenir
+def service_worker():
+    """Hasta paneli service worker'ı; kapsamı tüm site olsun diye kökten sunulur."""
+    return service_worker_response()
+
+@user_bp.route('/api/user/csrf-token')
+@query_budget(2)
+@login_required
+def csrf_token():
+    """Önbellekten açılan sayfanın ve çevrimdışı kuyruğun güncel CSRF token'ı."""
+    response = jsonify({'csrf_token': generate_csrf()})
+    response.cache_control.no_store = True
+    return response
+
+# --- TAKVİM ABONELİĞİ (.ics) ---
+@user_bp.route('/calendar/<token>.ics')
+@query_budget(4)
+def calendar_feed(token):
+    """Telefon takvimlerinin abone olduğu akış; oturum yerine adresteki anahtar ile."""
+    user = user_for_token(token)
+    if not user:
+        abort(404)
+    return calendar_response(user)
+
+@user_bp.route('/api/user/calendar-subscription', methods=['POST'])
+@query_budget(3)
+@login_required
+def calendar_subscription():
+    """Abonelik adresi (yoksa oluşturulur); ?reset=1 eski adresi geçersiz kılar."""
+    token = rotate_token(current_user) if request.args.get('reset') else ensure_token(current_user)
+    db.session.commit()
+    url = url_for('user.calendar_feed', token=token, _external=True)
+    return jsonify({'url': url, 'webcal': 'webcal://' + url.split('://', 1)[1]})
+
+# --- MÜSAİT SAATLER ---
+@user_bp.route('/api/availability')
+@query_budget(4)
+@login_required
+def availability():
+    """Seçilen gün ve işlem için tüm kaynakların (hekim, koltuk) boş olduğu saatler."""
+    try:
+        day = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Geçersiz tarih.'}), 400
+    try:
+        procedure = get_procedure(request.args.get('title') or 'Muayene')
+    except UnknownProcedure as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    duration = block_minutes(procedure)
+    slots = find_slots(day, duration, requested_resources(request.args), kinds=procedure['required_resources'])
+    return jsonify({'date': day.isoformat(), 'duration': duration, 'slots': [s.strftime('%H:%M') for s in slots]})
+
+# --- BEKLEME LİSTESİ ---
+@user_bp.route('/api/user/waitlist')
+@query_budget(3)
+@login_required
+def my_waitlist():
+    entries = WaitlistEntry.query.filter_by(user_id=current_user.id)\
+        .filter(WaitlistEntry.status.in_(('waiting', 'offered'))).order_by(WaitlistEntry.earliest).all()
+    return jsonify([e.to_dict() for e in entries])
+
+@user_bp.route('/api/user/waitlist/join', methods=['POST'])
+@query_budget(3)
+@login_required
+def join_waitlist():
+    """Seçilen gün dolu ise hastayı o günün saat aralığı için sıraya alır."""
+    try:
+        data = request.form
+        earliest = datetime.strptime(f"{data.get('appt_date')} {data.get('from_time') or '09:00'}", '%Y-%m-%d %H:%M')
+        latest = datetime.strptime(f"{data.get('appt_date')} {data.get('to_time') or '18:00'}", '%Y-%m-%d %H:%M')
+        procedure = get_procedure(data.get('title'))
+        add_entry(procedure['name'], block_minutes(procedure), earliest, latest,
+                  user_id=current_user.id, name=current_user.full_name, phone=current_user.phone)
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': 'Bekleme listesine alındınız. Yer açılınca SMS ile haber vereceğiz.'})
+    except (WaitlistError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+@user_bp.route('/api/user/waitlist/<int:entry_id>/<action>', methods=['POST'])
+@query_budget(13)
+@login_required
+def answer_offer(entry_id, action):
+    if action not in ('accept', 'decline'): return jsonify({'status': 'error', 'message': 'Geçersiz işlem.'}), 404
+    if not WaitlistEntry.query.filter_by(id=entry_id, user_id=current_user.id).first():
+        return jsonify({'status': 'error', 'message': 'Teklif bulunamadı.'}), 404
+    try:
+        if action == 'accept':
+            accept_offer(entry_id)
+        else:
+            decline_offer(entry_id)
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': 'Randevunuz onaylandı!' if action == 'accept' else 'Teklif reddedildi.'})
+    except WaitlistError as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
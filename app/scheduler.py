@@ -0,0 +1,195 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import JobLock, JobRun
+from app.tenancy import for_each_tenant
+from app.audit import source as audit_source
+
+# Kayıtlı görevler: isim -> {'func', 'every' (saniye), 'description', 'per_tenant'}
+JOBS = {}
+
+# Worker çökerse kilit bu süreden sonra başkası tarafından alınabilir
+LOCK_TTL = timedelta(minutes=10)
+TICK_SECONDS = 30
+
+
+def job(name, every, description='', per_tenant=True):
+    """Fonksiyonu `every` saniyede bir çalışacak görev olarak kaydeder.
+
+    Görev fonksiyonu etkilenen satır sayısını döndürmelidir. per_tenant açıksa
+    görev her klinik için ayrı kapsamda çalışır (bkz. app/tenancy.py).
+    """
+    def decorator(f):
+        JOBS[name] = {'func': f, 'every': every, 'description': description, 'per_tenant': per_tenant}
+        return f
+    return decorator
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def acquire_lock(name, owner, ttl=LOCK_TTL):
+    """Kilidi atomik olarak alır. Başka bir worker tutuyorsa False döner."""
+    now = datetime.utcnow()
+    taken = db.session.execute(
+        update(JobLock)
+        .where(JobLock.name == name, (JobLock.locked_until < now) | (JobLock.owner == owner))
+        .values(owner=owner, locked_until=now + ttl)
+    ).rowcount
+    if not taken:
+        try:
+            db.session.add(JobLock(name=name, owner=owner, locked_until=now + ttl))
+            db.session.flush()
+            taken = 1
+        except IntegrityError:
+            db.session.rollback()
+            return False
+    db.session.commit()
+    return bool(taken)
+
+
+def release_lock(name, owner):
+    db.session.execute(
+        update(JobLock).where(JobLock.name == name, JobLock.owner == owner).values(owner=None, locked_until=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def _is_due(name, now):
+    last = db.session.query(func.max(JobRun.started_at)).filter(JobRun.job_name == name).scalar()
+    return last is None or last + timedelta(seconds=JOBS[name]['every']) <= now
+
+
+def run_job(name, only_if_due=False):
+    """Görevi kilit altında çalıştırır ve JobRun kaydı tutar.
+
+    Kilit başka bir worker'daysa None döner. only_if_due açıksa son çalışma kilit
+    alındıktan sonra yeniden okunur: kilidi bizden hemen önce bırakan worker görevi
+    az önce çalıştırdıysa görev tekrarlanmaz (None döner).
+    """
+    owner = worker_id()
+    if not acquire_lock(name, owner):
+        return None
+    if only_if_due and not _is_due(name, datetime.utcnow()):
+        release_lock(name, owner)
+        return None
+    run = JobRun(job_name=name, worker=owner, started_at=datetime.utcnow())
+    db.session.add(run)
+    db.session.commit()
+    started = time.perf_counter()
+    try:
+        spec = JOBS[name]
+        with audit_source(f'job:{name}'):
+            run.rows_affected = (for_each_tenant(spec['func']) if spec['per_tenant'] else spec['func']()) or 0
+        run.status = 'success'
+    except Exception as e:
+        db.session.rollback()
+        run.status = 'error'
+        run.error = str(e)
+        current_app.logger.exception(f"Görev hatası: {name}")
+    run.duration_ms = (time.perf_counter() - started) * 1000
+    run.finished_at = datetime.utcnow()
+    db.session.add(run)
+    db.session.commit()
+    release_lock(name, owner)
+    return run
+
+
+def last_runs():
+    """Her görevin son çalışma zamanı (tek gruplu sorgu)."""
+    rows = db.session.query(JobRun.job_name, func.max(JobRun.started_at)).group_by(JobRun.job_name).all()
+    return dict(rows)
+
+
+def run_due_jobs():
+    """Zamanı gelmiş tüm görevleri çalıştırır.
+
+    `last_runs()` yalnızca ön elemedir; asıl kontrol kilit altında `run_job` içinde yapılır.
+    """
+    now = datetime.utcnow()
+    last = last_runs()
+    ran = []
+    for name, spec in JOBS.items():
+        if name in last and last[name] + timedelta(seconds=spec['every']) > now:
+            continue
+        if run_job(name, only_if_due=True):
+            ran.append(name)
+    return ran
+
+
+class SchedulerThread(threading.Thread):
+    """Uygulama süreci içinde çalışan görev döngüsü."""
+    def __init__(self, app, tick=TICK_SECONDS):
+        super().__init__(name='scheduler', daemon=True)
+        self.app = app
+        self.tick = tick
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            with self.app.app_context():
+                try:
+                    run_due_jobs()
+                except Exception:
+                    self.app.logger.exception("Zamanlayıcı döngüsü hatası")
+                finally:
+                    db.session.remove()
+            self.stopped.wait(self.tick)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def init_scheduler(app):
+    """CLI komutlarını ekler; SCHEDULER_ENABLED açıksa ilk istekte arka plan döngüsünü başlatır.
+
+    Ayrı bir süreçte çalıştırmak için: `flask jobs worker`
+    """
+    from app import jobs  # noqa: F401  (görevleri kaydeder)
+
+    @app.cli.group('jobs')
+    def jobs_cli():
+        """Bakım görevleri."""
+
+    @jobs_cli.command('list')
+    def list_jobs():
+        for name, spec in JOBS.items():
+            click.echo(f"{name:<28} her {spec['every']}s  {spec['description']}")
+
+    @jobs_cli.command('run')
+    @click.argument('name', required=False)
+    def run_jobs(name):
+        """Tek bir görevi ya da zamanı gelmiş tüm görevleri çalıştırır."""
+        if name:
+            run = run_job(name)
+            click.echo(f"{name}: {'kilitli' if run is None else run.status}")
+        else:
+            click.echo(f"Çalışan görevler: {', '.join(run_due_jobs()) or '-'}")
+
+    @jobs_cli.command('worker')
+    @click.option('--tick', default=TICK_SECONDS, help='Kontrol aralığı (saniye)')
+    def worker(tick):
+        """Görevleri ayrı bir süreçte (sidecar) sürekli çalıştırır."""
+        click.echo(f"Zamanlayıcı başladı ({worker_id()})")
+        SchedulerThread(app, tick=tick).run()
+
+    if not app.config.get('SCHEDULER_ENABLED'):
+        return
+    state = {'lock': threading.Lock()}
+
+    @app.before_request
+    def _start_scheduler():
+        if 'thread' in state:
+            return
+        with state['lock']:
+            if 'thread' not in state:
+                state['thread'] = SchedulerThread(app)
+                state['thread'].start()
@@ -0,0 +1,45 @@
+// Takvim akışı: sunucudan kompakt (sütun bazlı) biçimi ister ve FullCalendar olaylarına çevirir.
+// Biçim için bkz. app/feeds.py. Sunucu klasik listeyle dönerse olduğu gibi kullanılır.
+(function() {
+  const COMPACT_TYPE = 'application/vnd.klinik.events+json';
+  // FullCalendar'ın tanıdığı alanlar; gerisi extendedProps'a girer
+  const TOP_LEVEL = ['id', 'title', 'start', 'end', 'color', 'display'];
+
+  function decodeEvents(payload) {
+    if (Array.isArray(payload)) return payload;
+    const [y, m, d] = payload.base.split('-').map(Number);
+    const count = payload.columns.length ? payload.columns[0].length : 0;
+    const events = [];
+    for (let i = 0; i < count; i++) events.push({ extendedProps: {} });
+
+    payload.fields.forEach(function([field, kind], c) {
+      const table = payload.dicts[field];
+      const topLevel = TOP_LEVEL.includes(field);
+      payload.columns[c].forEach(function(value, i) {
+        if (kind === 'dict') value = table[value];
+        // Yerel duvar saati: gün + dakika (Date taşan dakikaları kendisi düzeltir)
+        else if (kind === 'time') value = new Date(y, m - 1, d, 0, value);
+        if (topLevel) events[i][field] = value;
+        else events[i].extendedProps[field] = value;
+      });
+    });
+    return events;
+  }
+
+  // FullCalendar olay kaynağı: events: eventFeed('/api/appointments')
+  function eventFeed(url) {
+    return function(info, success, failure) {
+      const params = new URLSearchParams({ start: info.startStr, end: info.endStr });
+      fetch(url + (url.includes('?') ? '&' : '?') + params, { headers: { 'Accept': COMPACT_TYPE } })
+        .then(function(res) {
+          if (!res.ok) throw new Error(res.statusText);
+          return res.json(); // gzip'i tarayıcı açar
+        })
+        .then(function(payload) { success(decodeEvents(payload)); })
+        .catch(failure);
+    };
+  }
+
+  window.eventFeed = eventFeed;
+  window.decodeEvents = decodeEvents;
+})();
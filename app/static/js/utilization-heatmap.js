@@ -0,0 +1,94 @@
+// Yönetim paneli: koltuk doluluğu ısı haritası (haftanın günü x 15 dk) ve işlemlere göre aylık yük.
+// Veri: /api/admin/analytics/utilization (bkz. app/analytics.py)
+(function() {
+  const DAYS = ['Pzt', 'Sal', 'Çar', 'Per', 'Cum', 'Cmt', 'Paz'];
+  // Hiç randevu yoksa gösterilen saatler
+  const DEFAULT_HOURS = [9, 19];
+
+  function monthParam(date) {
+    return date.getFullYear() + '-' + String(date.getMonth() + 1).padStart(2, '0');
+  }
+
+  function slotLabel(slot, minutes) {
+    const total = slot * minutes;
+    return String(Math.floor(total / 60)).padStart(2, '0') + ':' + String(total % 60).padStart(2, '0');
+  }
+
+  function shade(value, max) {
+    if (!value) return '#f8fafc';
+    return 'rgba(19, 127, 236, ' + (0.12 + 0.88 * Math.min(value / max, 1)).toFixed(2) + ')';
+  }
+
+  // Gösterilecek slot aralığı: herhangi bir günde dolu olan ilk ve son slot
+  function visibleSlots(heatmap, minutes) {
+    let first = Infinity, last = -1;
+    heatmap.forEach(function(row) {
+      row.forEach(function(value, slot) {
+        if (value > 0) { first = Math.min(first, slot); last = Math.max(last, slot); }
+      });
+    });
+    if (last < 0) return [DEFAULT_HOURS[0] * 60 / minutes, DEFAULT_HOURS[1] * 60 / minutes - 1];
+    return [first, last];
+  }
+
+  function renderHeatmap(el, data) {
+    const [first, last] = visibleSlots(data.heatmap, data.slot_minutes);
+    const perHour = 60 / data.slot_minutes;
+    let html = '<table class="text-xs border-separate" style="border-spacing:2px"><thead><tr><th></th>';
+    for (let slot = first; slot <= last; slot++) {
+      html += '<th class="font-medium text-[#4c739a] text-left">' + (slot % perHour === 0 ? slotLabel(slot, data.slot_minutes) : '') + '</th>';
+    }
+    html += '</tr></thead><tbody>';
+    data.heatmap.forEach(function(row, day) {
+      html += '<tr><th class="font-bold text-[#4c739a] pr-2 text-right">' + DAYS[day] + '</th>';
+      for (let slot = first; slot <= last; slot++) {
+        const pct = Math.round(row[slot] * 100);
+        html += '<td title="' + DAYS[day] + ' ' + slotLabel(slot, data.slot_minutes) + ' · %' + pct +
+                '" style="width:14px;height:22px;border-radius:3px;background:' + shade(row[slot], 1) + '"></td>';
+      }
+      html += '</tr>';
+    });
+    el.innerHTML = html + '</tbody></table>';
+  }
+
+  function renderProcedures(el, data) {
+    const rows = data.procedures.names.map(function(name, i) { return [name, data.procedures.hours[i]]; });
+    if (!rows.length) { el.innerHTML = '<p class="text-sm text-[#4c739a]">Bu aralıkta randevu yok.</p>'; return; }
+    const max = Math.max.apply(null, rows.map(function(r) { return Math.max.apply(null, r[1]); })) || 1;
+    let html = '<table class="text-xs border-separate" style="border-spacing:2px"><thead><tr><th></th>';
+    data.months.forEach(function(m) { html += '<th class="font-medium text-[#4c739a] px-1">' + m.slice(2) + '</th>'; });
+    html += '</tr></thead><tbody>';
+    rows.forEach(function([name, hours]) {
+      html += '<tr><th class="font-bold text-[#0d141b] pr-2 text-left whitespace-nowrap"></th>';
+      hours.forEach(function(h) {
+        html += '<td class="text-center px-1" style="min-width:40px;border-radius:3px;background:' + shade(h, max) + '">' + (h || '') + '</td>';
+      });
+      html += '</tr>';
+    });
+    el.innerHTML = html + '</tbody></table>';
+    // İşlem adları kullanıcı girdisi: textContent ile
+    el.querySelectorAll('tbody th').forEach(function(th, i) { th.textContent = rows[i][0]; });
+  }
+
+  function load(months) {
+    const to = new Date();
+    const from = new Date(to.getFullYear(), to.getMonth() - months + 1, 1);
+    const summary = document.getElementById('utilizationSummary');
+    fetch('/api/admin/analytics/utilization?' + new URLSearchParams({ from: monthParam(from), to: monthParam(to) }))
+      .then(function(res) { return res.json(); })
+      .then(function(data) {
+        if (data.status === 'error') throw new Error(data.message);
+        summary.textContent = data.appointments + ' randevu · ' + data.chairs + ' koltuk · ' + data.months[0] + ' – ' + data.months[data.months.length - 1];
+        renderHeatmap(document.getElementById('utilizationHeatmap'), data);
+        renderProcedures(document.getElementById('procedureLoad'), data);
+      })
+      .catch(function(err) { summary.textContent = 'Doluluk verisi alınamadı: ' + err.message; });
+  }
+
+  document.addEventListener('DOMContentLoaded', function() {
+    const range = document.getElementById('utilizationRange');
+    if (!range) return;
+    range.addEventListener('change', function() { load(Number(range.value)); });
+    load(Number(range.value));
+  });
+})();
@@ -0,0 +1,214 @@
+// Hasta paneli service worker'ı (app/offline.py tarafından /sw.js olarak sunulur)
+// - Panel sayfası ve takvim verisi: önbellekten anında, arka planda tazelenir (stale-while-revalidate)
+// - Statik dosyalar / CDN: önce önbellek (parmak izli adlar, içerik değişmez)
+// - Çevrimdışı randevu talebi: IndexedDB kuyruğuna alınır, bağlantı gelince aynı Idempotency-Key ile gönderilir
+const CONFIG = {{ config|tojson }};
+const CACHE = 'hasta-' + CONFIG.version;
+const QUEUE_DB = 'hasta-offline';
+const QUEUE_STORE = 'bookings';
+const SYNC_TAG = 'booking-queue';
+const FETCHED_AT = 'X-SW-Fetched-At';
+
+// --- KURULUM ---
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE);
+        await Promise.all(CONFIG.shell.map(async url => {
+            try {
+                const sameOrigin = new URL(url, self.location).origin === self.location.origin;
+                const res = await fetch(url, sameOrigin ? {} : { mode: 'no-cors' });
+                if (res.ok || res.type === 'opaque') await cache.put(url, res);
+            } catch (err) { /* eksik dosya kurulumu engellemez; ilk kullanımda önbelleğe girer */ }
+        }));
+        // Giriş yapılmamışsa sayfa /login'e yönlenir; o yanıt panel diye saklanmaz
+        await Promise.all(CONFIG.pages.map(async url => {
+            try {
+                const res = await fetch(url, { credentials: 'same-origin' });
+                if (res.ok && !res.redirected) await cache.put(url, res);
+            } catch (err) { }
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter(n => n.startsWith('hasta-') && n !== CACHE).map(n => caches.delete(n)));
+        await self.clients.claim();
+        await replayQueue();
+    })());
+});
+
+// --- İSTEK YÖNLENDİRME ---
+self.addEventListener('fetch', event => {
+    const req = event.request;
+    const url = new URL(req.url);
+    const sameOrigin = url.origin === self.location.origin;
+
+    if (req.method === 'POST' && sameOrigin && url.pathname === CONFIG.booking) {
+        event.respondWith(bookOrQueue(req));
+        return;
+    }
+    if (req.method !== 'GET') return;
+
+    if (req.mode === 'navigate' && sameOrigin && url.pathname === CONFIG.logout) {
+        // Çıkışta başka bir hastanın göreceği veri kalmasın
+        event.respondWith(clearAll().then(() => fetch(req)));
+        return;
+    }
+    if (req.mode === 'navigate' && sameOrigin && CONFIG.pages.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, url.pathname, req, false));
+        return;
+    }
+    if (sameOrigin && url.pathname === CONFIG.calendar) {
+        event.respondWith(staleWhileRevalidate(event, url.pathname + url.search, req, true));
+        return;
+    }
+    if ((sameOrigin && url.pathname.startsWith('/static/')) || CONFIG.shell.includes(req.url)) {
+        event.respondWith(cacheFirst(req));
+    }
+});
+
+async function cacheFirst(req) {
+    const cache = await caches.open(CACHE);
+    const hit = await cache.match(req);
+    if (hit) return hit;
+    const res = await fetch(req);
+    if (res.ok || res.type === 'opaque') cache.put(req, res.clone());
+    return res;
+}
+
+function stamped(res) {
+    // Tazelik kontrolü için önbelleğe alınma zamanı yanıt başlığına yazılır
+    const headers = new Headers(res.headers);
+    headers.set(FETCHED_AT, String(Date.now()));
+    return res.blob().then(body => new Response(body, { status: res.status, statusText: res.statusText, headers }));
+}
+
+async function staleWhileRevalidate(event, key, req, notify) {
+    const cache = await caches.open(CACHE);
+    const hit = await cache.match(key);
+    const age = hit ? Date.now() - Number(hit.headers.get(FETCHED_AT) || 0) : Infinity;
+
+    const network = fetch(req, { credentials: 'same-origin' }).then(async res => {
+        // Oturum düşmüşse (login'e yönlendirme) veya hata varsa önbellek ezilmez
+        if (!res.ok || res.redirected) return res;
+        const fresh = await stamped(res.clone());
+        if (notify && hit) {
+            const [before, after] = await Promise.all([hit.clone().text(), res.clone().text()]);
+            if (before !== after) broadcast({ type: 'calendar-updated' });
+        }
+        await cache.put(key, fresh);
+        return res;
+    });
+
+    if (!hit) {
+        return network.catch(() => notify
+            ? jsonResponse({ status: 'offline', message: 'Çevrimdışısınız; takvim verisi henüz önbellekte yok.' }, 503)
+            : Response.error());
+    }
+    if (age > CONFIG.revalidateAfter * 1000) event.waitUntil(network.catch(() => null));
+    return hit;
+}
+
+// --- ÇEVRİMDIŞI RANDEVU KUYRUĞU ---
+async function bookOrQueue(req) {
+    const copy = req.clone();
+    try {
+        return await fetch(req);
+    } catch (err) {
+        const key = copy.headers.get('Idempotency-Key');
+        if (!key) throw err; // Anahtarsız istek güvenle tekrar gönderilemez
+        const form = await copy.formData();
+        await queuePut({ key, url: copy.url, fields: [...form.entries()], queuedAt: Date.now() });
+        try { await self.registration.sync.register(SYNC_TAG); } catch (e) { /* Background Sync yoksa message/activate ile */ }
+        return jsonResponse({ status: 'queued', message: 'Çevrimdışısınız. Randevu talebiniz kaydedildi; bağlantı gelince otomatik gönderilecek.' }, 202);
+    }
+}
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) event.waitUntil(replayQueue());
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'replay-bookings') event.waitUntil(replayQueue());
+});
+
+async function replayQueue() {
+    const entries = await queueAll();
+    if (!entries.length) return;
+    let token;
+    try {
+        const res = await fetch(CONFIG.csrf, { credentials: 'same-origin', cache: 'no-store' });
+        if (!res.ok || res.redirected) return; // Oturum yok; tekrar giriş yapınca gönderilir
+        token = (await res.json()).csrf_token;
+    } catch (err) {
+        return; // Hâlâ çevrimdışı; sync olayı tekrar dener
+    }
+    for (const entry of entries) {
+        if (Date.now() - entry.queuedAt > CONFIG.queueTtl * 1000) {
+            // Sunucu bu yaştaki anahtarları silmiş olabilir; tekrar göndermek çift kayıt riski taşır
+            await queueDelete(entry.key);
+            broadcast({ type: 'booking-replayed', key: entry.key, status: 'expired',
+                        message: 'Çevrimdışı randevu talebinizin süresi doldu, lütfen yeniden oluşturun.' });
+            continue;
+        }
+        const body = new FormData();
+        entry.fields.forEach(([name, value]) => body.append(name, value));
+        let res;
+        try {
+            res = await fetch(entry.url, {
+                method: 'POST', body, credentials: 'same-origin',
+                headers: { 'X-CSRFToken': token, 'Idempotency-Key': entry.key },
+            });
+        } catch (err) {
+            return; // Bağlantı yine koptu
+        }
+        if (res.status >= 500 || res.status === 409) continue; // Geçici hata / hâlâ işleniyor: kuyrukta kalır
+        await queueDelete(entry.key);
+        let data = {};
+        try { data = await res.json(); } catch (err) { }
+        broadcast({ type: 'booking-replayed', key: entry.key, status: data.status || 'error', message: data.message });
+    }
+}
+
+// --- IndexedDB ---
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(QUEUE_DB, 1);
+        open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, { keyPath: 'key' });
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+async function queueTx(mode, work) {
+    const db = await openQueue();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(QUEUE_STORE, mode);
+        const req = work(tx.objectStore(QUEUE_STORE));
+        tx.oncomplete = () => { db.close(); resolve(req && req.result); };
+        tx.onerror = () => { db.close(); reject(tx.error); };
+    });
+}
+
+const queuePut = entry => queueTx('readwrite', store => store.put(entry));
+const queueDelete = key => queueTx('readwrite', store => store.delete(key));
+const queueAll = () => queueTx('readonly', store => store.getAll()).then(rows => rows || []);
+
+// --- YARDIMCILAR ---
+function jsonResponse(data, status) {
+    return new Response(JSON.stringify(data), { status, headers: { 'Content-Type': 'application/json' } });
+}
+
+async function broadcast(message) {
+    const clients = await self.clients.matchAll({ type: 'window' });
+    clients.forEach(client => client.postMessage(message));
+}
+
+async function clearAll() {
+    const names = await caches.keys();
+    await Promise.all(names.filter(n => n.startsWith('hasta-')).map(n => caches.delete(n)));
+    await queueTx('readwrite', store => store.clear()).catch(() => null);
+}
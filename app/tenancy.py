@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+import click
+from flask import g, request, session, abort, current_app, has_app_context
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import with_loader_criteria
+from sqlalchemy.sql.util import find_tables
+from app.extensions import db, RoutingSession
+from app.models import Clinic, TenantScoped
+
+# Kliniğe ait tablolar (ayrı dosya kullanan şubelerde bu tablolar o dosyada durur)
+TENANT_TABLES = None
+
+
+def tenant_tables():
+    global TENANT_TABLES
+    if TENANT_TABLES is None:
+        scoped = {m.class_.__table__ for m in db.Model.registry.mappers if issubclass(m.class_, TenantScoped)}
+        # Kliniğe ait tablolara bağlı ara tablolar (ör. appointment_resource) da şubeyle birlikte taşınır
+        linked = {t for t in db.metadata.tables.values() if t not in scoped and t.foreign_keys
+                  and all(fk.column.table in scoped for fk in t.foreign_keys)}
+        TENANT_TABLES = scoped | linked
+    return TENANT_TABLES
+
+
+def _state(app=None):
+    return (app or current_app).extensions['tenancy']
+
+
+def clinics(app=None):
+    """slug -> (id, database_uri). İlk ihtiyaçta ve bilinmeyen slug'da bir kez yüklenir."""
+    state = _state(app)
+    if state['clinics'] is None:
+        state['clinics'] = {c.slug: (c.id, c.database_uri) for c in Clinic.query}
+    return state['clinics']
+
+
+def slug_from(header, host, default=None):
+    """X-Clinic başlığı > alt alan adı (sube.ornek.com) > varsayılan."""
+    slug = header
+    if not slug:
+        host = host.split(':')[0]
+        if host.count('.') >= 2:
+            slug = host.split('.')[0]
+    return slug or default
+
+
+def resolve_slug(authenticated=False):
+    """Oturum açmış isteklerde başlık dikkate alınmaz: şube adresten gelir, oturumun şubesiyle karşılaştırılır."""
+    header = None if authenticated else request.headers.get('X-Clinic')
+    return slug_from(header, request.host, current_app.config.get('DEFAULT_CLINIC'))
+
+
+def split_user_id(value):
+    """Flask-Login oturum anahtarı (bkz. User.get_id) -> (clinic_id, user_id). Tek şubede anahtar yalnızca id'dir."""
+    clinic_id, _, user_id = str(value).rpartition(':')
+    return (int(clinic_id) if clinic_id else None), int(user_id)
+
+
+@contextmanager
+def tenant(clinic_id):
+    """Blok içindeki sorguları verilen kliniğe kapsar (CLI ve arka plan görevleri için)."""
+    missing = object()
+    previous = g.get('clinic_id', missing)
+    g.clinic_id = clinic_id
+    try:
+        yield clinic_id
+    finally:
+        if previous is missing:
+            g.pop('clinic_id', None)
+        else:
+            g.clinic_id = previous
+
+
+def for_each_tenant(func, *args, **kwargs):
+    """Fonksiyonu her klinik için ayrı kapsamda çalıştırır; sayısal sonuçları toplar.
+
+    Klinik tanımlı değilse tek seferde (clinic_id IS NULL kapsamında) çalışır.
+    """
+    ids = [clinic_id for clinic_id, _ in clinics().values()] or [None]
+    total = 0
+    for clinic_id in ids:
+        with tenant(clinic_id):
+            total += func(*args, **kwargs) or 0
+    return total
+
+
+def tenant_engine(clinic_id):
+    """Kliniğin ayrı veritabanı engine'i (yoksa None). Engine'ler süreç boyunca önbellekte tutulur."""
+    state = _state()
+    if clinic_id not in state['engines']:
+        uri = next((u for cid, u in clinics().values() if cid == clinic_id), None)
+        state['engines'][clinic_id] = create_engine(uri) if uri else None
+    return state['engines'][clinic_id]
+
+
+def _route(mapper, clause):
+    """RoutingSession için: kliniğe ait tablo sorgularını şubenin kendi dosyasına gönderir."""
+    if not has_app_context() or 'tenancy' not in current_app.extensions:
+        return None
+    clinic_id = g.get('clinic_id')
+    if clinic_id is None:
+        return None
+    if mapper is not None:
+        scoped = issubclass(mapper.class_, TenantScoped)
+    elif clause is not None:
+        scoped = any(t in tenant_tables() for t in find_tables(clause, include_crud=True))
+    else:
+        scoped = False
+    return tenant_engine(clinic_id) if scoped else None
+
+
+def _scope_query(state):
+    """Kliniğe ait modellere otomatik `clinic_id = ?` filtresi ekler.
+
+    g.clinic_id hiç atanmamışsa (kurulum scriptleri vb.) filtre uygulanmaz; None ise
+    klinik tanımsız kurulumdaki satırlar (clinic_id IS NULL) hedeflenir. Her iki durumda da
+    sorgular klinik ile başlayan bileşik indeksleri kullanır.
+    """
+    if not (state.is_select or state.is_update or state.is_delete) or state.is_column_load or state.is_relationship_load:
+        return
+    if 'clinic_id' not in g:
+        return
+    clinic_id = g.clinic_id
+    if clinic_id is None:
+        criteria = with_loader_criteria(TenantScoped, lambda cls: cls.clinic_id.is_(None), include_aliases=True)
+    else:
+        criteria = with_loader_criteria(TenantScoped, lambda cls: cls.clinic_id == clinic_id, include_aliases=True)
+    state.statement = state.statement.options(criteria)
+
+
+def create_clinic(slug, name, database_uri=None):
+    """Yeni şube açar; ayrı dosya verildiyse kliniğe ait tabloları orada oluşturur.
+
+    Şubenin işlem kataloğu varsayılan işlemlerle başlar.
+    """
+    from app.catalog import seed_defaults
+    clinic = Clinic(slug=slug, name=name, database_uri=database_uri)
+    db.session.add(clinic)
+    db.session.commit()
+    if database_uri:
+        db.metadata.create_all(create_engine(database_uri), tables=list(tenant_tables()))
+    _state()['clinics'] = None
+    with tenant(clinic.id):
+        seed_defaults()
+        db.session.commit()
+    return clinic
+
+
+def init_tenancy(app):
+    """İstek başına kliniği belirler, sorguları kapsar ve `flask tenants ...` komutlarını ekler.
+
+    Klinik tanımlı değilse uygulama tek şube olarak çalışır (clinic_id IS NULL).
+    """
+    app.extensions['tenancy'] = {'clinics': None, 'engines': {}}
+    RoutingSession.router = staticmethod(_route)
+    if not event.contains(RoutingSession, 'do_orm_execute', _scope_query):
+        event.listen(RoutingSession, 'do_orm_execute', _scope_query)
+
+    @app.before_request
+    def _resolve_clinic():
+        if request.endpoint == 'static':
+            return
+        known = clinics()
+        if not known:
+            g.clinic_id = None
+            return
+        slug = resolve_slug(authenticated='_user_id' in session)
+        if slug not in known:
+            _state()['clinics'] = None  # CLI ile yeni açılmış olabilir
+            known = clinics()
+        if slug not in known:
+            abort(404, description='Klinik bulunamadı.')
+        g.clinic_id = known[slug][0]
+
+    @app.cli.group('tenants')
+    def tenants_cli():
+        """Şube (klinik) yönetimi."""
+
+    @tenants_cli.command('list')
+    def list_tenants():
+        for slug, (clinic_id, uri) in clinics().items():
+            click.echo(f"{clinic_id:<4} {slug:<20} {uri or '(ortak veritabanı)'}")
+
+    @tenants_cli.command('create')
+    @click.argument('slug')
+    @click.argument('name')
+    @click.option('--database', default=None, help="Şubeye ayrı SQLite dosyası, ör. sqlite:///sube_kadikoy.db")
+    def create_tenant(slug, name, database):
+        clinic = create_clinic(slug, name, database)
+        click.echo(f"Klinik oluşturuldu: {clinic.id} {slug}")
@@ -0,0 +1,86 @@
+import logging
+import smtplib
+import threading
+from email.message import EmailMessage
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class TransportError(Exception):
+    """Gönderim başarısız; mesaj daha sonra tekrar denenir."""
+
+
+class Transport:
+    """Bildirim kanalı arayüzü. send() başarısızlıkta TransportError fırlatır."""
+    def __init__(self, config):
+        self.config = config
+
+    def send(self, message):
+        raise NotImplementedError
+
+
+class StubTransport(Transport):
+    """Testler ve yerel geliştirme için: mesajları bellekte tutar, dışarı çıkmaz."""
+    outbox = []
+    _lock = threading.Lock()
+
+    def send(self, message):
+        fail_for = self.config.get('OUTBOX_STUB_FAIL', ())
+        if message['recipient'] in fail_for:
+            raise TransportError(f"stub: {message['recipient']} reddedildi")
+        with self._lock:
+            StubTransport.outbox.append(message)
+
+
+class ConsoleTransport(Transport):
+    """Mesajı sadece loglar."""
+    def send(self, message):
+        logger.info(f"[{message['channel']}] {message['recipient']}: {message['body']}")
+
+
+class SMTPTransport(Transport):
+    def send(self, message):
+        email = EmailMessage()
+        email['From'] = self.config.get('MAIL_FROM', 'randevu@klinik.local')
+        email['To'] = message['recipient']
+        email['Subject'] = message['subject'] or 'Randevu Hatırlatma'
+        email.set_content(message['body'])
+        try:
+            with smtplib.SMTP(self.config.get('MAIL_SERVER', 'localhost'), self.config.get('MAIL_PORT', 25), timeout=10) as smtp:
+                if self.config.get('MAIL_USERNAME'):
+                    smtp.starttls()
+                    smtp.login(self.config['MAIL_USERNAME'], self.config.get('MAIL_PASSWORD', ''))
+                smtp.send_message(email)
+        except (OSError, smtplib.SMTPException) as e:
+            raise TransportError(str(e))
+
+
+class HTTPSMSTransport(Transport):
+    """Basit HTTP SMS ağ geçidi: SMS_GATEWAY_URL'e JSON POST eder."""
+    def send(self, message):
+        try:
+            response = requests.post(
+                self.config['SMS_GATEWAY_URL'],
+                json={'to': message['recipient'], 'text': message['body']},
+                headers={'Authorization': f"Bearer {self.config.get('SMS_GATEWAY_TOKEN', '')}"},
+                timeout=10,
+            )
+        except requests.RequestException as e:
+            raise TransportError(str(e))
+        if response.status_code >= 300:
+            raise TransportError(f"SMS gateway {response.status_code}: {response.text[:200]}")
+
+
+TRANSPORTS = {
+    'stub': StubTransport,
+    'console': ConsoleTransport,
+    'smtp': SMTPTransport,
+    'http_sms': HTTPSMSTransport,
+}
+
+
+def get_transport(channel, config):
+    """Kanal için yapılandırılmış transport (OUTBOX_TRANSPORTS ayarı)."""
+    names = config.get('OUTBOX_TRANSPORTS') or {}
+    return TRANSPORTS[names.get(channel, 'console')](config)
@@ -1,6 +1,6 @@
 from datetime import datetime, date, timedelta, time as dtime
 from app.models import db, Reservation, Session, Member
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_, select, update
 
 def week_bounds(anchor: datetime):
     start = anchor - timedelta(days=anchor.weekday())
@@ -23,13 +23,17 @@ def time_range(start_h=7, end_h=22, step_min=60):
 def mark_user_joined(sessions, member_name: str | None):
     for s in sessions:
         s.user_joined = False
-    if not member_name:
+    if not member_name or not sessions:
         return sessions
+    # Sadece ekrandaki seanslar için aktif rezervasyonları çek
     joined = {
-        r.session_id
-        for r in Reservation.query
-            .filter_by(user_name=member_name, status='active')
-            .all()
+        session_id
+        for (session_id,) in db.session.query(Reservation.session_id)
+            .filter(
+                Reservation.session_id.in_([s.id for s in sessions]),
+                Reservation.user_name == member_name,
+                Reservation.status == 'active',
+            )
     }
     for s in sessions:
         s.user_joined = (s.id in joined)
@@ -57,29 +61,32 @@ def auto_reserve(session, member_ids):
                 session.spots_left -= 1
     db.session.commit()
 
-# Geçmiş seansları kapatma mantığı
-def close_past_sessions_logic():
-    now = datetime.now()
-    to_close = (
-        Session.query
-        .filter(
-            Session.completed.is_(False),
-            (Session.date < now.date()) |
-            and_(Session.date == now.date(), Session.time < now.time())
+# Geçmiş seansları kapatma mantığı (set tabanlı: seans/rezervasyon sayısından bağımsız 3 UPDATE)
+def close_past_sessions_logic(now=None):
+    now = now or datetime.now()
+    past = or_(Session.date < now.date(), and_(Session.date == now.date(), Session.time < now.time()))
+    due = select(Session.id).where(Session.completed.is_(False), past)
+
+    # Üye başına bu seanslardaki aktif rezervasyon sayısı kadar kredi düş (sıfırın altına inmeden)
+    used = (
+        select(func.count(Reservation.id))
+        .where(
+            Reservation.session_id.in_(due),
+            Reservation.status == 'active',
+            func.lower(Reservation.user_name) == func.lower(Member.full_name),
         )
-        .all()
+        .scalar_subquery()
     )
-    if not to_close:
-        return
-
-    for s in to_close:
-        s.completed = True
-        for r in s.reservations:
-            if r.status == 'active':
-                r.status = 'attended'
-                m = Member.query.filter(
-                    func.lower(Member.full_name) == r.user_name.lower()
-                ).first()
-                if m and (m.credits or 0) > 0:
-                    m.credits -= 1
-    db.session.commit()
\ No newline at end of file
+    credits = db.session.execute(
+        update(Member).where(used > 0).values(credits=func.max(func.coalesce(Member.credits, 0) - used, 0))
+    ).rowcount
+    attended = db.session.execute(
+        update(Reservation)
+        .where(Reservation.session_id.in_(due), Reservation.status == 'active')
+        .values(status='attended')
+    ).rowcount
+    closed = db.session.execute(
+        update(Session).where(Session.completed.is_(False), past).values(completed=True)
+    ).rowcount
+    db.session.commit()
+    return closed + attended + credits
@@ -0,0 +1,200 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update, insert, or_, and_
+from sqlalchemy.orm import selectinload
+from app.extensions import db
+from app.models import WaitlistEntry, Appointment, OutboxMessage
+from app.recurrence import find_conflicts
+from app.outbox import enqueue_reminders
+from app.resources import MAX_APPOINTMENT_MINUTES
+
+# Teklif edilen slot bu süre içinde onaylanmazsa sıradaki hastaya geçer
+OFFER_TTL = timedelta(minutes=30)
+# Boşalan her slot için veritabanından çekilen en fazla aday
+CANDIDATES_PER_SLOT = 20
+
+
+class WaitlistError(ValueError):
+    """Geçersiz bekleme listesi işlemi."""
+
+
+def add_entry(procedure, duration, earliest, latest, user_id=None, name=None, phone=None):
+    """Bekleme listesine kayıt ekler ve id için flush eder (commit çağıranda)."""
+    if duration > MAX_APPOINTMENT_MINUTES:
+        raise WaitlistError(f'Randevu süresi en fazla {MAX_APPOINTMENT_MINUTES} dakika olabilir.')
+    if latest - earliest < timedelta(minutes=duration):
+        raise WaitlistError('Zaman aralığı işlem süresinden kısa.')
+    if latest <= datetime.now():
+        raise WaitlistError('Zaman aralığı geçmişte.')
+    entry = WaitlistEntry(procedure=procedure, duration=duration, earliest=earliest, latest=latest,
+                          user_id=user_id, name=name, phone=phone, status='waiting')
+    db.session.add(entry)
+    db.session.flush()
+    return entry
+
+
+def find_candidates(intervals, limit=None):
+    """Boşalan aralıklardan en az birine sığabilecek bekleyenleri TEK indeksli sorguda getirir.
+
+    Pencerenin tam sığma kontrolü (start + duration <= latest) Python'da yapılır.
+    """
+    if not intervals:
+        return []
+    lo = min(s for s, _ in intervals)
+    hi = max(s for s, _ in intervals)
+    return (
+        WaitlistEntry.query
+        .filter(
+            WaitlistEntry.status == 'waiting',
+            WaitlistEntry.earliest <= hi, WaitlistEntry.latest > lo,
+            or_(*[and_(WaitlistEntry.earliest <= s, WaitlistEntry.latest > s,
+                       WaitlistEntry.duration <= (e - s).total_seconds() // 60)
+                  for s, e in intervals]),
+        )
+        .order_by(WaitlistEntry.created_at)
+        .limit(limit or CANDIDATES_PER_SLOT * len(intervals))
+        .all()
+    )
+
+
+def _best_fit(pool, start, end):
+    """Aralığa sığan en uzun işlemi seçer (boşluk en az kalsın); eşitlikte en eski kayıt."""
+    best = None
+    for entry in pool:
+        finish = start + timedelta(minutes=entry.duration)
+        if entry.earliest <= start and finish <= min(end, entry.latest):
+            if best is None or entry.duration > best.duration:
+                best = entry
+    return best
+
+
+def promote(intervals, now=None, resources=None):
+    """Boşalan aralıkları bekleme listesindeki en uygun hastalara geçici olarak ayırır.
+
+    resources: boşalan randevunun kaynakları (hekim, koltuk); geçici randevu aynı kaynakları alır.
+
+    Bekleyen sayısından bağımsız: aday SELECT, çakışma SELECT, teklif başına bir INSERT
+    (held randevu; id gerektiği için), PK'ye göre toplu UPDATE ve teklif mesajları için tek INSERT.
+    Commit çağıranda. Teklif edilen kayıt sayısını döner.
+    """
+    now = now or datetime.now()
+    intervals = [(max(s, now), e) for s, e in intervals if e > now and e - max(s, now) >= timedelta(minutes=1)]
+    pool = find_candidates(intervals)
+    if not pool:
+        return 0
+
+    offers = []  # (entry, start, end)
+    for start, end in sorted(intervals):
+        cursor = start
+        while True:
+            entry = _best_fit(pool, cursor, end)
+            if not entry:
+                break
+            pool.remove(entry)
+            finish = cursor + timedelta(minutes=entry.duration)
+            offers.append((entry, cursor, finish))
+            cursor = finish
+
+    # Aralığın bir kısmı bu arada dolmuş olabilir
+    resources = list(resources or [])
+    conflicts = find_conflicts([(s, e) for _, s, e in offers], resource_ids=[r.id for r in resources]) if offers else {}
+    offers = [o for i, o in enumerate(offers) if i not in conflicts]
+    if not offers:
+        return 0
+
+    holds = [
+        Appointment(title=entry.procedure, start_time=s, end_time=e, user_id=entry.user_id,
+                    guest_name=entry.name, guest_phone=entry.phone, status='held', notes='Bekleme listesi teklifi',
+                    resources=resources)
+        for entry, s, e in offers
+    ]
+    db.session.add_all(holds)
+    db.session.flush()
+
+    expires = now + OFFER_TTL
+    db.session.execute(update(WaitlistEntry), [
+        {'id': entry.id, 'status': 'offered', 'appointment_id': appt.id, 'offer_expires_at': expires}
+        for (entry, _, _), appt in zip(offers, holds)
+    ])
+    messages = [
+        {
+            'appointment_id': appt.id, 'kind': 'waitlist_offer', 'channel': 'sms', 'recipient': entry.phone,
+            'subject': 'Randevu Teklifi', 'status': 'pending', 'due_at': now, 'next_attempt_at': now, 'attempts': 0,
+            'body': (f"Sayın {entry.name or 'Hastamız'}, {s.strftime('%d.%m.%Y %H:%M')} için {entry.procedure} "
+                     f"randevusu açıldı. {expires.strftime('%H:%M')}'e kadar onaylamazsanız sıradaki hastaya verilecektir. - Diş Kliniği"),
+        }
+        for (entry, s, _), appt in zip(offers, holds) if entry.phone
+    ]
+    if messages:
+        db.session.execute(insert(OutboxMessage), messages)
+    return len(offers)
+
+
+def release(appt):
+    """Silinen/iptal edilen randevunun aralığını (aynı kaynaklarla) sıradakilere açar."""
+    if appt.status not in ('confirmed', 'held'):
+        return 0
+    return promote([(appt.start_time, appt.end_time)], resources=appt.resources)
+
+
+def _offered_entry(entry_id):
+    entry = db.session.get(WaitlistEntry, entry_id)
+    if not entry or entry.status != 'offered':
+        raise WaitlistError('Geçerli bir teklif bulunamadı.')
+    return entry
+
+
+def accept_offer(entry_id):
+    """Teklifi onaylar: geçici randevu kesinleşir, hatırlatmalar kuyruğa eklenir."""
+    entry = _offered_entry(entry_id)
+    if entry.offer_expires_at < datetime.now():
+        raise WaitlistError('Teklifin süresi doldu.')
+    appt = db.session.get(Appointment, entry.appointment_id)
+    appt.status = 'confirmed'
+    appt.notes = None
+    entry.status = 'booked'
+    enqueue_reminders(appt)
+    return appt
+
+
+def decline_offer(entry_id):
+    """Teklifi reddeder ve slotu hemen sıradaki hastaya açar."""
+    entry = _offered_entry(entry_id)
+    appt = db.session.get(Appointment, entry.appointment_id)
+    appt.status = 'cancelled'
+    entry.status = 'declined'
+    db.session.flush()
+    return promote([(appt.start_time, appt.end_time)], resources=appt.resources)
+
+
+def expire_offers(now=None):
+    """Süresi dolan teklifleri geri alıp slotları yeniden dağıtır; penceresi geçmiş kayıtları kapatır.
+
+    Geçmiş kayıtların kapatılması eşleştirme indeksinin taradığı 'waiting' aralığını dar tutar.
+    """
+    now = now or datetime.now()
+    stale = (
+        db.session.query(WaitlistEntry.id, Appointment)
+        .join(Appointment, Appointment.id == WaitlistEntry.appointment_id)
+        .options(selectinload(Appointment.resources))
+        .filter(WaitlistEntry.status == 'offered', WaitlistEntry.offer_expires_at < now)
+        .all()
+    )
+    if stale:
+        db.session.execute(
+            update(Appointment).where(Appointment.id.in_([a.id for _, a in stale]), Appointment.status == 'held')
+            .values(status='cancelled', version=Appointment.version + 1).execution_options(synchronize_session=False))
+        db.session.execute(
+            update(WaitlistEntry).where(WaitlistEntry.id.in_([entry_id for entry_id, _ in stale]))
+            .values(status='expired').execution_options(synchronize_session=False))
+    closed = db.session.execute(
+        update(WaitlistEntry).where(WaitlistEntry.status == 'waiting', WaitlistEntry.latest < now)
+        .values(status='expired').execution_options(synchronize_session=False)
+    ).rowcount
+    # Aynı kaynakları paylaşan slotlar tek seferde dağıtılır
+    groups = {}
+    for _, appt in stale:
+        key = tuple(sorted(r.id for r in appt.resources))
+        groups.setdefault(key, (appt.resources, []))[1].append((appt.start_time, appt.end_time))
+    offered = sum(promote(intervals, now=now, resources=resources) for resources, intervals in groups.values())
+    db.session.commit()
+    return len(stale) + closed + offered
@@ -0,0 +1,8 @@
+"""Asenkron API katmanı giriş noktası: uvicorn asgi:app --port 5003 (bkz. app/asgi.py)"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.asgi import create_asgi_app  # noqa: E402  (.env, Clerk ayarlarından önce yüklenmeli)
+
+app = create_asgi_app()
@@ -0,0 +1,182 @@
+"""Senkron (thread başına istek) ve asenkron (app/asgi.py) sunucunun eşzamanlı yük altında karşılaştırması.
+
+Geçici bir SQLite dosyasında C eşzamanlı istemci, sürekli takvim akışını yoklar (GET /api/appointments);
+isteklerin bir kısmı Clerk girişidir (/auth/check-clerk) ve yavaş bir sahte Clerk API'sine gider.
+Her iki kurulum da tek süreçtir:
+
+  senkron : Flask, werkzeug thread'li sunucu (her bağlantıya bir thread)
+  asenkron: uvicorn + create_asgi_app (tek event loop; takvim ve Clerk yolları thread tutmaz)
+
+Bellek eşitliği için sunucu sürecinin tepe RSS'i (VmHWM) ölçülür ve 100 MB başına istek/sn raporlanır.
+
+Kullanım: python bench_async.py [--clients 200] [--seconds 10] [--clerk-share 0.1] [--clerk-latency 0.2]
+"""
+import os
+import json
+import time
+import base64
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta
+from loadtest.clerk import FakeClerk
+
+
+def _config(path):
+    return {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SCHEDULER_ENABLED': False, 'AUDIT_JOURNAL_DIR': None,
+            'TEMPLATE_CACHE_DIR': None, 'OUTBOX_TRANSPORTS': {'sms': 'stub', 'email': 'stub'}}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# --- SUNUCULAR (ayrı süreç) ---
+def _serve(kind, path, port, clerk_api):
+    os.environ.update(CLERK_API_URL=clerk_api, CLERK_SECRET_KEY='sk_test_yuk')  # auth_routes import edilmeden önce
+    from app import create_app
+    app = create_app(_config(path))
+    if kind == 'senkron':
+        from werkzeug.serving import make_server
+        make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from app.asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(app), host='127.0.0.1', port=port, log_level='warning')
+
+
+def seed(path, count):
+    from app import create_app
+    from app.extensions import db
+    from app.models import User, Appointment
+    app = create_app(_config(path))
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', full_name='Admin', role='admin', email='admin@klinik')
+        db.session.add(admin)
+        db.session.flush()
+        monday = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        db.session.add_all(
+            Appointment(title='Muayene', start_time=monday + timedelta(days=i % 7, minutes=15 * (i // 7 % 36)),
+                        end_time=monday + timedelta(days=i % 7, minutes=15 * (i // 7 % 36) + 30),
+                        guest_name=f'Hasta {i}', guest_phone=f'0555{i:07d}', status='confirmed')
+            for i in range(count)
+        )
+        db.session.commit()
+        cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(admin.id), '_fresh': True})
+        db.engine.dispose()
+    return app.config['SESSION_COOKIE_NAME'], cookie
+
+
+def _clerk_token(n):
+    encode = lambda d: base64.urlsafe_b64encode(json.dumps(d).encode()).rstrip(b'=').decode()
+    return f"{encode({'alg': 'none'})}.{encode({'sub': f'user_{n}'})}.imza"
+
+
+def peak_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+# --- YÜK ---
+async def load(port, cookie, clients, seconds, clerk_share):
+    import httpx
+    name, value = cookie
+    start = datetime.now().date().isoformat()
+    end = (datetime.now() + timedelta(days=7)).date().isoformat()
+    base = f'http://127.0.0.1:{port}'
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async def client(n, http):
+        nonlocal errors
+        i = 0
+        while time.perf_counter() < deadline:
+            i += 1
+            t = time.perf_counter()
+            try:
+                if random.random() < clerk_share:
+                    r = await http.get(f'{base}/auth/check-clerk', cookies={'__session': _clerk_token(n * 100000 + i)})
+                    ok = r.status_code == 302
+                else:
+                    r = await http.get(f'{base}/api/appointments?start={start}&end={end}', cookies={name: value},
+                                       headers={'Accept-Encoding': 'gzip'})
+                    ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - t)
+            errors += not ok
+
+    async with httpx.AsyncClient(limits=limits, timeout=60, follow_redirects=False) as http:
+        await asyncio.gather(*(client(n, http) for n in range(clients)))
+    return latencies, errors
+
+
+def run(kind, path, cookie, clerk_api, args):
+    port = _free_port()
+    proc = multiprocessing.get_context('spawn').Process(target=_serve, args=(kind, path, port, clerk_api), daemon=True)
+    proc.start()
+    for _ in range(300):  # Sunucu ayağa kalkana kadar
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    try:
+        latencies, errors = asyncio.run(load(port, cookie, args.clients, args.seconds, args.clerk_share))
+        rss = peak_rss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.join()
+    latencies.sort()
+    rps = len(latencies) / args.seconds
+    return {
+        'istek/sn': rps,
+        'p50 ms': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        'p95 ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        'hata': errors,
+        'RSS MB': rss,
+        'istek/sn/100MB': rps / rss * 100 if rss else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--appointments', type=int, default=200)
+    parser.add_argument('--clerk-share', type=float, default=0.1, help='Clerk girişi olan isteklerin oranı')
+    parser.add_argument('--clerk-latency', type=float, default=0.2, help='Sahte Clerk API gecikmesi (saniye)')
+    args = parser.parse_args()
+
+    clerk = FakeClerk(latency=args.clerk_latency, fallback_domain='yuk.test').start()  # Her istek yeni Clerk kullanıcısı
+    clerk_api = clerk.api_url
+    results = {}
+    try:
+        for kind in ('senkron', 'asenkron'):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.db')
+                cookie = seed(path, args.appointments)
+                results[kind] = run(kind, path, cookie, clerk_api, args)
+    finally:
+        clerk.stop()
+
+    print(f"{args.clients} eşzamanlı istemci, {args.seconds:g} sn, Clerk payı {args.clerk_share:g} "
+          f"({args.clerk_latency * 1000:g} ms gecikme), {args.appointments} randevu")
+    keys = list(next(iter(results.values())))
+    print(f"{'':<10}" + ''.join(f"{k:>16}" for k in keys))
+    for kind, r in results.items():
+        print(f"{kind:<10}" + ''.join(f"{r[k]:>16.1f}" for k in keys))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Canlı yedeğin (app/backup.py) yazma yükü altındaki davranışı.
+
+Geçici dizinde --size-gb büyüklüğünde bir veritabanı (randevu tablosu) oluşturulur. Ayrı bir süreç
+sürekli küçük transaction'larla randevu ekler / günceller ve her commit'in süresini ölçer.
+Üç durum karşılaştırılır:
+
+  wal-sayfalı   : app/backup.py (WAL, sabit okuma görüntüsü, sayfa grupları) + doğrulama + gzip
+  delete-tek    : rollback journal modunda tek adımda backup (kopya boyunca yazarlar bekler)
+  delete-sayfalı: rollback journal modunda sayfalı backup (yazmalar yedeği baştan başlatır)
+
+Kullanım: python bench_backup.py [--size-gb 2] [--dir /tmp] [--skip-delete]
+"""
+import os
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from datetime import datetime, timedelta
+from app import create_app
+from app.extensions import db
+from app.backup import snapshot, copy_database, BackupError
+
+WORDS = ('dolgu kanal tedavisi kontrol muayene implant köprü kron diş taşı temizliği beyazlatma çekim '
+         'ortodonti tel plak röntgen panoramik ağrı hassasiyet sol alt üst sağ azı kesici köpek dişi '
+         'hasta randevu iptal ertelendi arandı mesaj bırakıldı ödeme taksit sigorta').split()
+
+
+def build(path, size_gb):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SCHEDULER_ENABLED': False,
+                      'AUDIT_JOURNAL_DIR': None})
+    with app.app_context():
+        db.create_all()
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')  # Sadece kurulum hızı için
+    start = datetime(2020, 1, 1, 9)
+    target = size_gb * 1024 ** 3
+    batch, n = 20000, 0
+    rnd = random.Random(1)
+    while os.path.getsize(path) < target:  # Her partiden sonra WAL dosyaya aktarılır
+        rows = []
+        for _ in range(batch):
+            s = start + timedelta(minutes=15 * n)
+            notes = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(40, 160)))
+            rows.append(('Dolgu', s, s + timedelta(minutes=30), f'Hasta {n}', f'05{n:09d}', notes, 'completed'))
+            n += 1
+        conn.executemany('INSERT INTO appointment (title, start_time, end_time, guest_name, guest_phone, notes, status, version) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, 1)', rows)
+        conn.commit()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.close()
+    return app, n
+
+
+def writer(path, stop, latencies):
+    """Saniyede ~50 küçük yazma (randevu ekle + bir önceki kaydı güncelle); commit süreleri ms."""
+    conn = sqlite3.connect(path, timeout=120)
+    i = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        s = datetime(2030, 1, 1) + timedelta(minutes=i)
+        conn.execute('INSERT INTO appointment (title, start_time, end_time, status, version) VALUES (?, ?, ?, ?, 1)',
+                     ('Muayene', s, s + timedelta(minutes=15), 'confirmed'))
+        conn.execute('UPDATE appointment SET version = version + 1, notes = ? WHERE id = last_insert_rowid()', (f'not {i}',))
+        conn.commit()
+        latencies.append((time.perf_counter() - started) * 1000)
+        i += 1
+        time.sleep(0.02)
+    conn.close()
+
+
+def under_load(path, action):
+    manager = multiprocessing.Manager()
+    latencies, stop = manager.list(), manager.Event()
+    proc = multiprocessing.Process(target=writer, args=(path, stop, latencies))
+    proc.start()
+    time.sleep(2)  # Isınma
+    baseline = len(latencies)
+    started = time.perf_counter()
+    try:
+        result = action()
+    except BackupError as e:
+        result = f'HATA: {e}'
+    elapsed = time.perf_counter() - started
+    stop.set()
+    proc.join()
+    # Yedek boyunca bekleyen commit'ler yedek bittikten sonra tamamlanır; onlar da sayılır
+    return result, elapsed, list(latencies)[baseline:]
+
+
+def report(name, elapsed, during, extra=''):
+    during = sorted(during) or [0]
+    p99 = during[min(len(during) - 1, int(len(during) * 0.99))]
+    print(f"{name:<15} {elapsed:7.1f} s  yazma: {len(during):5d} commit, medyan {statistics.median(during):7.1f} ms, "
+          f"p99 {p99:8.1f} ms, en uzun {during[-1]:8.1f} ms  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-gb', type=float, default=2)
+    parser.add_argument('--dir', default=None)
+    parser.add_argument('--skip-delete', action='store_true')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(dir=args.dir)
+    path = os.path.join(work, 'klinik.db')
+    try:
+        started = time.perf_counter()
+        app, rows = build(path, args.size_gb)
+        print(f"Veritabanı: {os.path.getsize(path) / 1e9:.2f} GB, {rows} randevu ({time.perf_counter() - started:.0f} s)")
+
+        with app.app_context():
+            meta, elapsed, during = under_load(path, lambda: snapshot('main', path, os.path.join(work, 'yedek')))
+        s = meta['seconds']
+        report('wal-sayfalı', elapsed, during,
+               f"(kopya {s['copy']} s, {meta['verify']} {s['verify']} s, gzip {s['compress']} s, "
+               f"{meta['raw_size'] / 1e9:.2f} -> {meta['size'] / 1e9:.2f} GB, {meta['steps']} adım, "
+               f"{meta['restarts']} yeniden başlama)")
+
+        if not args.skip_delete:
+            conn = sqlite3.connect(path)
+            conn.execute('PRAGMA journal_mode=DELETE')
+            conn.close()
+            with app.app_context():
+                target = os.path.join(work, 'tek.db')
+                _, elapsed, during = under_load(path, lambda: copy_database(path, target, pages=-1))
+                report('delete-tek', elapsed, during, '(yalnızca kopya)')
+                os.remove(target)
+                target = os.path.join(work, 'sayfali.db')
+                result, elapsed, during = under_load(path, lambda: copy_database(path, target))
+                report('delete-sayfalı', elapsed, during,
+                       result if isinstance(result, str) else f"({result['steps']} adım, {result['restarts']} yeniden başlama)")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
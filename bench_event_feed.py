@@ -0,0 +1,96 @@
+"""Takvim akışı biçimlerinin yük boyutu ve sunucu serileştirme süresi.
+
+Yoğun bir ay (varsayılan 1500 randevu) için /api/appointments yanıtını klasik (FullCalendar
+olay listesi) ve kompakt (sütun bazlı, app/feeds.py) biçimde, gzip'li ve gzip'siz karşılaştırır.
+
+Kullanım: python bench_event_feed.py [--appointments 1500] [--repeat 20]
+"""
+import gzip
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+from flask_login import FlaskLoginClient
+from app import create_app
+from app.extensions import db
+from app.models import User, Appointment, Resource
+from app.feeds import encode_verbose, encode_compact, COMPACT_TYPE, GZIP_LEVEL
+from app.routes.admin_routes import ADMIN_FEED
+
+NAMES = ['Ayşe Yılmaz', 'Mehmet Kaya', 'Zeynep Demir', 'Ali Çelik', 'Elif Şahin', 'Mustafa Aydın', 'Fatma Öztürk']
+PROCEDURES = ['Muayene', 'Diş Taşı Temizliği', 'Diş Çekimi', 'Dolgu', 'Kanal Tedavisi', 'İmplant']
+
+
+def seed(app, count):
+    random.seed(7)
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', full_name='Admin', role='admin', email='admin@klinik')
+        resources = [Resource(name=f'Hekim {i}', kind='dentist') for i in (1, 2, 3)] + \
+                    [Resource(name=f'Koltuk {i}', kind='chair') for i in (1, 2, 3, 4)]
+        db.session.add_all([admin] + resources)
+        db.session.flush()
+        first = datetime.now().replace(day=1, hour=9, minute=0, second=0, microsecond=0)
+        for i in range(count):
+            start = first + timedelta(days=i % 30, minutes=15 * random.randrange(36))
+            db.session.add(Appointment(
+                title=random.choice(PROCEDURES), start_time=start, end_time=start + timedelta(minutes=random.choice((30, 45, 60))),
+                guest_name=random.choice(NAMES), guest_phone=f'0555{random.randrange(10 ** 7):07d}', status='confirmed',
+                notes=random.choice(['', '', 'Alerjisi var', 'Kontrol randevusu']),
+                resources=[random.choice(resources[:3]), random.choice(resources[3:])]))
+        db.session.commit()
+        return admin.id, first
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--appointments', type=int, default=1500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'WTF_CSRF_ENABLED': False, 'SCHEDULER_ENABLED': False})
+    app.test_client_class = FlaskLoginClient
+    admin_id, first = seed(app, args.appointments)
+    with app.app_context():
+        admin = db.session.get(User, admin_id)
+        db.session.expunge(admin)
+    client = app.test_client(user=admin)
+    query = f"?start={first.date().isoformat()}&end={(first + timedelta(days=31)).date().isoformat()}"
+
+    # Serileştirme: route'un ürettiği satırlardan yanıt gövdesine
+    rows = []
+    for event in client.get('/api/appointments' + query).json:
+        row = {k: v for k, v in event.items() if k != 'extendedProps'}
+        row.update(event['extendedProps'])
+        row['start'], row['end'] = datetime.fromisoformat(row['start']), datetime.fromisoformat(row['end'])
+        rows.append(row)
+    dumps = lambda payload: json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+    verbose, verbose_ms = timed(lambda: dumps(encode_verbose(rows)), args.repeat)
+    compact, compact_ms = timed(lambda: dumps(encode_compact(rows, ADMIN_FEED)), args.repeat)
+    _, verbose_gz_ms = timed(lambda: gzip.compress(verbose, GZIP_LEVEL), args.repeat)
+    _, compact_gz_ms = timed(lambda: gzip.compress(compact, GZIP_LEVEL), args.repeat)
+
+    # Uçtan uca istek (sorgu + serileştirme + sıkıştırma)
+    _, verbose_req_ms = timed(lambda: client.get('/api/appointments' + query, headers={'Accept-Encoding': 'gzip'}), args.repeat)
+    _, compact_req_ms = timed(lambda: client.get('/api/appointments' + query, headers={
+        'Accept': COMPACT_TYPE, 'Accept-Encoding': 'gzip'}), args.repeat)
+
+    print(f"{len(rows)} olay, en iyi {args.repeat} tekrar")
+    print(f"{'biçim':<18}{'bayt':>10}{'gzip bayt':>12}{'serileştirme ms':>18}{'+gzip ms':>10}{'istek ms':>10}")
+    for label, body, ms, gz_ms, req_ms in (('klasik', verbose, verbose_ms, verbose_gz_ms, verbose_req_ms),
+                                           ('kompakt', compact, compact_ms, compact_gz_ms, compact_req_ms)):
+        print(f"{label:<18}{len(body):>10}{len(gzip.compress(body, GZIP_LEVEL)):>12}{ms:>18.2f}{gz_ms:>10.2f}{req_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Okuma/yazma yönlendirmesinin eşzamanlı okuma kapasitesine etkisi.
+
+Geçici bir SQLite dosyasında takvim akışını (GET /api/appointments) N okuyucu süreç
+çekerken bir süreç sürekli randevu günceller (gunicorn worker'ları gibi). İki kurulum karşılaştırılır:
+
+  tek-engine : READ_REPLICA=False, varsayılan (rollback journal) mod
+  yönlendirme: READ_REPLICA=True, WAL + salt-okunur bağlantı havuzu
+
+Kullanım: python bench_read_routing.py [--readers 4] [--seconds 5] [--appointments 200]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta
+from flask_login import FlaskLoginClient
+from app import create_app
+from app.extensions import db
+from app.models import User, Appointment
+
+
+def build(path, replica):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'WTF_CSRF_ENABLED': False,
+        'SCHEDULER_ENABLED': False, 'READ_REPLICA': replica, 'AUDIT_JOURNAL_DIR': None,
+        'OUTBOX_TRANSPORTS': {'sms': 'stub', 'email': 'stub'},
+    })
+    app.test_client_class = FlaskLoginClient
+    return app
+
+
+def seed(app, count):
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', full_name='Admin', role='admin', email='admin@klinik')
+        db.session.add(admin)
+        db.session.flush()
+        monday = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        db.session.add_all(
+            Appointment(title='Muayene', start_time=monday + timedelta(days=i % 7, minutes=15 * (i // 7 % 36)),
+                        end_time=monday + timedelta(days=i % 7, minutes=15 * (i // 7 % 36) + 30),
+                        guest_name=f'Hasta {i}', guest_phone=f'0555{i:07d}', status='confirmed')
+            for i in range(count)
+        )
+        db.session.commit()
+        ids = [a for (a,) in db.session.query(Appointment.id)]
+        admin_id = admin.id
+    return admin_id, ids
+
+
+def _worker(path, replica, admin_id, ids, seconds, role, out):
+    """Ayrı süreçte (gunicorn worker'ı gibi) okur ya da yazar; sonuçları kuyruğa koyar."""
+    app = build(path, replica)
+    with app.app_context():
+        admin = db.session.get(User, admin_id)
+        db.session.expunge(admin)
+    client = app.test_client(user=admin)
+    start = datetime.now().date().isoformat()
+    end = (datetime.now() + timedelta(days=7)).date().isoformat()
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t = time.perf_counter()
+        if role == 'writer':
+            r = client.post(f'/api/appointments/{random.choice(ids)}/update', data={'notes': f'not {time.time()}'})
+        else:
+            r = client.get(f'/api/appointments?start={start}&end={end}')
+        latencies.append(time.perf_counter() - t)
+        errors += r.status_code != 200
+    out.put((role, latencies, errors))
+
+
+def run(path, replica, admin_id, ids, readers, seconds):
+    ctx = multiprocessing.get_context('spawn')  # Üst süreçteki thread / bağlantılar devralınmasın
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(path, replica, admin_id, ids, seconds, role, out))
+             for role in ['reader'] * readers + ['writer']]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    reads = sorted(l for role, lat, _ in results if role == 'reader' for l in lat)
+    writes = [l for role, lat, _ in results if role == 'writer' for l in lat]
+    return {
+        'reads/s': len(reads) / seconds,
+        'p50 ms': reads[len(reads) // 2] * 1000 if reads else 0,
+        'p95 ms': reads[int(len(reads) * 0.95)] * 1000 if reads else 0,
+        'writes/s': len(writes) / seconds,
+        'errors': sum(e for _, _, e in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--appointments', type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    for label, replica in (('tek-engine', False), ('yönlendirme', True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            app = build(path, replica)
+            admin_id, ids = seed(app, args.appointments)
+            with app.app_context():
+                db.engine.dispose()
+            results[label] = run(path, replica, admin_id, ids, args.readers, args.seconds)
+
+    print(f"{args.readers} okuyucu + 1 yazar, {args.seconds:g} sn, {args.appointments} randevu")
+    keys = list(next(iter(results.values())))
+    print(f"{'':<14}" + ''.join(f"{k:>12}" for k in keys))
+    for label, r in results.items():
+        print(f"{label:<14}" + ''.join(f"{r[k]:>12.1f}" for k in keys))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Ağır yönetim sayfalarında şablon yükleme ve çizim süresi.
+
+1) Yükleme: admin_dashboard / admin_patient_detail / sessions_calendar şablonlarının yeni bir
+   süreçteki ilk yüklenmesi; kaynaktan derleme ile Jinja bytecode önbelleğinden yükleme.
+2) Çizim: aynı sayfaların istek süresi; parça önbelleği ({% cache %}) kapalı ve açık (ısınmış).
+
+Kullanım: python bench_templates.py [--patients 300] [--treatments 60] [--appointments 40] [--repeat 30]
+"""
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from flask_login import FlaskLoginClient
+from app import create_app
+from app.extensions import db
+from app.models import User, Appointment, Treatment
+
+TEMPLATES = ['admin_dashboard.html', 'admin_patient_detail.html', 'sessions_calendar.html']
+PROCEDURES = ['Muayene', 'Diş Taşı Temizliği', 'Diş Çekimi', 'Dolgu', 'Kanal Tedavisi', 'İmplant']
+
+
+def build(extra=None):
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'WTF_CSRF_ENABLED': False, 'SCHEDULER_ENABLED': False,
+              'TEMPLATE_CACHE_DIR': None}
+    config.update(extra or {})
+    app = create_app(config)
+    app.test_client_class = FlaskLoginClient
+    return app
+
+
+def seed(app, patients, treatments, appointments):
+    random.seed(7)
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', full_name='Admin', role='admin', email='admin@klinik')
+        users = [User(username=f'0555{i:07d}', full_name=f'Hasta {i}', phone=f'0555{i:07d}', role='patient',
+                      email=f'hasta{i}@klinik') for i in range(patients)]
+        db.session.add_all([admin] + users)
+        db.session.flush()
+        patient = users[0]
+        db.session.add_all(Treatment(user_id=patient.id, procedure_name=random.choice(PROCEDURES), tooth_number=str(11 + i % 38),
+                                     cost=random.choice((500, 750, 1200)), notes='Kontrol', date=datetime.now() - timedelta(days=i))
+                           for i in range(treatments))
+        today = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        db.session.add_all(Appointment(title=random.choice(PROCEDURES), start_time=today + timedelta(minutes=15 * i),
+                                       end_time=today + timedelta(minutes=15 * i + 30), status='confirmed',
+                                       user_id=random.choice(users).id if i % 2 else None, guest_name=None if i % 2 else f'Misafir {i}')
+                           for i in range(appointments))
+        db.session.commit()
+        return admin.id, patient.id
+
+
+def load_times(cache_dir, repeat):
+    """Her turda yeni uygulama (yeni süreç gibi boş şablon önbelleği) ile şablonları yükler."""
+    best = float('inf')
+    for _ in range(repeat):
+        app = build({'TEMPLATE_CACHE_DIR': cache_dir})
+        t = time.perf_counter()
+        for name in TEMPLATES:
+            app.jinja_env.get_template(name)
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def render_times(app, admin_id, patient_id, repeat):
+    with app.app_context():
+        admin = db.session.get(User, admin_id)
+        db.session.expunge(admin)
+    client = app.test_client(user=admin)
+    results = {}
+    for url in ('/admin/dashboard', f'/admin/patient/{patient_id}', '/admin/calendar'):
+        client.get(url)  # Şablon derleme + parça önbelleğini ısıt
+        best = float('inf')
+        for _ in range(repeat):
+            t = time.perf_counter()
+            assert client.get(url).status_code == 200
+            best = min(best, time.perf_counter() - t)
+        results[url] = best * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=300)
+    parser.add_argument('--treatments', type=int, default=60)
+    parser.add_argument('--appointments', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compile_ms = load_times(None, args.repeat)
+        load_times(cache_dir, 1)  # bytecode'u diske yaz
+        bytecode_ms = load_times(cache_dir, args.repeat)
+    print(f"Şablon yükleme ({len(TEMPLATES)} şablon, en iyi {args.repeat} tekrar)")
+    print(f"  kaynaktan derleme   {compile_ms:8.2f} ms")
+    print(f"  bytecode önbelleği  {bytecode_ms:8.2f} ms")
+
+    rows = {}
+    for label, enabled in (('parça önbelleği yok', False), ('parça önbelleği', True)):
+        app = build({'FRAGMENT_CACHE': enabled})
+        admin_id, patient_id = seed(app, args.patients, args.treatments, args.appointments)
+        rows[label] = render_times(app, admin_id, patient_id, args.repeat)
+    print(f"\nİstek süresi, ms ({args.patients} hasta, {args.treatments} tedavi, bugün {args.appointments} randevu)")
+    urls = list(next(iter(rows.values())))
+    print(f"{'':<22}" + ''.join(f"{u.split('/')[2]:>12}" for u in urls))
+    for label, r in rows.items():
+        print(f"{label:<22}" + ''.join(f"{r[u]:>12.2f}" for u in urls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+"""Uçtan uca yük testi: gerçek Clerk girişiyle sanal hasta / personel / yönetici oturumları.
+
+Geçici bir SQLite dosyasına hasta, kaynak ve randevu verisi yüklenir; uygulama ayrı bir süreçte
+(werkzeug ya da uvicorn + app/asgi.py) sahte bir Clerk API'sine (loadtest/clerk.py) yönlendirilerek
+açılır. Her sanal kullanıcı /auth/check-clerk ile giriş yapar, CSRF token'ı alır ve karışımdaki
+eylemleri (loadtest/scenarios.py) kapalı döngüde çalıştırır. Rastgelelik tohumludur: aynı ayarlar
+aynı istek dizisini üretir.
+
+Rapor eylem başına istek/sn, p50/p90/p99 gecikme ve hata / sürüm çakışması oranıdır; --out ile commit
+ve ortam bilgisiyle JSON'a yazılır, --compare önceki bir JSON'la karşılaştırır (gerilemede çıkış kodu 1).
+
+Kullanım: python -m loadtest [--mix karma] [--seconds 30] [--warmup 5] [--server werkzeug|uvicorn]
+                             [--out sonuc.json] [--compare onceki.json]
+"""
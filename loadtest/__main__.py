@@ -0,0 +1,63 @@
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+import loadtest
+from loadtest import report
+from loadtest.clerk import FakeClerk
+from loadtest.runner import SERVERS, seed, start_server, peak_rss_mb, drive
+from loadtest.scenarios import MIXES
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description=loadtest.__doc__.splitlines()[0])
+    parser.add_argument('--mix', choices=sorted(MIXES), default='karma')
+    parser.add_argument('--seconds', type=float, default=30, help='Ölçüm süresi')
+    parser.add_argument('--warmup', type=float, default=5, help='Sayılmayan ısınma süresi')
+    parser.add_argument('--server', choices=SERVERS, default='werkzeug')
+    parser.add_argument('--think', type=float, default=0.0, help='Eylemler arası ortalama bekleme (sn; 0: kapasite)')
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--appointments', type=int, default=1000, help='Mevcut randevu (ızgaranın ~%%64\'ü)')
+    parser.add_argument('--clerk-latency', type=float, default=0.0, help='Sahte Clerk API gecikmesi (sn)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='Sonucu bu JSON dosyasına yaz')
+    parser.add_argument('--compare', help='Önceki bir JSON sonucuyla karşılaştır')
+    args = parser.parse_args()
+    baseline = report.load(args.compare) if args.compare else None  # Dosya hatası yük testinden önce çıksın
+
+    clerk = FakeClerk(latency=args.clerk_latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'yuk.db')
+            admin_email, patient_emails = seed(path, args.patients, args.appointments, args.seed)
+            proc, base_url = start_server(args.server, path, clerk)
+            try:
+                samples = asyncio.run(drive(base_url, clerk, args.mix, admin_email, patient_emails,
+                                            args.seconds, args.warmup, args.think, args.seed))
+                rss = peak_rss_mb(proc.pid)
+            finally:
+                proc.terminate()
+                proc.join()
+    finally:
+        clerk.stop()
+
+    result = {
+        'meta': report.metadata(),
+        'config': {'mix': args.mix, 'users': sum(count for count, _ in MIXES[args.mix].values()),
+                   'server': args.server, 'seconds': args.seconds, 'warmup': args.warmup, 'think': args.think,
+                   'patients': args.patients, 'appointments': args.appointments,
+                   'clerk_latency': args.clerk_latency, 'seed': args.seed},
+        'mix': {role: {'users': count, 'actions': actions} for role, (count, actions) in MIXES[args.mix].items()},
+        **report.summarize(samples, args.seconds),
+        'server': {'peak_rss_mb': rss, 'clerk_requests': clerk.requests},
+    }
+    report.print_summary(result)
+    if args.out:
+        report.save(result, args.out)
+    if baseline and report.compare(result, baseline):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Clerk Backend API taklidi: oturum token'ı üretir ve /v1/users/<id> uç noktasını sunar.
+
+Uygulama (app/routes/auth_routes.py, app/asgi.py) __session çerezindeki token'ın imzasını doğrulamaz,
+`sub` alanındaki kullanıcının e-postasını Clerk API'sinden okur. Sunucu süreci CLERK_API_URL ile
+buraya yönlendirilir.
+"""
+import re
+import json
+import time
+import base64
+import secrets
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_SECRET = 'sk_test_yuk'
+USER_PATH = re.compile(r'^/v1/users/([^/?]+)$')
+TOKEN_TTL = 3600  # saniye
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).rstrip(b'=').decode()
+
+
+class FakeClerk:
+    """Kayıtlı kullanıcılar için token ve kullanıcı kaydı; `latency` her API isteğine eklenir.
+
+    fallback_domain verilirse kayıtsız id'ler için '<id>@<alan>' e-postası döner (bench_async.py),
+    verilmezse 404.
+    """
+
+    def __init__(self, secret=DEFAULT_SECRET, latency=0.0, fallback_domain=None):
+        self.secret = secret
+        self.latency = latency
+        self.fallback_domain = fallback_domain
+        self.users = {}  # Clerk kullanıcı id'si -> e-posta
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = None
+
+    # --- TOKEN ---
+    def issue(self, email, user_id=None):
+        """Kullanıcıyı kaydeder ve __session çerezine konacak oturum token'ını döner."""
+        user_id = user_id or f"user_{secrets.token_hex(8)}"
+        self.users[user_id] = email
+        now = int(time.time())
+        payload = {'sub': user_id, 'sid': f"sess_{secrets.token_hex(8)}", 'iss': 'https://clerk.yuk.test',
+                   'iat': now, 'nbf': now, 'exp': now + TOKEN_TTL}
+        return f"{_b64({'alg': 'RS256', 'typ': 'JWT'})}.{_b64(payload)}.{secrets.token_urlsafe(16)}"
+
+    def user(self, user_id):
+        email = self.users.get(user_id)
+        if email is None and self.fallback_domain:
+            email = f'{user_id}@{self.fallback_domain}'
+        if email is None:
+            return None
+        return {'id': user_id, 'primary_email_address_id': f'idn_{user_id}',
+                'email_addresses': [{'id': f'idn_{user_id}', 'email_address': email}]}
+
+    # --- HTTP ---
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        clerk = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with clerk._lock:
+                    clerk.requests += 1
+                if clerk.latency:
+                    time.sleep(clerk.latency)
+                match = USER_PATH.match(self.path)
+                if self.headers.get('Authorization') != f'Bearer {clerk.secret}':
+                    self._send(401, {'errors': [{'code': 'authentication_invalid'}]})
+                elif not match or (user := clerk.user(match.group(1))) is None:
+                    self._send(404, {'errors': [{'code': 'resource_not_found'}]})
+                else:
+                    self._send(200, user)
+
+            def _send(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,131 @@
+"""Yük testi sonuçları: eylem başına özet, JSON kaydı ve önceki koşuyla karşılaştırma."""
+import json
+import sys
+import sqlite3
+import platform
+import subprocess
+from datetime import datetime, timezone
+from collections import Counter
+
+OUTCOMES = ('ok', 'conflict', 'rejected', 'error')
+PERCENTILES = (50, 90, 99)
+# Karşılaştırmada bu kadarlık değişim gürültü sayılır (aynı makinede tekrarlanan koşuların sapması)
+NOISE = 0.10
+# Daha az örnekli eylemlerin p99'u tek isteğe bağlıdır: gerileme sayılmaz, yalnızca gösterilir
+MIN_SAMPLES = 100
+
+
+def percentile(ordered, p):
+    """En yakın sıra yöntemi; `ordered` sıralı olmalı."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+
+def _stats(samples, seconds):
+    latencies = sorted(s[3] for s in samples)
+    count = len(samples)
+    stats = {'count': count, 'rps': count / seconds if seconds else 0.0}
+    for p in PERCENTILES:
+        stats[f'p{p}_ms'] = percentile(latencies, p) * 1000
+    stats['max_ms'] = latencies[-1] * 1000 if latencies else 0.0
+    for outcome in OUTCOMES:
+        stats[f'{outcome}_pct'] = 100 * sum(s[1] == outcome for s in samples) / count if count else 0.0
+    stats['errors'] = dict(Counter(str(s[2]) for s in samples if s[1] == 'error'))  # HTTP durumu ya da istemci hatası
+    return stats
+
+
+def summarize(samples, seconds):
+    """{'total': {...}, 'actions': {eylem: {...}}} — gecikmeler ms, oranlar yüzde."""
+    actions = {}
+    for action in sorted({s[0] for s in samples}):
+        actions[action] = _stats([s for s in samples if s[0] == action], seconds)
+    return {'total': _stats(samples, seconds), 'actions': actions}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(('git',) + args, capture_output=True, text=True, timeout=10, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadata():
+    """Koşunun tekrarlanabilmesi için kod sürümü ve ortam."""
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+
+
+def save(result, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --- ÇIKTI ---
+COLUMNS = (('count', 'adet', '{:>8.0f}'), ('rps', 'istek/sn', '{:>10.1f}'), ('p50_ms', 'p50 ms', '{:>9.1f}'),
+           ('p90_ms', 'p90 ms', '{:>9.1f}'), ('p99_ms', 'p99 ms', '{:>9.1f}'), ('max_ms', 'max ms', '{:>9.1f}'),
+           ('conflict_pct', 'çakışma%', '{:>9.1f}'), ('rejected_pct', 'dolu%', '{:>7.1f}'),
+           ('error_pct', 'hata%', '{:>7.1f}'))
+
+
+def _row(name, stats):
+    return f'{name:<10}' + ''.join(fmt.format(stats[key]) for key, _, fmt in COLUMNS)
+
+
+def print_summary(result, out=sys.stdout):
+    config, meta = result['config'], result['meta']
+    commit = (meta['commit'] or '?')[:10] + (' (değişiklik var)' if meta['dirty'] else '')
+    print(f"{config['mix']} karışımı, {config['users']} VU, {config['server']}, {config['seconds']:g} sn "
+          f"(+{config['warmup']:g} ısınma), {config['patients']} hasta / {config['appointments']} randevu, "
+          f"commit {commit}", file=out)
+    header = ''.join(f'{label:>{len(fmt.format(0))}}' for _, label, fmt in COLUMNS)
+    print(f"{'':<10}{header}", file=out)
+    for action, stats in result['actions'].items():
+        print(_row(action, stats), file=out)
+    print(_row('TOPLAM', result['total']), file=out)
+    if result['total']['errors']:
+        print('hatalar: ' + ', '.join(f'{status}×{n}' for status, n in result['total']['errors'].items()), file=out)
+    if result['server'].get('peak_rss_mb'):
+        print(f"sunucu tepe RSS: {result['server']['peak_rss_mb']:.0f} MB", file=out)
+
+
+def _delta(new, old):
+    if not old:
+        return '     yeni' if new else '        -'
+    return f'{(new - old) / old * 100:>+8.1f}%'
+
+
+def compare(result, baseline, out=sys.stdout):
+    """Önceki koşuya göre eylem başına değişim. Ayarlar farklıysa uyarır (sonuçlar kıyaslanamaz)."""
+    keys = ('mix', 'users', 'server', 'seconds', 'patients', 'appointments', 'think', 'clerk_latency')
+    differs = [k for k in keys if result['config'].get(k) != baseline['config'].get(k)]
+    print(f"\nKarşılaştırma: {(baseline['meta']['commit'] or '?')[:10]} ({baseline['meta']['timestamp']})", file=out)
+    if differs:
+        print(f"UYARI: ayarlar farklı ({', '.join(differs)}); değişimler yük farkını da içerir", file=out)
+    print(f"{'':<10}{'istek/sn':>10}{'p50':>10}{'p99':>10}{'hata% (önce→şimdi)':>22}", file=out)
+    regressions = []
+    rows = dict(result['actions'], TOPLAM=result['total'])
+    base_rows = dict(baseline['actions'], TOPLAM=baseline['total'])
+    for name, stats in rows.items():
+        old = base_rows.get(name, {})
+        print(f"{name:<10}{_delta(stats['rps'], old.get('rps')):>10}{_delta(stats['p50_ms'], old.get('p50_ms')):>10}"
+              f"{_delta(stats['p99_ms'], old.get('p99_ms')):>10}"
+              f"{old.get('error_pct', 0):>13.1f} → {stats['error_pct']:<6.1f}", file=out)
+        if old and stats['count'] >= MIN_SAMPLES and (stats['rps'] < old['rps'] * (1 - NOISE) or stats['p99_ms'] > old['p99_ms'] * (1 + NOISE)
+                    or stats['error_pct'] > old['error_pct']):
+            regressions.append(name)
+    if regressions:
+        print(f"Gerileme (±{NOISE:.0%} gürültü payı dışında): {', '.join(regressions)}", file=out)
+    return regressions
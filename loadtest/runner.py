@@ -0,0 +1,176 @@
+"""Yük testi çalıştırıcı: veri, sunucu süreci, Clerk girişi ve sanal kullanıcı döngüsü."""
+import os
+import time
+import logging
+import random
+import socket
+import asyncio
+import multiprocessing
+from datetime import datetime, timedelta
+from loadtest.scenarios import VirtualUser, MIXES, OPENING_HOUR, CLOSING_HOUR
+
+SERVERS = ('werkzeug', 'uvicorn')
+SECRET_KEY = 'yuk-testi'
+STARTUP_TIMEOUT = 30  # saniye
+# Veri: bugünün ±SEED_DAYS günü, SLOT_MINUTES'lık randevular
+DENTISTS, CHAIRS = 3, 4
+SEED_DAYS = 14
+SLOT_MINUTES = 30
+
+
+def app_config(path):
+    return {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SECRET_KEY': SECRET_KEY, 'SCHEDULER_ENABLED': False,
+            'AUDIT_JOURNAL_DIR': None, 'TEMPLATE_CACHE_DIR': None, 'OUTBOX_TRANSPORTS': {'sms': 'stub', 'email': 'stub'}}
+
+
+# --- VERİ ---
+def seed(path, patients, appointments, rng_seed):
+    """Hekim / koltuk, yönetici, hastalar ve ±2 haftaya yayılmış, çakışmayan randevular.
+
+    Randevular (gün, saat, hekim) ızgarasından seçilir; hekim i her zaman koltuk i'de çalışır. Izgara
+    doluluğu appointments / kapasite olur (gerçekçi bir takvimde yeni randevu bulunabilmeli).
+    (yönetici e-postası, hasta e-postaları)
+    """
+    from sqlalchemy import insert
+    from app import create_app
+    from app.extensions import db
+    from app.models import User, Appointment, Resource, appointment_resource
+    from app.catalog import seed_defaults
+    from app.routes.auth_routes import ADMIN_EMAILS
+    rng = random.Random(rng_seed)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    grid = [(today + timedelta(days=day, minutes=minute), dentist)
+            for day in range(-SEED_DAYS, SEED_DAYS + 1)
+            for minute in range(OPENING_HOUR * 60, CLOSING_HOUR * 60, SLOT_MINUTES)
+            for dentist in range(DENTISTS)]
+    if appointments > len(grid):
+        raise ValueError(f'En fazla {len(grid)} randevu sığar ({DENTISTS} hekim, ±{SEED_DAYS} gün)')
+    app = create_app(app_config(path))
+    admin_email = sorted(ADMIN_EMAILS)[0]
+    emails = [f'hasta{i}@yuk.test' for i in range(patients)]
+    with app.app_context():
+        db.create_all()
+        dentists = [Resource(name=f'Dr. {i + 1}', kind='dentist') for i in range(DENTISTS)]
+        chairs = [Resource(name=f'Koltuk {i + 1}', kind='chair') for i in range(CHAIRS)]
+        db.session.add_all(dentists + chairs)
+        seed_defaults()
+        db.session.add(User(username=admin_email, email=admin_email, full_name='Yönetici', role='admin', password_hash='clerk'))
+        db.session.add_all(User(username=email, email=email, full_name=f'Hasta {i}', phone=f'0532{i:07d}',
+                                role='patient', password_hash='clerk') for i, email in enumerate(emails))
+        db.session.flush()
+        patient_ids = [u.id for u in User.query.filter_by(role='patient')]
+        chosen = sorted(rng.sample(grid, appointments))
+        now = datetime.now()
+        db.session.execute(insert(Appointment), [
+            {'title': rng.choice(('Muayene', 'Diş Taşı Temizliği')), 'start_time': start,
+             'end_time': start + timedelta(minutes=SLOT_MINUTES), 'user_id': rng.choice(patient_ids),
+             'status': 'confirmed' if start > now else 'completed'}
+            for start, _ in chosen])
+        ids = [a for (a,) in db.session.query(Appointment.id).order_by(Appointment.id)]
+        db.session.execute(insert(appointment_resource), [
+            {'appointment_id': appt_id, 'resource_id': resource.id}
+            for appt_id, (_, dentist) in zip(ids, chosen) for resource in (dentists[dentist], chairs[dentist])])
+        db.session.commit()
+        db.engine.dispose()
+    return admin_email, emails
+
+
+# --- SUNUCU (ayrı süreç) ---
+def _serve(server, path, port, clerk_api, clerk_secret):
+    os.environ.update(CLERK_API_URL=clerk_api, CLERK_SECRET_KEY=clerk_secret)  # auth_routes import edilmeden önce
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # İstek başına erişim satırı ölçümü yavaşlatır
+    from app import create_app
+    app = create_app(app_config(path))
+    if server == 'werkzeug':
+        from werkzeug.serving import make_server
+        make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from app.asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(app), host='127.0.0.1', port=port, log_level='warning')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, path, clerk):
+    port = free_port()
+    proc = multiprocessing.get_context('spawn').Process(
+        target=_serve, args=(server, path, port, clerk.api_url, clerk.secret), daemon=True)
+    proc.start()
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return proc, f'http://127.0.0.1:{port}'
+        except OSError:
+            if time.monotonic() > deadline or not proc.is_alive():
+                proc.terminate()
+                raise RuntimeError(f'{server} sunucusu açılamadı')
+            time.sleep(0.1)
+
+
+def peak_rss_mb(pid):
+    """Sürecin tepe bellek kullanımı (Linux /proc; başka sistemde None)."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# --- YÜK ---
+async def login(vu, clerk, email):
+    """Clerk akışı: token -> /auth/check-clerk -> Flask oturumu; ardından CSRF token'ı."""
+    token = clerk.issue(email, user_id=f'user_{vu.role}_{vu.n}')
+    vu.http.cookies.set('__session', token)
+    r = await vu.http.get('/auth/check-clerk')
+    if r.status_code != 302 or '/login' in r.headers.get('Location', ''):
+        raise RuntimeError(f'{email}: Clerk girişi başarısız ({r.status_code})')
+    r = await vu.http.get('/api/user/csrf-token')
+    r.raise_for_status()
+    vu.csrf = r.json()['csrf_token']
+
+
+async def drive(base_url, clerk, mix, admin_email, patient_emails, seconds, warmup, think, rng_seed):
+    """Karışımı çalıştırır. Isınma süresindeki istekler sayılmaz. [(eylem, sonuç, durum, gecikme sn)]"""
+    import httpx
+    samples, users, clients = [], [], []
+    n = 0
+    for role, (count, actions) in MIXES[mix].items():
+        for _ in range(count):
+            http = httpx.AsyncClient(base_url=base_url, timeout=60, follow_redirects=False,
+                                     limits=httpx.Limits(max_connections=1))
+            clients.append(http)
+            users.append(VirtualUser(n, role, actions, http, random.Random(rng_seed * 100003 + n)))
+            n += 1
+    try:
+        await asyncio.gather(*(login(vu, clerk, patient_emails[vu.n % len(patient_emails)] if vu.role == 'patient'
+                                     else admin_email) for vu in users))
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        deadline = measure_from + seconds
+
+        async def run(vu):
+            while loop.time() < deadline:
+                action = vu.next_action()
+                started = loop.time()
+                try:
+                    status, outcome = await getattr(vu, action)()
+                except (httpx.HTTPError, ValueError, KeyError) as exc:  # Durum yerine hata sınıfı kaydedilir
+                    status, outcome = type(exc).__name__, 'error'
+                if started >= measure_from:
+                    samples.append((action, outcome, status, loop.time() - started))
+                if think:
+                    await asyncio.sleep(vu.rng.expovariate(1 / think))
+
+        await asyncio.gather(*(run(vu) for vu in users))
+    finally:
+        await asyncio.gather(*(http.aclose() for http in clients))
+    return samples
@@ -0,0 +1,126 @@
+"""Sanal kullanıcı davranışları ve yük karışımları.
+
+Her sanal kullanıcı (VU) kendi oturumuyla döngüde, rolünün eylemlerinden ağırlığa göre birini seçer.
+Eylem sonucu: ok, conflict (409: aynı randevuyu başkası değiştirmiş), rejected (400: saat dolu —
+iş kuralı, hata sayılmaz) ya da error.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+# Personel aynı gün tablosu üzerinde çalışır: düzenlemeler akıştaki ilk bu kadar randevuya gider
+HOT_APPOINTMENTS = 20
+OPENING_HOUR, CLOSING_HOUR = 9, 18
+BOOKING_DAYS = 14
+PROCEDURES = ('Muayene', 'Dolgu', 'Diş Taşı Temizliği')
+
+# rol -> (VU sayısı, {eylem: ağırlık})
+MIXES = {
+    # Hastalar takvimi yokluyor ve randevu alıyor, personel düzenliyor, yöneticiler paneli açıyor
+    'karma': {
+        'patient': (40, {'takvim': 8, 'musait': 2, 'randevu': 1}),
+        'staff': (6, {'akis': 3, 'duzenle': 3, 'olustur': 1}),
+        'admin': (2, {'panel': 1}),
+    },
+    # Yalnızca takvim yoklama (okuma yolu, replika / önbellek karşılaştırmaları için)
+    'takvim': {'patient': (80, {'takvim': 1})},
+    # Yoğun düzenleme: sürüm çakışması oranı
+    'duzenleme': {'staff': (20, {'akis': 1, 'duzenle': 3})},
+    # Randevu alma yarışı: aynı günlere çok sayıda hasta
+    'randevu': {'patient': (40, {'musait': 1, 'randevu': 2})},
+}
+
+
+def week_range(now=None, offset=0):
+    monday = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    monday -= timedelta(days=monday.weekday() - 7 * offset)
+    return monday, monday + timedelta(days=7)
+
+
+class VirtualUser:
+    def __init__(self, n, role, actions, http, rng):
+        self.n, self.role, self.http, self.rng = n, role, http, rng
+        self.names, self.weights = list(actions), list(actions.values())
+        self.csrf = None
+        self.board = []  # Personel: [id, sürüm] (son akıştan)
+        self.sequence = 0
+
+    def next_action(self):
+        return self.rng.choices(self.names, self.weights)[0]
+
+    def _form_headers(self, idempotent=False):
+        headers = {'X-CSRFToken': self.csrf}
+        if idempotent:
+            headers['Idempotency-Key'] = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        return headers
+
+    def _slot(self):
+        day = datetime.now().date() + timedelta(days=self.rng.randint(1, BOOKING_DAYS))
+        minutes = self.rng.randrange(OPENING_HOUR * 60, CLOSING_HOUR * 60 - 60, 15)
+        return day.isoformat(), f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+    # --- HASTA ---
+    async def takvim(self):
+        start, end = week_range(offset=self.rng.randint(0, 1))
+        r = await self.http.get('/api/user/calendar', params={'start': start.isoformat(), 'end': end.isoformat()})
+        return r.status_code, 'ok' if r.status_code == 200 else 'error'
+
+    async def musait(self):
+        day, _ = self._slot()
+        r = await self.http.get('/api/availability', params={'date': day, 'title': self.rng.choice(PROCEDURES)})
+        return r.status_code, 'ok' if r.status_code == 200 else 'error'
+
+    async def randevu(self):
+        day, at = self._slot()
+        r = await self.http.post('/api/user/appointment/create', headers=self._form_headers(idempotent=True),
+                                 data={'appt_date': day, 'appt_time': at, 'title': self.rng.choice(PROCEDURES)})
+        return r.status_code, _outcome(r)
+
+    # --- PERSONEL ---
+    async def akis(self):
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        r = await self.http.get('/api/appointments', params={'start': today.isoformat(),
+                                                              'end': (today + timedelta(days=2)).isoformat()})
+        if r.status_code != 200:
+            return r.status_code, 'error'
+        events = sorted(r.json(), key=lambda e: e['start'])
+        self.board = [[e['id'], e['extendedProps']['version']] for e in events[:HOT_APPOINTMENTS]]
+        return r.status_code, 'ok'
+
+    async def duzenle(self):
+        if not self.board:
+            return await self.akis()
+        entry = self.rng.choice(self.board)
+        self.sequence += 1
+        r = await self.http.post(f'/api/appointments/{entry[0]}/update', headers=self._form_headers(),
+                                 data={'notes': f'yük testi {self.n}-{self.sequence}', 'version': entry[1]})
+        if r.status_code == 200:
+            entry[1] = r.json()['version']
+        elif r.status_code == 409:  # Form güncel kayıtla yenilenir (kullanıcı tekrar dener)
+            current = r.json().get('current')
+            if current:
+                entry[1] = current['extendedProps']['version']
+            else:
+                self.board.remove(entry)
+        return r.status_code, _outcome(r)
+
+    async def olustur(self):
+        day, at = self._slot()
+        r = await self.http.post('/api/appointments/create', headers=self._form_headers(), data={
+            'appt_date': day, 'appt_time': at, 'title': self.rng.choice(PROCEDURES),
+            'guest_name': f'Yük Hasta {self.rng.randrange(10000)}', 'guest_phone': f'0555 {self.rng.randrange(10 ** 7):07d}'})
+        return r.status_code, _outcome(r)
+
+    # --- YÖNETİCİ ---
+    async def panel(self):
+        r = await self.http.get('/admin/dashboard')
+        return r.status_code, 'ok' if r.status_code == 200 else 'error'
+
+
+def _outcome(response):
+    if response.status_code == 200:
+        return 'ok'
+    if response.status_code == 409:
+        return 'conflict'
+    if response.status_code == 400:
+        return 'rejected'
+    return 'error'
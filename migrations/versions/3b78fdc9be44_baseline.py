@@ -0,0 +1,70 @@
+"""İlk şema: kullanıcı, randevu, tedavi
+
+Migration'lardan önce `db.create_all()` ile açılmış veritabanlarında bu tablolar zaten vardır;
+o durumda bu adım hiçbir şey yapmaz ve `flask db upgrade` sonraki adımlardan devam eder.
+
+Revision ID: 3b78fdc9be44
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b78fdc9be44'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'user' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=150), nullable=False),
+        sa.Column('password_hash', sa.String(length=256), nullable=True),
+        sa.Column('full_name', sa.String(length=150), nullable=True),
+        sa.Column('email', sa.String(length=150), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('role', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+    )
+    op.create_table(
+        'appointment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(length=100), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=True),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('guest_name', sa.String(length=100), nullable=True),
+        sa.Column('guest_phone', sa.String(length=20), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'treatment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('procedure_name', sa.String(length=100), nullable=True),
+        sa.Column('tooth_number', sa.String(length=10), nullable=True),
+        sa.Column('cost', sa.Float(), nullable=True),
+        sa.Column('payment_received', sa.Float(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('treatment')
+    op.drop_table('appointment')
+    op.drop_table('user')
@@ -0,0 +1,369 @@
+"""Randevu serisi, kaynaklar, şubeler, işlem kataloğu, bakım görevleri, denetim kaydı, arşiv
+
+Temel şemaya (3b78fdc9be44) sonradan eklenen tüm tablolar, sütunlar, kısıtlar ve indeksler:
+- appointment: series_id, recurrence, version, clinic_id + klinik bazlı bileşik indeksler
+- treatment: version, clinic_id + indeksler
+- user: clinic_id, phone_normalized, calendar_token; kullanıcı adı benzersizliği
+  username yerine (clinic_id, username), tek şubede (clinic_id boş) kısmi indeksle
+- appointment / treatment AUTOINCREMENT olur (arşive taşınan id'ler yeniden verilmez)
+- İşlem kataloğu varsayılan işlemlerle başlar (bkz. app/catalog.py)
+
+SQLite ALTER TABLE kısıt değiştiremediği için mevcut tablolar batch modunda yeniden oluşturulur.
+Yükseltmeden sonra mevcut telefonlar için: `flask patients normalize`.
+
+Revision ID: b092656c357f
+Revises: 3b78fdc9be44
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b092656c357f'
+down_revision = '3b78fdc9be44'
+branch_labels = None
+depends_on = None
+
+# Temel şemadaki adsız kısıtlar (SQLite) bu adlarla bulunur; yeni kısıtlar da bu adları alır
+NAMING = {
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+# Migration anındaki app/catalog.py DEFAULT_PROCEDURES kopyası (sonraki değişiklikler buraya yansımaz)
+DEFAULT_PROCEDURES = [
+    {'name': 'Muayene', 'icon': '🔍', 'duration': 30},
+    {'name': 'Diş Taşı Temizliği', 'icon': '✨', 'duration': 30},
+    {'name': 'Diş Çekimi', 'icon': '🦷', 'duration': 30},
+    {'name': 'Dolgu', 'icon': '⚒️', 'duration': 45},
+    {'name': 'Kanal Tedavisi', 'icon': '⚡', 'duration': 60},
+    {'name': 'İmplant', 'icon': '⚙️', 'duration': 90},
+]
+
+
+def upgrade():
+    op.create_table('clinic',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('slug', sa.String(length=50), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=True),
+    sa.Column('database_uri', sa.String(length=300), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slug')
+    )
+    op.create_table('cache_version',
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+    # --- Mevcut tablolar ---
+    with op.batch_alter_table('user', naming_convention=NAMING) as batch_op:
+        batch_op.add_column(sa.Column('phone_normalized', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('calendar_token', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('clinic_id', sa.Integer(), nullable=True))
+        batch_op.drop_constraint('uq_user_username', type_='unique')
+        batch_op.create_unique_constraint('uq_user_clinic_username', ['clinic_id', 'username'])
+        batch_op.create_index('uq_user_username_single', ['username'], unique=True,
+                              sqlite_where=sa.text('clinic_id IS NULL'), postgresql_where=sa.text('clinic_id IS NULL'))
+        batch_op.create_unique_constraint('uq_user_calendar_token', ['calendar_token'])
+        batch_op.create_foreign_key('fk_user_clinic_id_clinic', 'clinic', ['clinic_id'], ['id'])
+        batch_op.create_index('ix_user_clinic_phone', ['clinic_id', 'phone_normalized', 'role'], unique=False)
+        batch_op.create_index('ix_user_clinic_role', ['clinic_id', 'role'], unique=False)
+
+    with op.batch_alter_table('appointment', recreate='always', naming_convention=NAMING,
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.add_column(sa.Column('series_id', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('recurrence', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('clinic_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_appointment_clinic_id_clinic', 'clinic', ['clinic_id'], ['id'])
+        batch_op.create_index('ix_appointment_clinic_end', ['clinic_id', 'end_time'], unique=False)
+        batch_op.create_index('ix_appointment_clinic_start', ['clinic_id', 'start_time', 'end_time', 'status'], unique=False)
+        batch_op.create_index('ix_appointment_clinic_status_end', ['clinic_id', 'status', 'end_time'], unique=False)
+        batch_op.create_index('ix_appointment_clinic_user_start', ['clinic_id', 'user_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_appointment_series_id', ['series_id'], unique=False)
+
+    with op.batch_alter_table('treatment', recreate='always', naming_convention=NAMING,
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('clinic_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_treatment_clinic_id_clinic', 'clinic', ['clinic_id'], ['id'])
+        batch_op.create_index('ix_treatment_clinic_date', ['clinic_id', 'date'], unique=False)
+        batch_op.create_index('ix_treatment_clinic_user_date', ['clinic_id', 'user_id', 'date'], unique=False)
+
+    # --- Kaynaklar ve işlem kataloğu ---
+    op.create_table('resource',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('resource', schema=None) as batch_op:
+        batch_op.create_index('ix_resource_clinic_kind', ['clinic_id', 'kind'], unique=False)
+
+    op.create_table('appointment_resource',
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ),
+    sa.ForeignKeyConstraint(['resource_id'], ['resource.id'], ),
+    sa.PrimaryKeyConstraint('appointment_id', 'resource_id')
+    )
+    with op.batch_alter_table('appointment_resource', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_resource_resource', ['resource_id', 'appointment_id'], unique=False)
+
+    procedure = op.create_table('procedure',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('icon', sa.String(length=10), nullable=True),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('buffer_minutes', sa.Integer(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('required_resources', sa.String(length=100), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('sort_order', sa.Integer(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('clinic_id', 'name', name='uq_procedure_clinic_name')
+    )
+    op.bulk_insert(procedure, [
+        dict(p, buffer_minutes=0, price=0.0, required_resources='dentist,chair', active=True, sort_order=i)
+        for i, p in enumerate(DEFAULT_PROCEDURES)
+    ])
+
+    # --- Grup seansları ---
+    op.create_table('member',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('full_name', sa.String(length=150), nullable=False),
+    sa.Column('credits', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('time', sa.Time(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=True),
+    sa.Column('spots_left', sa.Integer(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('completed', sa.Boolean(), nullable=True),
+    sa.Column('is_recurring', sa.Boolean(), nullable=True),
+    sa.Column('recur_group_id', sa.String(length=36), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('session', schema=None) as batch_op:
+        batch_op.create_index('ix_session_date_time', ['date', 'time'], unique=False)
+
+    op.create_table('reservation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('user_name', sa.String(length=150), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('cancel_status', sa.String(length=20), nullable=True),
+    sa.Column('cancel_reason', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['session.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.create_index('ix_reservation_session_user', ['session_id', 'user_name', 'status'], unique=False)
+
+    # --- Zamanlanmış görevler ---
+    op.create_table('job_lock',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('owner', sa.String(length=200), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('job_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(length=100), nullable=True),
+    sa.Column('worker', sa.String(length=200), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('duration_ms', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('rows_affected', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_run', schema=None) as batch_op:
+        batch_op.create_index('ix_job_run_job_name', ['job_name'], unique=False)
+        batch_op.create_index('ix_job_run_started_at', ['started_at'], unique=False)
+
+    # --- Bildirim kuyruğu ve bekleme listesi ---
+    op.create_table('outbox_message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('kind', sa.String(length=30), nullable=True),
+    sa.Column('channel', sa.String(length=10), nullable=True),
+    sa.Column('recipient', sa.String(length=150), nullable=True),
+    sa.Column('subject', sa.String(length=200), nullable=True),
+    sa.Column('body', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('due_at', sa.DateTime(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('claimed_by', sa.String(length=200), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('outbox_message', schema=None) as batch_op:
+        batch_op.create_index('ix_outbox_clinic_status_next', ['clinic_id', 'status', 'next_attempt_at'], unique=False)
+        batch_op.create_index('ix_outbox_message_appointment_id', ['appointment_id'], unique=False)
+
+    op.create_table('waitlist_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=150), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('procedure', sa.String(length=100), nullable=True),
+    sa.Column('duration', sa.Integer(), nullable=True),
+    sa.Column('earliest', sa.DateTime(), nullable=False),
+    sa.Column('latest', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('offer_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('waitlist_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_waitlist_entry_created_at', ['created_at'], unique=False)
+        batch_op.create_index('ix_waitlist_match', ['clinic_id', 'status', 'earliest', 'latest'], unique=False)
+
+    # --- Denetim kaydı, arşiv, tekrarlanabilir istekler ---
+    op.create_table('audit_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.String(length=32), nullable=False),
+    sa.Column('entity', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('actor_name', sa.String(length=150), nullable=True),
+    sa.Column('source', sa.String(length=100), nullable=True),
+    sa.Column('changes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id')
+    )
+    with op.batch_alter_table('audit_log', schema=None) as batch_op:
+        batch_op.create_index('ix_audit_clinic_actor', ['clinic_id', 'actor_id', 'id'], unique=False)
+        batch_op.create_index('ix_audit_clinic_entity', ['clinic_id', 'entity', 'entity_id', 'id'], unique=False)
+
+    op.create_table('appointment_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(length=100), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.Column('guest_name', sa.String(length=100), nullable=True),
+    sa.Column('guest_phone', sa.String(length=20), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('series_id', sa.String(length=36), nullable=True),
+    sa.Column('recurrence', sa.String(length=100), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('resource_ids', sa.String(length=200), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('appointment_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_archive_clinic_start', ['clinic_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_appointment_archive_clinic_user', ['clinic_id', 'user_id', 'start_time'], unique=False)
+
+    op.create_table('treatment_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('procedure_name', sa.String(length=100), nullable=True),
+    sa.Column('tooth_number', sa.String(length=10), nullable=True),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('payment_received', sa.Float(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('treatment_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_treatment_archive_clinic_user_date', ['clinic_id', 'user_id', 'date'], unique=False)
+
+    op.create_table('idempotency_key',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('endpoint', sa.String(length=100), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('clinic_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['clinic_id'], ['clinic.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key')
+    )
+    with op.batch_alter_table('idempotency_key', schema=None) as batch_op:
+        batch_op.create_index('ix_idempotency_created', ['created_at'], unique=False)
+
+
+def downgrade():
+    for table in ('idempotency_key', 'treatment_archive', 'appointment_archive', 'audit_log', 'waitlist_entry',
+                  'outbox_message', 'job_run', 'job_lock', 'reservation', 'session', 'member', 'procedure',
+                  'appointment_resource', 'resource'):
+        op.drop_table(table)  # Tabloyla birlikte indeksleri de gider
+
+    with op.batch_alter_table('treatment', recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        batch_op.drop_index('ix_treatment_clinic_user_date')
+        batch_op.drop_index('ix_treatment_clinic_date')
+        batch_op.drop_constraint('fk_treatment_clinic_id_clinic', type_='foreignkey')
+        batch_op.drop_column('clinic_id')
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('appointment', recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        batch_op.drop_index('ix_appointment_series_id')
+        batch_op.drop_index('ix_appointment_clinic_user_start')
+        batch_op.drop_index('ix_appointment_clinic_status_end')
+        batch_op.drop_index('ix_appointment_clinic_start')
+        batch_op.drop_index('ix_appointment_clinic_end')
+        batch_op.drop_constraint('fk_appointment_clinic_id_clinic', type_='foreignkey')
+        batch_op.drop_column('clinic_id')
+        batch_op.drop_column('version')
+        batch_op.drop_column('recurrence')
+        batch_op.drop_column('series_id')
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_index('ix_user_clinic_role')
+        batch_op.drop_index('ix_user_clinic_phone')
+        batch_op.drop_index('uq_user_username_single')
+        batch_op.drop_constraint('fk_user_clinic_id_clinic', type_='foreignkey')
+        batch_op.drop_constraint('uq_user_calendar_token', type_='unique')
+        batch_op.drop_constraint('uq_user_clinic_username', type_='unique')
+        batch_op.create_unique_constraint('uq_user_username', ['username'])  # Şubeler arası tekrarlar varsa başarısız olur
+        batch_op.drop_column('clinic_id')
+        batch_op.drop_column('calendar_token')
+        batch_op.drop_column('phone_normalized')
+
+    op.drop_table('cache_version')
+    op.drop_table('clinic')
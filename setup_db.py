@@ -1,13 +1,15 @@
+from flask_migrate import upgrade
 from app import create_app, db
-from app.models import User
+from app.models import User, Resource
+from app.catalog import seed_defaults
 from werkzeug.security import generate_password_hash
 
 app = create_app()
 
 with app.app_context():
-    # 1. Veritabanı tablolarını oluştur
-    db.create_all()
-    print("Veritabanı tabloları oluşturuldu.")
+    # 1. Şemayı oluştur / güncelle (migrations/; mevcut veritabanında eksik sütun ve indeksleri ekler)
+    upgrade()
+    print("Veritabanı şeması güncel.")
 
     # 2. Yönetici (Diş Hekimi) Kullanıcısını oluştur
     if not User.query.filter_by(username='admin').first():
@@ -22,4 +24,19 @@ with app.app_context():
         db.session.commit()
         print("Admin kullanıcısı oluşturuldu. Kullanıcı adı: admin, Şifre: 123456")
     else:
-        print("Admin kullanıcısı zaten var.")
\ No newline at end of file
+        print("Admin kullanıcısı zaten var.")
+
+    # 3. Kaynaklar: 2 hekim, 3 koltuk (çakışma kontrolü kaynak bazında yapılır)
+    if not Resource.query.first():
+        db.session.add_all(
+            [Resource(name=f'Hekim {i}', kind='dentist') for i in (1, 2)] +
+            [Resource(name=f'Koltuk {i}', kind='chair') for i in (1, 2, 3)]
+        )
+        db.session.commit()
+        print("Varsayılan kaynaklar oluşturuldu (2 hekim, 3 koltuk).")
+
+    # 4. İşlem kataloğu (süre, hazırlık, ücret, gerekli kaynaklar; yönetim panelinden düzenlenir)
+    added = seed_defaults()
+    db.session.commit()
+    if added:
+        print(f"Varsayılan işlemler oluşturuldu ({added} işlem).")
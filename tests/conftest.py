@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+import pytest
+from flask_login import FlaskLoginClient
+from app import create_app
+from app.extensions import db
+from app.models import User, Appointment, Resource, WaitlistEntry, Member, Session
+from app.replica import read_engine
+from app.tenancy import clinics, create_clinic, tenant, tenant_engine
+from app.catalog import refresh
+
+
+def make_app(path, **config):
+    """Geçici SQLite dosyasında test uygulaması (okuma replikası dahil: GET'ler mode=ro bağlantıdan okunur)."""
+    app = create_app(dict({
+        'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'WTF_CSRF_ENABLED': False,
+        'AUDIT_JOURNAL_DIR': None, 'TEMPLATE_CACHE_DIR': None, 'BACKUP_DIR': str(path.parent / 'backups'),
+        'PROCEDURE_CACHE_CHECK': 0,  # Katalog sürüm kontrolü her istekte: bütçeler en kötü durumu ölçer
+    }, **config))
+    app.test_client_class = FlaskLoginClient
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path / 'test.db')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def seeded(app):
+    """Her route'un sorgu yollarını çalıştıracak veri (app/query_plans.py örneği + seri, bekleme teklifi)."""
+    from app.query_plans import seed_sample
+    from app.recurrence import create_series, build_rule
+    from app.waitlist import promote
+    with app.app_context():
+        admin_id, patient_id, appointment_id = seed_sample()
+        chair = Resource.query.filter_by(kind='chair').first()
+        start = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        series_id, _ = create_series(start, 30, build_rule('WEEKLY', count=4), resources=[chair],
+                                     title='Muayene', user_id=patient_id)
+        promote([(start + timedelta(hours=3), start + timedelta(hours=3, minutes=30))])  # Bekleyen hastaya teklif
+        session = Session(date=start.date(), time=start.time(), capacity=4, spots_left=4)  # Yarınki grup seansı
+        db.session.add_all([session, Member(full_name='Hasta', credits=5)])
+        db.session.commit()
+        ids = {
+            'admin': admin_id, 'patient': patient_id, 'appointment': appointment_id,
+            'series': db.session.query(Appointment.id).filter_by(series_id=series_id).order_by(Appointment.start_time).first()[0],
+            'resource': chair.id, 'offer': WaitlistEntry.query.filter_by(status='offered').one().id,
+            'session': session.id,
+        }
+    return ids
+
+
+@pytest.fixture
+def clients(app, seeded):
+    """{'admin', 'patient', None} -> test istemcisi (oturum açık)."""
+    with app.app_context():
+        users = {role: db.session.get(User, seeded[role]) for role in ('admin', 'patient')}
+        db.session.expunge_all()
+        # Süreç başına bir kez yapılanlar (WAL, şube listesi, katalog yüklemesi) bütçelere girmesin
+        read_engine(db.engine)
+        clinics()
+        with app.test_request_context('/'):
+            refresh()
+    return {None: app.test_client(), **{role: app.test_client(user=user) for role, user in users.items()}}
+
+
+@pytest.fixture
+def branches(app, tmp_path):
+    """Ayrı dosyalı iki şube: A'nın 1 numaralı kullanıcısı hasta, B'ninki yönetici."""
+    app.config['DEFAULT_CLINIC'] = 'a'
+    users = {}
+    with app.app_context():
+        for slug, role in (('a', 'patient'), ('b', 'admin')):
+            clinic = create_clinic(slug, slug.upper(), f"sqlite:///{tmp_path / f'sube_{slug}.db'}")
+            with tenant(clinic.id):
+                user = User(username='kisi', role=role)
+                db.session.add(user)
+                db.session.commit()
+                db.session.refresh(user)
+                # Şube başına bir kez yapılanlar (WAL, katalog yüklemesi) bütçelere girmesin
+                read_engine(tenant_engine(clinic.id))
+                with app.test_request_context('/'):
+                    refresh()
+            db.session.expunge(user)
+            users[slug] = user
+        read_engine(db.engine)
+        clinics()
+    assert users['a'].id == users['b'].id == 1
+    return users
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.extensions import db
+from app.models import (User, Appointment, Treatment, AppointmentArchive, TreatmentArchive, OutboxMessage, WaitlistEntry,
+                        Resource, appointment_resource)
+from app.archive import archive_old_rows, restore, ARCHIVE_AFTER_DAYS
+
+OLD = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS + 30)
+
+
+def _appointment(start, **kwargs):
+    return Appointment(title='Muayene', start_time=start, end_time=start + timedelta(minutes=30), **kwargs)
+
+
+def _message(appt, status):
+    return OutboxMessage(appointment_id=appt.id, kind='reminder_24h', channel='sms', recipient='0555', body='x',
+                         status=status, due_at=appt.start_time, next_attempt_at=appt.start_time, attempts=0)
+
+
+def test_archive_restore_round_trip(app):
+    with app.app_context():
+        patient, chair = User(username='eski-hasta', role='patient'), Resource(name='Koltuk 1', kind='chair')
+        db.session.add_all([patient, chair])
+        db.session.flush()
+        old = _appointment(OLD, user_id=patient.id, status='completed', resources=[chair])
+        waiting = _appointment(OLD + timedelta(hours=1), user_id=patient.id, status='confirmed')
+        recent = _appointment(datetime.now(), user_id=patient.id, status='confirmed')
+        db.session.add_all([old, waiting, recent, Treatment(user_id=patient.id, procedure_name='Dolgu', cost=100, date=OLD),
+                            Treatment(user_id=patient.id, procedure_name='Dolgu', cost=100, date=datetime.now())])
+        db.session.flush()
+        db.session.add_all([_message(old, 'sent'), _message(waiting, 'pending'),
+                            WaitlistEntry(procedure='Muayene', earliest=OLD, latest=OLD + timedelta(hours=2),
+                                          status='booked', appointment_id=old.id)])
+        db.session.commit()
+        patient_id, old_id, waiting_id = patient.id, old.id, waiting.id
+
+        assert archive_old_rows() == 2
+        assert {a.id for a in Appointment.query} == {waiting_id, recent.id}  # Bekleyen hatırlatması olan kalır
+        assert db.session.get(AppointmentArchive, old_id).resource_ids == str(chair.id)
+        assert TreatmentArchive.query.count() == 1
+        # Silinen randevuya işaret eden satır kalmaz
+        assert OutboxMessage.query.filter_by(appointment_id=old_id).count() == 0
+        assert OutboxMessage.query.filter_by(status='sent').one().appointment_id is None
+        assert WaitlistEntry.query.one().appointment_id is None
+        assert db.session.execute(select(appointment_resource).where(appointment_resource.c.appointment_id == old_id)).all() == []
+
+        assert restore(user_id=patient_id) == 2
+        db.session.expire_all()
+        restored = db.session.get(Appointment, old_id)
+        assert (restored.start_time, restored.status, restored.version) == (OLD, 'completed', 1)
+        assert [r.id for r in restored.resources] == [chair.id]
+        assert Treatment.query.count() == 2
+        assert AppointmentArchive.query.count() == TreatmentArchive.query.count() == 0
@@ -0,0 +1,78 @@
+import logging
+from datetime import datetime, timedelta
+import pytest
+from starlette.testclient import TestClient
+from app.asgi import create_asgi_app
+from app.routes.auth_routes import ADMIN_EMAILS
+from loadtest.clerk import FakeClerk
+
+WEEK = f"start={datetime.now():%Y-%m-%d}T00:00:00&end={(datetime.now() + timedelta(days=7)):%Y-%m-%d}T00:00:00"
+
+
+@pytest.fixture
+def asgi(app, clients):
+    with TestClient(create_asgi_app(app), follow_redirects=False) as client:
+        yield client
+
+
+@pytest.fixture
+def clerk(monkeypatch):
+    clerk = FakeClerk().start()
+    monkeypatch.setattr('app.asgi.CLERK_API', clerk.api_url)
+    monkeypatch.setenv('CLERK_SECRET_KEY', clerk.secret)
+    yield clerk
+    clerk.stop()
+
+
+def _flask_session(app, clients, who):
+    """Flask-Login'in yazdığı gerçek oturum çerezi."""
+    client = clients[who]
+    client.get('/api/user/csrf-token')
+    return client.get_cookie(app.config['SESSION_COOKIE_NAME']).value
+
+
+def test_user_calendar_requires_login(asgi):
+    assert asgi.get(f'/api/user/calendar?{WEEK}').status_code == 401
+
+
+def test_user_calendar_reads_flask_session(app, clients, asgi, seeded):
+    asgi.cookies.set(app.config['SESSION_COOKIE_NAME'], _flask_session(app, clients, 'patient'))
+    response = asgi.get(f'/api/user/calendar?{WEEK}', headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    assert seeded['appointment'] in {int(e['id']) for e in response.json() if 'id' in e}
+
+
+def test_check_clerk_logs_in_for_flask(app, asgi, clerk):
+    asgi.cookies.set('__session', clerk.issue(sorted(ADMIN_EMAILS)[0]))
+    response = asgi.get('/auth/check-clerk')
+    assert response.status_code == 302 and response.headers['location'].endswith('/admin/dashboard')
+    assert clerk.requests == 1
+    # Çerez Flask'ın imzasıyla yazıldı: aynı oturumla Flask yolu (WSGI) açılır
+    assert asgi.get('/admin/dashboard').status_code == 200
+
+
+def test_check_clerk_without_token_redirects_to_login(asgi):
+    response = asgi.get('/auth/check-clerk')
+    assert response.status_code == 302 and response.headers['location'].endswith('/login')
+
+
+def test_check_clerk_api_error_is_logged(asgi, monkeypatch, caplog):
+    monkeypatch.setattr('app.asgi.CLERK_API', 'http://127.0.0.1:9/v1')  # Bağlantı reddedilir
+    monkeypatch.setenv('CLERK_SECRET_KEY', 'sk_test')
+    asgi.cookies.set('__session', FakeClerk().issue('hasta@ornek.test'))
+    with caplog.at_level(logging.WARNING, logger='app.asgi'):
+        response = asgi.get('/auth/check-clerk')
+    assert response.status_code == 302 and response.headers['location'].endswith('/login')
+    assert any('Clerk API' in r.getMessage() for r in caplog.records)
+
+
+def test_user_calendar_checks_session_clinic(app, branches):
+    client = app.test_client(user=branches['a'])
+    client.get('/api/user/csrf-token')
+    cookie = client.get_cookie(app.config['SESSION_COOKIE_NAME']).value
+    with TestClient(create_asgi_app(app), follow_redirects=False) as asgi:
+        asgi.cookies.set(app.config['SESSION_COOKIE_NAME'], cookie)
+        assert asgi.get(f'/api/user/calendar?{WEEK}', headers={'X-Clinic': 'b'}).status_code == 200  # Başlık yok sayılır
+        app.config['DEFAULT_CLINIC'] = 'b'  # Aynı çerez B şubesinin adresine gider
+        assert asgi.get(f'/api/user/calendar?{WEEK}').status_code == 401
+        assert asgi.get(f'/api/appointments?{WEEK}').status_code == 401
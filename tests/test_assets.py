@@ -0,0 +1,52 @@
+import os
+from flask import Flask, render_template_string
+from app import assets
+from app.assets import init_assets, build, BUNDLES
+
+SOURCE = 'var feed = "https://ornek.test/api"; // adres\n// yorum\nvar re = /\\/\\/+/g;\n'
+
+
+def _static(tmp_path):
+    static = tmp_path / 'static'
+    for name in {m for members in BUNDLES.values() for m in members}:
+        (static / name).parent.mkdir(parents=True, exist_ok=True)
+        (static / name).write_text(SOURCE if name.endswith('.js') else '.a { color: red; }\n', encoding='utf-8')
+    return static
+
+
+def _app(static, **config):
+    app = Flask(__name__, static_folder=str(static))
+    app.config.update(config)
+    init_assets(app)
+    return app
+
+
+def test_create_app_does_not_build(tmp_path):
+    static = _static(tmp_path)
+    app = _app(static)
+    with app.test_request_context('/'):
+        urls = render_template_string("{{ asset_urls('bundle/calendar.js')|join(' ') }}")
+    assert not os.path.exists(static / 'dist')
+    assert urls == ' '.join(f'/static/{m}' for m in BUNDLES['bundle/calendar.js'])
+
+
+def test_auto_build_only_when_enabled(tmp_path):
+    static = _static(tmp_path)
+    app = _app(static, ASSETS_AUTO_BUILD=True)
+    with app.test_request_context('/'):
+        url = render_template_string("{{ asset_url('bundle/calendar.js') }}")
+    assert url.startswith('/static/dist/bundle/calendar.') and os.path.exists(static / 'dist' / 'manifest.json')
+
+
+def test_minify_keeps_strings_and_regexes(tmp_path):
+    static = _static(tmp_path)
+    manifest = build(str(static))
+    text = (static / manifest['js/event-feed.js']).read_text(encoding='utf-8')
+    assert '"https://ornek.test/api"' in text and '/\\/\\/+/g' in text and 'yorum' not in text
+
+
+def test_without_minifier_files_are_copied_verbatim(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, 'rjsmin', None)
+    static = _static(tmp_path)
+    manifest = build(str(static))
+    assert (static / manifest['js/event-feed.js']).read_text(encoding='utf-8') == SOURCE
@@ -0,0 +1,74 @@
+import os
+import json
+import pytest
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import Appointment, AuditLog
+from conftest import make_app
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+def _book(app, count):
+    with app.app_context():
+        appts = [Appointment(title='Muayene', start_time=START + timedelta(hours=i), end_time=START + timedelta(hours=i, minutes=30),
+                             status='confirmed') for i in range(count)]
+        for appt in appts:  # Ayrı commit'ler: kayıtlar kuyrukta birikir
+            db.session.add(appt)
+            db.session.commit()
+        appts[0].notes = 'güncellendi'
+        db.session.commit()
+        return [a.id for a in appts]
+
+
+def test_batched_writes_reach_log(tmp_path):
+    app = make_app(tmp_path / 'test.db', AUDIT_BATCH_SIZE=3)
+    writer = app.extensions['audit']
+    batches = []
+    write = writer.write
+    writer.write = lambda records: batches.append(len(records)) or write(records)
+    with app.app_context():
+        db.create_all()
+    ids = _book(app, 7)
+    assert writer.thread is not None and writer.thread.is_alive()  # Yazım istek thread'inde yapılmaz
+    assert writer.flush()
+    with app.app_context():
+        records = AuditLog.query.order_by(AuditLog.id).all()
+        assert [(r.entity_id, r.action) for r in records] == [(i, 'create') for i in ids] + [(ids[0], 'update')]
+        assert json.loads(records[-1].changes)['notes'] == [None, 'güncellendi']
+    assert sum(batches) == 8 and max(batches) <= 3
+    writer.close()
+
+
+@pytest.mark.parametrize('batch_size', [1, 200])  # 1: son parti yazılırken _STOP henüz kuyrukta
+def test_close_drains_queue_on_shutdown(tmp_path, batch_size):
+    journal = tmp_path / 'audit'
+    app = make_app(tmp_path / 'test.db', AUDIT_JOURNAL_DIR=str(journal), AUDIT_FLUSH_INTERVAL=60, AUDIT_BATCH_SIZE=batch_size)
+    writer = app.extensions['audit']
+    with app.app_context():
+        db.create_all()
+    ids = _book(app, 3)
+    writer.close()
+    assert not writer.thread.is_alive()
+    with app.app_context():
+        assert {r.entity_id for r in AuditLog.query.filter_by(action='create')} == set(ids)
+    assert os.listdir(journal) == []  # Yazılan günlük silindi
+
+
+def test_orphaned_journal_is_recovered(tmp_path):
+    """Çöken sürecin günlüğündeki kayıtlar bir sonraki süreçte yazılır (event_id ile tekrar yazılmaz)."""
+    journal = tmp_path / 'audit'
+    journal.mkdir()
+    record = {'event_id': 'e1', 'clinic_id': None, 'entity': 'appointment', 'entity_id': 42, 'action': 'delete',
+              'actor_id': None, 'actor_name': None, 'source': 'system', 'changes': None, 'created_at': START.isoformat()}
+    (journal / 'audit-999999.jsonl').write_text(json.dumps(record) + '\n{"yarim', encoding='utf-8')
+    app = make_app(tmp_path / 'test.db', AUDIT_JOURNAL_DIR=str(journal))
+    with app.app_context():
+        db.create_all()
+    _book(app, 1)
+    writer = app.extensions['audit']
+    writer.flush()
+    writer.close()
+    with app.app_context():
+        assert AuditLog.query.filter_by(event_id='e1').one().entity_id == 42
+    assert os.listdir(journal) == []
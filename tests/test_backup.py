@@ -0,0 +1,66 @@
+import os
+from datetime import datetime
+import pytest
+from app.backup import BackupError, databases, restore, snapshot, snapshots
+from app.extensions import db
+from app.models import Appointment
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+def _book(app, *titles):
+    with app.app_context():
+        db.session.add_all(Appointment(title=t, start_time=START, end_time=START.replace(minute=30), status='confirmed')
+                           for t in titles)
+        db.session.commit()
+
+
+def _titles(app):
+    with app.app_context():
+        return sorted(a.title for a in Appointment.query)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_snapshot_verify_restore_round_trip(app, compress):
+    app.config['BACKUP_COMPRESS'] = compress
+    _book(app, 'Muayene', 'Dolgu')
+    with app.app_context():
+        meta = snapshot('main', databases()['main'], now=START)
+        listed, = snapshots('main')
+    assert listed['path'].endswith('.db.gz' if compress else '.db')
+    assert listed['sha256'] == meta['sha256'] and meta['verify'] == 'integrity_check'
+
+    with app.app_context():
+        Appointment.query.filter_by(title='Dolgu').delete()
+        db.session.commit()
+    _book(app, 'Kanal')
+    with app.app_context():
+        before = restore(listed['path'], 'main')
+    assert _titles(app) == ['Dolgu', 'Muayene']  # Havuzdaki açık bağlantılar yeni içeriği görür
+
+    with app.app_context():  # Geri yüklemeden önceki hâl etiketli yedekte
+        saved, = [m for m in snapshots('main') if m['file'] == before['file']]
+        assert saved['label'] == 'pre-restore'
+        restore(saved['path'], 'main', safety=False)
+    assert _titles(app) == ['Kanal', 'Muayene']
+
+
+def test_corrupted_snapshot_is_not_restored(app):
+    _book(app, 'Muayene')
+    with app.app_context():
+        snapshot('main', databases()['main'], now=START)
+        path = snapshots('main')[0]['path']
+    with open(path, 'r+b') as f:  # Sıkıştırılmış gövdede tek bayt
+        f.seek(-12, os.SEEK_END)
+        byte = f.read(1)[0]
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte ^ 0xFF]))
+    _book(app, 'Dolgu')
+    with app.app_context():
+        with pytest.raises(BackupError, match='sha256'):
+            restore(path, 'main', safety=False)
+        with pytest.raises(BackupError, match='Bilinmeyen'):
+            restore(path, 'yok')
+        target = os.path.dirname(databases()['main'])
+    assert _titles(app) == ['Dolgu', 'Muayene']
+    assert not [f for f in os.listdir(target) if f.startswith('.restore-')]  # Geçici dosya silindi
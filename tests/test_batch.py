@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models import Appointment
+
+DAY = datetime(2030, 1, 7)
+
+
+@pytest.fixture
+def booked(app, clients):
+    """Kaynaksız (tüm kaynakları tutan) üç randevu: 10:00, 11:00, 12:00 -> id'ler."""
+    with app.app_context():
+        appts = [Appointment(title='Muayene', start_time=DAY.replace(hour=h), end_time=DAY.replace(hour=h, minute=30),
+                             status='confirmed') for h in (10, 11, 12)]
+        db.session.add_all(appts)
+        db.session.commit()
+        return [a.id for a in appts]
+
+
+def _state(app, ids):
+    with app.app_context():
+        return {a.id: (a.start_time.hour, a.status, a.version) for a in Appointment.query.filter(Appointment.id.in_(ids))}
+
+
+def _batch(clients, *operations):
+    return clients['admin'].post('/api/appointments/batch', json={'operations': list(operations)})
+
+
+def test_batch_applies_all_operations(app, clients, booked):
+    first, second, _ = booked
+    response = _batch(clients, {'id': first, 'action': 'move', 'start': '2030-01-07T15:00', 'version': 1},
+                      {'id': second, 'action': 'cancel', 'version': 1})
+    assert response.status_code == 200 and response.get_json()['count'] == 2
+    state = _state(app, booked)
+    assert state[first] == (15, 'confirmed', 2) and state[second][1] == 'cancelled'
+
+
+def test_partial_conflict_applies_nothing(app, clients, booked):
+    first, second, third = booked
+    before = _state(app, booked)
+    response = _batch(clients, {'id': first, 'action': 'move', 'start': '2030-01-07T15:00'},
+                      {'id': second, 'action': 'move', 'start': '2030-01-07T12:15'})
+    assert response.status_code == 400
+    assert [(e['index'], e['id']) for e in response.get_json()['errors']] == [(1, second)]
+    assert f'#{third}' in response.get_json()['errors'][0]['message']
+    assert _state(app, booked) == before
+
+
+def test_moves_conflicting_within_batch_are_rejected(app, clients, booked):
+    first, second, _ = booked
+    response = _batch(clients, {'id': first, 'action': 'move', 'start': '2030-01-07T16:00'},
+                      {'id': second, 'action': 'move', 'start': '2030-01-07T16:15'})
+    assert response.status_code == 400
+    assert {e['id'] for e in response.get_json()['errors']} == {first, second}
+
+
+def test_cancelled_slot_is_free_within_batch(app, clients, booked):
+    _, second, third = booked
+    response = _batch(clients, {'id': third, 'action': 'cancel'}, {'id': second, 'action': 'move', 'start': '2030-01-07T12:00'})
+    assert response.status_code == 200
+    assert _state(app, booked)[second][0] == 12
+
+
+def test_stale_version_rejects_batch(app, clients, booked):
+    first, second, _ = booked
+    response = _batch(clients, {'id': first, 'action': 'cancel', 'version': 1},
+                      {'id': second, 'action': 'move', 'start': '2030-01-07T15:00', 'version': 7})
+    assert response.status_code == 409
+    error, = response.get_json()['errors']
+    assert error['id'] == second and error['current']['extendedProps']['version'] == 1
+    assert _state(app, booked)[first][1] == 'confirmed'
+
+
+def test_batch_requires_admin(app, clients, booked):
+    response = clients['patient'].post('/api/appointments/batch', json={'operations': [{'id': booked[0], 'action': 'cancel'}]})
+    assert response.status_code == 403
+    assert _state(app, booked)[booked[0]][1] == 'confirmed'
@@ -0,0 +1,45 @@
+from app.extensions import db
+from app.models import Session, Reservation, Member
+
+
+def _reserve(clients, seeded):
+    return clients['patient'].post(f"/reserve/{seeded['session']}")
+
+
+def test_reserve_takes_a_spot(app, clients, seeded):
+    response = _reserve(clients, seeded)
+    assert response.status_code == 302 and '/sessions/calendar' in response.location
+    with app.app_context():
+        assert db.session.get(Session, seeded['session']).spots_left == 3
+        assert Reservation.query.filter_by(session_id=seeded['session'], user_name='Hasta', status='active').count() == 1
+
+
+def test_reserve_twice_is_rejected(app, clients, seeded):
+    _reserve(clients, seeded)
+    _reserve(clients, seeded)
+    with app.app_context():
+        assert db.session.get(Session, seeded['session']).spots_left == 3
+        assert Reservation.query.filter_by(session_id=seeded['session'], user_name='Hasta').count() == 1
+
+
+def test_reserve_full_or_without_credits(app, clients, seeded):
+    with app.app_context():
+        db.session.get(Session, seeded['session']).spots_left = 0
+        db.session.commit()
+    _reserve(clients, seeded)
+    with app.app_context():
+        session = db.session.get(Session, seeded['session'])
+        assert session.spots_left == 0
+        session.spots_left = 4
+        Member.query.filter_by(full_name='Hasta').one().credits = 0
+        db.session.commit()
+    _reserve(clients, seeded)
+    with app.app_context():
+        assert Reservation.query.filter_by(session_id=seeded['session']).count() == 0
+
+
+def test_member_grid_posts_to_reserve(app, clients, seeded):
+    with app.app_context():
+        date = db.session.get(Session, seeded['session']).date.isoformat()
+    html = clients['patient'].get(f'/sessions/calendar?d={date}').get_data(as_text=True)
+    assert f'action="/reserve/{seeded["session"]}"' in html
@@ -0,0 +1,64 @@
+import pytest
+from app.extensions import db
+from app.models import User, Procedure
+from app.resources import MAX_APPOINTMENT_MINUTES
+from app.catalog import DEFAULT_PROCEDURES, get_procedure, refresh, seed_defaults, UnknownProcedure
+from app.tenancy import create_clinic, tenant, clinics
+
+
+def _admin(app):
+    with app.app_context():
+        admin = User(username='yonetici', role='admin')
+        db.session.add(admin)
+        db.session.commit()
+        db.session.refresh(admin)
+        db.session.expunge(admin)
+        clinics()  # Süreç başına bir kez: bütçeye girmesin (bkz. conftest.clients)
+    return app.test_client(user=admin)
+
+
+def test_empty_catalog_has_no_implicit_defaults(app):
+    with app.app_context(), app.test_request_context('/'):
+        refresh(force=True)
+        with pytest.raises(UnknownProcedure):
+            get_procedure('Muayene')
+
+
+def test_first_admin_save_seeds_defaults(app):
+    client = _admin(app)
+    client.post('/admin/procedures/save', data={'name': 'Beyazlatma', 'duration': '60', 'active': 'on'})
+    with app.app_context():
+        names = {p.name for p in Procedure.query}
+    assert names == {p['name'] for p in DEFAULT_PROCEDURES} | {'Beyazlatma'}
+
+
+def test_procedure_longer_than_max_appointment_is_rejected(app):
+    """Çakışma sorguları randevuları MAX_APPOINTMENT kadar geriye tarar; daha uzun işlem kaydedilmez."""
+    client = _admin(app)
+    client.post('/admin/procedures/save', data={'name': 'Uzun', 'duration': str(MAX_APPOINTMENT_MINUTES), 'buffer_minutes': '10', 'active': 'on'})
+    client.post('/admin/procedures/save', data={'name': 'Sınırda', 'duration': str(MAX_APPOINTMENT_MINUTES - 10), 'buffer_minutes': '10', 'active': 'on'})
+    with app.app_context():
+        names = {p.name for p in Procedure.query}
+    assert 'Sınırda' in names and 'Uzun' not in names
+
+
+def test_defaults_do_not_come_back(app):
+    with app.app_context(), app.test_request_context('/'):
+        assert seed_defaults() == len(DEFAULT_PROCEDURES)
+        db.session.commit()
+        Procedure.query.filter(Procedure.name != 'Muayene').delete()
+        db.session.commit()
+        assert seed_defaults() == 0
+        refresh(force=True)
+        assert get_procedure('Muayene')['duration'] == 30
+        with pytest.raises(UnknownProcedure):
+            get_procedure('Dolgu')
+
+
+def test_new_clinic_starts_with_defaults(app):
+    with app.app_context():
+        clinic = create_clinic('sube-2', 'Şube 2')
+        with tenant(clinic.id):
+            assert Procedure.query.count() == len(DEFAULT_PROCEDURES)
+        with tenant(None):
+            assert Procedure.query.count() == 0
@@ -0,0 +1,67 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm.exc import StaleDataError
+from app.extensions import db
+from app.models import Appointment
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+@pytest.fixture
+def appt_id(app, clients):
+    with app.app_context():
+        appt = Appointment(title='Muayene', start_time=START, end_time=START.replace(minute=30), status='confirmed')
+        db.session.add(appt)
+        db.session.commit()
+        return appt.id
+
+
+def _current(app, appt_id):
+    with app.app_context():
+        appt = db.session.get(Appointment, appt_id)
+        return appt and (appt.notes, appt.version)
+
+
+def test_stale_update_returns_409_with_current(app, clients, appt_id):
+    url = f'/api/appointments/{appt_id}/update'
+    response = clients['admin'].post(url, data={'notes': 'ilk', 'version': 1})
+    assert response.status_code == 200 and response.get_json()['version'] == 2
+    response = clients['admin'].post(url, data={'notes': 'eski form', 'version': 1})
+    assert response.status_code == 409
+    assert response.get_json()['current']['extendedProps']['version'] == 2
+    assert _current(app, appt_id) == ('ilk', 2)
+
+
+def test_update_without_version_is_not_checked(app, clients, appt_id):
+    """Sürüm göndermeyen eski istemci."""
+    assert clients['admin'].post(f'/api/appointments/{appt_id}/update', data={'notes': 'eski istemci'}).status_code == 200
+    assert _current(app, appt_id) == ('eski istemci', 2)
+
+
+def test_stale_delete_returns_409(app, clients, appt_id):
+    response = clients['admin'].post(f'/api/appointments/{appt_id}/delete', data={'version': 3})
+    assert response.status_code == 409
+    assert _current(app, appt_id) == (None, 1)
+    assert clients['admin'].post(f'/api/appointments/{appt_id}/delete', data={'version': 1}).status_code == 200
+    assert _current(app, appt_id) is None
+
+
+def test_write_between_read_and_flush_is_detected(app, appt_id):
+    """Form sürümü tutsa bile araya giren yazma UPDATE ... WHERE version = ? ile yakalanır."""
+    with app.app_context():
+        appt = db.session.get(Appointment, appt_id)
+        with db.engine.begin() as conn:  # Başka bir istek
+            conn.execute(update(Appointment.__table__).where(Appointment.__table__.c.id == appt_id).values(version=2))
+        appt.notes = 'geç kalan'
+        with pytest.raises(StaleDataError):
+            db.session.commit()
+        db.session.rollback()
+    assert _current(app, appt_id) == (None, 2)
+
+
+@pytest.mark.parametrize('action', ['update', 'delete'])
+def test_patient_cannot_edit_appointments(app, clients, appt_id, action):
+    response = clients['patient'].post(f'/api/appointments/{appt_id}/{action}', data={'notes': 'hasta', 'version': 1})
+    assert response.status_code == 403
+    assert _current(app, appt_id) == (None, 1)
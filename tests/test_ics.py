@@ -0,0 +1,42 @@
+import pytest
+from app.extensions import db
+from app.models import Appointment
+from app.ics import _FEEDS
+
+
+@pytest.fixture(autouse=True)
+def empty_feed_cache():
+    _FEEDS.clear()  # Süreç içi önbellek: başka testin aynı damgalı gövdesi kullanılmasın
+
+
+def test_patient_feed_lists_own_appointments(app, clients, seeded):
+    response = clients[None].get('/calendar/plan-hasta.ics')
+    assert response.status_code == 200 and response.mimetype == 'text/calendar'
+    body = response.get_data(as_text=True)
+    with app.app_context():
+        own = Appointment.query.filter(Appointment.user_id == seeded['patient'], Appointment.end_time > Appointment.start_time).count()
+    assert body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n')
+    assert body.count('BEGIN:VEVENT') == own > 0
+    assert clients[None].get('/calendar/yok.ics').status_code == 404
+
+
+@pytest.mark.parametrize('token', ['plan-hasta', 'plan-admin'])
+def test_unchanged_feed_returns_304(clients, token):
+    url = f'/calendar/{token}.ics'
+    first = clients[None].get(url)
+    assert first.status_code == 200 and first.headers['ETag']
+    again = clients[None].get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+    _FEEDS.clear()  # Başka bir worker: gövde bu süreçte yok, yine de üretilmeden 304
+    assert clients[None].get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+
+def test_edit_changes_etag(app, clients, seeded):
+    first = clients[None].get('/calendar/plan-hasta.ics')
+    with app.app_context():
+        appt = db.session.get(Appointment, seeded['appointment'])
+        appt.notes = 'değişti'  # Sürüm artar
+        db.session.commit()
+    response = clients[None].get('/calendar/plan-hasta.ics', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200 and response.headers['ETag'] != first.headers['ETag']
+    assert 'SEQUENCE:1' in response.get_data(as_text=True)
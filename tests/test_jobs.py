@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import User, Appointment, Treatment, JobRun
+from app.scheduler import run_job, run_due_jobs, acquire_lock, release_lock
+
+
+def _appointment(start, **kwargs):
+    return Appointment(title='Muayene', start_time=start, end_time=start + timedelta(minutes=30), status='confirmed', **kwargs)
+
+
+def test_close_marks_no_shows_before_completing(app):
+    start = datetime.now().replace(second=0, microsecond=0) - timedelta(hours=5)
+    with app.app_context():
+        treated, absent = User(username='gelen', role='patient'), User(username='gelmeyen', role='patient')
+        db.session.add_all([treated, absent])
+        db.session.flush()
+        db.session.add(Treatment(user_id=treated.id, procedure_name='Dolgu', date=start))
+        db.session.add_all([_appointment(start, user_id=treated.id), _appointment(start, user_id=absent.id),
+                            _appointment(start, guest_name='Misafir'), _appointment(start + timedelta(hours=4), user_id=absent.id)])
+        db.session.commit()
+        run = run_job('close_past_appointments')
+        assert run.status == 'success' and run.rows_affected == 3
+        statuses = {(a.user_id, a.guest_name, a.status) for a in Appointment.query.all()}
+        treated, absent = treated.id, absent.id
+    assert statuses == {(treated, None, 'completed'), (absent, None, 'no_show'),
+                        (None, 'Misafir', 'completed'), (absent, None, 'confirmed')}
+
+
+def test_due_job_is_rechecked_inside_lock(app, monkeypatch):
+    """İki worker aynı anda `last_runs()` okusa da görev bir kez çalışır."""
+    calls = []
+    monkeypatch.setattr('app.scheduler.JOBS', {'deneme': {'func': lambda: calls.append(1) or 1, 'every': 3600,
+                                                          'description': '', 'per_tenant': False}})
+    with app.app_context():
+        stale = {}  # Diğer worker'ın kilitten önce gördüğü durum: görev hiç çalışmamış
+        monkeypatch.setattr('app.scheduler.last_runs', lambda: stale)
+        assert run_due_jobs() == ['deneme']
+        assert run_due_jobs() == []
+        assert run_job('deneme').status == 'success'  # Elle çalıştırma zamanı beklemez
+        assert JobRun.query.filter_by(job_name='deneme').count() == 2
+    assert calls == [1, 1]
+
+
+def test_run_job_returns_none_when_locked(app):
+    with app.app_context():
+        assert acquire_lock('close_past_appointments', 'baska-worker')
+        assert run_job('close_past_appointments') is None
+        release_lock('close_past_appointments', 'baska-worker')
+        assert run_job('close_past_appointments').status == 'success'
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade, downgrade
+from app.extensions import db
+from app.models import Appointment, User, Procedure
+from app.catalog import DEFAULT_PROCEDURES
+from conftest import make_app
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+BASELINE = '3b78fdc9be44'
+# Migration'lardan önce create_all ile açılmış (temel şemadaki) veritabanı
+BASELINE_SCHEMA = """
+CREATE TABLE user (id INTEGER NOT NULL, username VARCHAR(150) NOT NULL, password_hash VARCHAR(256),
+    full_name VARCHAR(150), email VARCHAR(150), phone VARCHAR(20), role VARCHAR(20), created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (username));
+CREATE TABLE appointment (id INTEGER NOT NULL, user_id INTEGER, title VARCHAR(100), start_time DATETIME,
+    end_time DATETIME, guest_name VARCHAR(100), guest_phone VARCHAR(20), notes TEXT, status VARCHAR(20),
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id));
+CREATE TABLE treatment (id INTEGER NOT NULL, user_id INTEGER NOT NULL, procedure_name VARCHAR(100),
+    tooth_number VARCHAR(10), cost FLOAT, payment_received FLOAT, notes TEXT, date DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id));
+INSERT INTO user (id, username, full_name, phone, role) VALUES (1, 'hasta', 'Hasta', '0532 123 45 67', 'patient');
+INSERT INTO appointment (id, user_id, title, start_time, end_time, status)
+    VALUES (7, 1, 'Muayene', '2030-01-07 10:00:00.000000', '2030-01-07 10:30:00.000000', 'confirmed');
+INSERT INTO treatment (id, user_id, procedure_name, cost) VALUES (3, 1, 'Dolgu', 100);
+"""
+
+
+def _schema_diff():
+    with db.engine.connect() as conn:
+        return compare_metadata(MigrationContext.configure(conn), db.metadata)
+
+
+def test_upgrade_builds_model_schema(tmp_path):
+    app = make_app(tmp_path / 'bos.db')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        assert _schema_diff() == []
+        assert Procedure.query.count() == len(DEFAULT_PROCEDURES)
+        db.engine.dispose()
+
+
+def test_upgrade_existing_baseline_database(tmp_path):
+    path = tmp_path / 'eski.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+    app = make_app(path)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        assert _schema_diff() == []
+        appointment = db.session.get(Appointment, 7)
+        assert (appointment.version, appointment.series_id, appointment.clinic_id) == (1, None, None)
+        assert db.session.get(User, 1).phone == '0532 123 45 67'
+        db.engine.dispose()
+    with sqlite3.connect(path) as conn:
+        sql = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE name IN ('appointment', 'treatment')"))
+        assert all('AUTOINCREMENT' in sql[t] for t in ('appointment', 'treatment'))
+        conn.execute("INSERT INTO clinic (id, slug) VALUES (2, 'sube-2')")
+        conn.execute("INSERT INTO user (username, clinic_id) VALUES ('hasta', 2)")  # Başka şubede aynı ad olur
+        for clinic_id in (None, 2):
+            with pytest.raises(sqlite3.IntegrityError):
+                conn.execute('INSERT INTO user (username, clinic_id) VALUES (?, ?)', ('hasta', clinic_id))
+
+
+def test_downgrade_to_baseline(tmp_path):
+    app = make_app(tmp_path / 'geri.db')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        downgrade(directory=MIGRATIONS, revision=BASELINE)
+        with db.engine.connect() as conn:
+            tables = set(db.inspect(conn).get_table_names())
+            columns = {c['name'] for c in db.inspect(conn).get_columns('appointment')}
+        assert tables == {'alembic_version', 'user', 'appointment', 'treatment'}
+        assert 'series_id' not in columns
+        db.engine.dispose()
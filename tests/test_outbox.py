@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert, update
+from app import outbox
+from app.extensions import db
+from app.models import Appointment, OutboxMessage
+from app.outbox import claim_batch, process_batch, cancel_reminders, reminder_rows, BACKOFF_BASE, MAX_ATTEMPTS, STALE_CLAIM
+from app.transports import StubTransport
+
+
+@pytest.fixture
+def message(app):
+    """Zamanı gelmiş tek SMS hatırlatması: (randevu id, mesaj id)."""
+    StubTransport.outbox = []
+    start = datetime.now() + timedelta(days=2)
+    with app.app_context():
+        appt = Appointment(title='Muayene', start_time=start, end_time=start + timedelta(minutes=30), status='confirmed')
+        db.session.add(appt)
+        db.session.flush()
+        row = reminder_rows(appt.id, start, 'Muayene', 'Hasta', phone='05551112233')[0]
+        due = datetime.now() - timedelta(minutes=1)
+        message_id = db.session.execute(insert(OutboxMessage).returning(OutboxMessage.id),
+                                        [dict(row, due_at=due, next_attempt_at=due)]).scalar_one()
+        appt_id = appt.id
+        db.session.commit()
+    return appt_id, message_id
+
+
+def _status(message_id):
+    db.session.expire_all()
+    return db.session.get(OutboxMessage, message_id)
+
+
+def test_claim_is_exclusive(app, message):
+    with app.app_context():
+        assert [m['id'] for m in claim_batch(owner='a')] == [message[1]]
+        assert claim_batch(owner='b') == []
+        assert _status(message[1]).claimed_by == 'a'
+
+
+def test_stale_claim_is_taken_over(app, message):
+    with app.app_context():
+        claim_batch(owner='olu-worker', now=datetime.now() - STALE_CLAIM - timedelta(minutes=1))
+        assert claim_batch(owner='b') != []
+        assert _status(message[1]).claimed_by == 'b'
+
+
+def test_failed_send_backs_off_then_gives_up(app, message):
+    app.config['OUTBOX_STUB_FAIL'] = ('05551112233',)
+    with app.app_context():
+        assert process_batch() == (0, 1)
+        msg = _status(message[1])
+        assert (msg.status, msg.attempts) == ('pending', 1)
+        assert msg.next_attempt_at - datetime.now() == pytest.approx(BACKOFF_BASE, abs=timedelta(seconds=5))
+        for _ in range(MAX_ATTEMPTS - 1):
+            db.session.execute(update(OutboxMessage).values(next_attempt_at=datetime.now() - timedelta(seconds=1)))
+            db.session.commit()
+            process_batch()
+        msg = _status(message[1])
+        assert (msg.status, msg.attempts) == ('failed', MAX_ATTEMPTS)
+    assert StubTransport.outbox == []
+
+
+def test_successful_send(app, message):
+    with app.app_context():
+        assert process_batch() == (1, 0)
+        assert _status(message[1]).status == 'sent'
+    assert [m['id'] for m in StubTransport.outbox] == [message[1]]
+
+
+@pytest.mark.parametrize('fail', [False, True])
+def test_cancel_during_send_is_kept(app, message, monkeypatch, fail):
+    """Gönderim sürerken randevu iptal edildi: sonuç iptali ezmez, mesaj yeniden denenmez."""
+    if fail:
+        app.config['OUTBOX_STUB_FAIL'] = ('05551112233',)
+    claim = outbox.claim_batch
+
+    def claim_then_cancel(*args, **kwargs):
+        messages = claim(*args, **kwargs)
+        assert cancel_reminders([message[0]]) == 1
+        db.session.commit()
+        return messages
+
+    monkeypatch.setattr('app.outbox.claim_batch', claim_then_cancel)
+    with app.app_context():
+        process_batch()
+        assert _status(message[1]).status == 'cancelled'
+        monkeypatch.undo()
+        assert claim_batch(owner='b') == []
+
+
+def test_result_does_not_overwrite_takeover(app, message, monkeypatch):
+    app.config['OUTBOX_STUB_FAIL'] = ('05551112233',)
+    claim = outbox.claim_batch
+
+    def claim_then_lose(*args, **kwargs):
+        messages = claim(*args, **kwargs)
+        db.session.execute(update(OutboxMessage).values(claimed_by='b'))  # Süresi doldu, başka worker aldı
+        db.session.commit()
+        return messages
+
+    monkeypatch.setattr('app.outbox.claim_batch', claim_then_lose)
+    with app.app_context():
+        process_batch()
+        msg = _status(message[1])
+        assert (msg.status, msg.claimed_by, msg.attempts) == ('sending', 'b', 0)
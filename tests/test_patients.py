@@ -0,0 +1,76 @@
+from datetime import datetime
+import pytest
+from app.extensions import db
+from app.models import (User, Appointment, Treatment, AppointmentArchive, TreatmentArchive, WaitlistEntry,
+                        IdempotencyKey)
+from app.patients import AUTO_PASSWORD, REFERENCES, duplicate_clusters, merge_duplicates
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+def _patient(username, phone, password=AUTO_PASSWORD):
+    user = User(username=username, phone=phone, password_hash=password, role='patient')
+    db.session.add(user)
+    db.session.flush()
+    return user.id
+
+
+def _refer(user_id, n):
+    """Hastaya her modelden birer bağlı satır (arşiv id'leri elle verilir)."""
+    db.session.add_all([
+        Appointment(user_id=user_id, title='Muayene', start_time=START, end_time=START.replace(minute=30), status='confirmed'),
+        Treatment(user_id=user_id, procedure_name='Dolgu', date=START),
+        AppointmentArchive(id=1000 + n, user_id=user_id, start_time=START, version=1),
+        TreatmentArchive(id=1000 + n, user_id=user_id, date=START, version=1),
+        WaitlistEntry(user_id=user_id, earliest=START, latest=START.replace(hour=12)),
+        IdempotencyKey(user_id=user_id, key='k', endpoint='book'),
+    ])
+
+
+@pytest.fixture
+def patients(app):
+    """Aynı numaralı iki otomatik kayıt + sonradan giriş yapan gerçek hesap; farklı numaralı bir hasta."""
+    with app.app_context():
+        ids = {
+            'auto1': _patient('auto1', '0532 123 45 67'),
+            'auto2': _patient('auto2', '05321234567'),
+            'real': _patient('gercek', '+90 532 123 45 67', password='hash'),
+            'other': _patient('baska', '0533 000 00 00'),
+        }
+        for n, key in enumerate(('auto1', 'auto2', 'real', 'other')):
+            _refer(ids[key], n)
+        db.session.commit()
+    return ids
+
+
+def _owners(model):
+    return sorted(uid for uid, in db.session.query(model.user_id))
+
+
+def test_merge_moves_references_and_deletes_duplicates(app, patients):
+    keep, other = patients['real'], patients['other']
+    with app.app_context():
+        cluster, = duplicate_clusters()
+        assert cluster['keep'] == keep and cluster['merge'] == [patients['auto1'], patients['auto2']]
+        assert merge_duplicates(batch_size=1) == 2  # Her parti ayrı transaction
+        db.session.expire_all()
+        assert {u.id for u in User.query.filter_by(role='patient')} == {keep, other}
+        for model in REFERENCES:
+            assert _owners(model) == sorted([keep] * 3 + [other]), model.__name__
+        # Aktarılan satırların sürümü arttı; diğer hastanınkiler değişmedi
+        for model in (Appointment, Treatment):
+            versions = dict(db.session.query(model.user_id, db.func.group_concat(model.version)).group_by(model.user_id))
+            assert sorted(versions[keep].split(',')) == ['1', '2', '2'] and versions[other] == '1'
+        assert _owners(IdempotencyKey) == sorted([keep, other])  # Çakışacak anahtarlar silindi
+        assert duplicate_clusters() == []
+
+
+def test_second_real_account_is_not_merged(app, patients):
+    with app.app_context():
+        db.session.get(User, patients['auto1']).password_hash = 'hash'  # Aynı numarayı kullanan aile bireyi
+        db.session.commit()
+        cluster, = duplicate_clusters()
+        assert cluster['keep'] == patients['auto1'] and cluster['skipped'] == [patients['real']]
+        assert merge_duplicates() == 1
+        assert db.session.get(User, patients['real']) is not None
+        assert _owners(Appointment).count(patients['auto1']) == 2
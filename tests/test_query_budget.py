@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from app.query_budget import missing_budgets, count_queries, assert_max_queries, QueryBudgetExceeded
+from app.extensions import db
+from app.models import Appointment
+from conftest import make_app
+
+# Bütçeler TESTING altında zorunludur: aşan istek QueryBudgetExceeded fırlatır ve test düşer.
+TODAY = datetime.now().strftime('%Y-%m-%d')
+TOMORROW = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+# Randevu yazan istekler örnek verinin (şimdi −30 s … +26 s) ve yarınki serinin dışında bir güne düşer;
+# yoksa saate göre çakışma çıkıp test rastgele düşer.
+LATER = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+WEEK = f"start={TODAY}T00:00:00&end={(datetime.now() + timedelta(days=7)):%Y-%m-%d}T00:00:00"
+
+# (endpoint, kullanıcı, yöntem, adres, gövde) — adresteki {anahtar}lar `seeded` id'leriyle doldurulur
+REQUESTS = [
+    ('auth.login', None, 'get', '/login', None),
+    ('auth.login', 'admin', 'get', '/', None),
+    ('auth.logout', 'patient', 'get', '/logout', None),
+    ('auth.check_clerk_session', None, 'get', '/auth/check-clerk', None),
+    ('admin.dashboard', 'admin', 'get', '/admin/dashboard', None),
+    ('admin.calendar_view', 'admin', 'get', '/admin/calendar', None),
+    ('admin.appointment_list', 'admin', 'get', '/admin/appointments-list', None),
+    ('admin.patients_list', 'admin', 'get', '/admin/patients-list', None),
+    ('admin.patient_detail', 'admin', 'get', '/admin/patient/{patient}', None),
+    ('admin.appointment_detail', 'admin', 'get', '/admin/appointment/{appointment}', None),
+    ('admin.get_appointments', 'admin', 'get', f'/api/appointments?{WEEK}', None),
+    ('admin.create_appointment', 'admin', 'post', '/api/appointments/create',
+     {'appt_date': LATER, 'appt_time': '22:00', 'title': 'Muayene', 'guest_phone': '0555 111 22 33', 'guest_name': 'Yeni'}),
+    ('admin.update_appointment', 'admin', 'post', '/api/appointments/{appointment}/update',
+     {'notes': 'not', 'appt_date': LATER, 'appt_time': '20:00', 'version': 1}),
+    ('admin.delete_appointment', 'admin', 'post', '/api/appointments/{appointment}/delete', {'version': 1}),
+    ('admin.batch_appointments', 'admin', 'json', '/api/appointments/batch',
+     {'operations': [{'id': '{appointment}', 'action': 'move', 'start': f'{LATER}T21:00'},
+                     {'id': '{series}', 'action': 'cancel'}]}),
+    ('admin.create_appointment_series', 'admin', 'post', '/api/appointments/series/create',
+     {'appt_date': LATER, 'appt_time': '19:00', 'title': 'Muayene', 'repeat_freq': 'WEEKLY', 'repeat_count': '6',
+      'guest_phone': '0555 111 22 33', 'guest_name': 'Seri'}),
+    ('admin.update_appointment_series', 'admin', 'post', '/api/appointments/{series}/series/update',
+     {'notes': 'seri', 'appt_date': LATER, 'appt_time': '07:00'}),
+    ('admin.cancel_appointment_series', 'admin', 'post', '/api/appointments/{series}/series/cancel', None),
+    ('admin.add_treatment', 'admin', 'post', '/api/patient/{patient}/add_treatment', {'procedure_name': 'Dolgu', 'cost': '100'}),
+    ('admin.settings', 'admin', 'get', '/admin/settings', None),
+    ('admin.jobs', 'admin', 'get', '/admin/jobs', None),
+    ('admin.run_job_now', 'admin', 'post', '/admin/jobs/close_past_appointments/run', None),
+    ('admin.outbox_stats_api', 'admin', 'get', '/api/admin/outbox/stats', None),
+    ('admin.waitlist', 'admin', 'get', '/api/admin/waitlist', None),
+    ('admin.add_to_waitlist', 'admin', 'post', '/api/admin/waitlist/add',
+     {'earliest': f'{TOMORROW}T09:00', 'latest': f'{TOMORROW}T12:00', 'title': 'Muayene',
+      'guest_phone': '0555 111 22 33', 'guest_name': 'Bekleyen'}),
+    ('admin.waitlist_offer_action', 'admin', 'post', '/api/admin/waitlist/{offer}/accept', None),
+    ('admin.resources', 'admin', 'get', '/api/admin/resources', None),
+    ('admin.create_resource', 'admin', 'post', '/api/admin/resources/create', {'name': 'Koltuk 2', 'kind': 'chair'}),
+    ('admin.toggle_resource', 'admin', 'post', '/api/admin/resources/{resource}/toggle', None),
+    ('admin.procedure_catalog', 'admin', 'get', '/admin/procedures', None),
+    ('admin.save_procedure', 'admin', 'post', '/admin/procedures/save',
+     {'name': 'Beyazlatma', 'duration': '60', 'required_resources': ['dentist', 'chair'], 'active': 'on'}),
+    ('admin.audit_log', 'admin', 'get', '/api/admin/audit?entity=appointment&entity_id={appointment}', None),
+    ('admin.utilization_analytics', 'admin', 'get', '/api/admin/analytics/utilization', None),
+    ('user.dashboard', 'patient', 'get', '/dashboard', None),
+    ('user.get_calendar_events', 'patient', 'get', f'/api/user/calendar?{WEEK}', None),
+    ('user.create_appointment', 'patient', 'post', '/api/user/appointment/create',
+     {'appt_date': LATER, 'appt_time': '23:00', 'title': 'Muayene'}),
+    ('user.service_worker', None, 'get', '/sw.js', None),
+    ('user.csrf_token', 'patient', 'get', '/api/user/csrf-token', None),
+    ('user.calendar_feed', None, 'get', '/calendar/plan-hasta.ics', None),
+    ('user.calendar_subscription', 'patient', 'post', '/api/user/calendar-subscription?reset=1', None),
+    ('user.availability', 'patient', 'get', f'/api/availability?date={TOMORROW}&title=Muayene', None),
+    ('user.my_waitlist', 'patient', 'get', '/api/user/waitlist', None),
+    ('user.join_waitlist', 'patient', 'post', '/api/user/waitlist/join', {'appt_date': TOMORROW, 'title': 'Muayene'}),
+    ('user.answer_offer', 'patient', 'post', '/api/user/waitlist/{offer}/decline', None),
+    ('calendar.sessions_calendar', 'patient', 'get', '/sessions/calendar', None),
+    ('calendar.calendar_grid', 'admin', 'get', '/calendar/grid', None),
+    ('calendar.reserve', 'patient', 'post', '/reserve/{session}', None),
+]
+
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        return int(ids[value[1:-1]]) if value.startswith('{') and value.endswith('}') else value.format(**ids)
+    if isinstance(value, dict):
+        return {k: _fill(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, ids) for v in value]
+    return value
+
+
+def test_every_route_has_budget(app):
+    assert missing_budgets(app) == []
+
+
+def test_every_route_is_exercised(app):
+    endpoints = {name for name in app.view_functions if name != 'static'}
+    assert endpoints - {r[0] for r in REQUESTS} == set()
+
+
+@pytest.mark.parametrize('endpoint, who, method, url, body', REQUESTS, ids=[f'{r[0]}:{r[3]}' for r in REQUESTS])
+def test_route_within_budget(app, clients, seeded, endpoint, who, method, url, body):
+    client = clients[who]
+    url, body = _fill(url, seeded), _fill(body, seeded)
+    if method == 'json':
+        response = client.post(url, json=body)
+    else:
+        response = getattr(client, method)(url, data=body)
+    assert response.status_code < 400 or response.status_code in (302, 409), response.get_data(as_text=True)[:500]
+
+
+def test_counter_sees_read_replica(app, seeded, clients):
+    """GET'lerin SELECT'leri replika engine'inden gider; sayaç onları da görür."""
+    with app.app_context(), count_queries() as counter:
+        clients['admin'].get(f'/api/appointments?{WEEK}')
+    assert any('FROM appointment' in s for s in counter.statements)
+
+
+def test_assert_max_queries(app, seeded):
+    with app.app_context():
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_max_queries(1):
+                db.session.query(Appointment).all()
+                db.session.query(Appointment).count()
+
+
+def test_app_factory_adds_no_engine_listeners(tmp_path):
+    """Süreç içinde açılan her uygulama (testler, yük testi) Engine'e yeni dinleyici eklemez."""
+    make_app(tmp_path / 'a.db')
+    listeners = len(create_engine('sqlite://').dispatch.before_cursor_execute)
+    make_app(tmp_path / 'b.db')
+    assert len(create_engine('sqlite://').dispatch.before_cursor_execute) == listeners
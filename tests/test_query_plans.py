@@ -0,0 +1,18 @@
+import pytest
+from app.models import Appointment
+from app.query_plans import check_hot_paths, assert_index_only, report, QueryPlanRegression
+
+
+def test_hot_paths_use_indexes():
+    """Sık istekler ve bakım görevleri büyük tabloları taramaz (`flask indexes check` ile aynı kontrol)."""
+    problems = check_hot_paths()
+    assert not problems, report(problems)
+
+
+def test_assert_index_only_reports_scan(app, seeded):
+    with app.app_context():
+        with pytest.raises(QueryPlanRegression, match='appointment'):
+            with assert_index_only('not araması'):
+                Appointment.query.filter(Appointment.notes == 'x').all()
+        with assert_index_only('hastanın randevuları'):
+            Appointment.query.filter_by(clinic_id=None, user_id=seeded['patient']).order_by(Appointment.start_time).all()
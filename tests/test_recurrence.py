@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models import Appointment, AuditLog
+from app.recurrence import expand, build_rule, RecurrenceError, MAX_OCCURRENCES
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+def test_expand_count_and_until():
+    assert len(expand(START, build_rule('WEEKLY', count=MAX_OCCURRENCES))) == MAX_OCCURRENCES
+    assert expand(START, build_rule('DAILY', until=START + timedelta(days=2))) == [START + timedelta(days=i) for i in range(3)]
+
+
+def test_count_over_limit_is_rejected():
+    with pytest.raises(RecurrenceError):
+        expand(START, build_rule('WEEKLY', count=MAX_OCCURRENCES + 1))
+
+
+def test_until_over_limit_is_rejected():
+    with pytest.raises(RecurrenceError):
+        expand(START, build_rule('DAILY', until=START + timedelta(days=MAX_OCCURRENCES)))
+
+
+def test_series_route_rejects_long_count(app, clients):
+    response = clients['admin'].post('/api/appointments/series/create', data={
+        'appt_date': '2030-01-07', 'appt_time': '10:00', 'title': 'Muayene', 'repeat_freq': 'WEEKLY',
+        'repeat_count': str(MAX_OCCURRENCES + 1), 'guest_name': 'Seri', 'guest_phone': '0555 111 22 33'})
+    assert response.status_code == 400
+    with app.app_context():
+        assert Appointment.query.filter(Appointment.series_id.isnot(None), Appointment.title == 'Muayene',
+                                        Appointment.start_time >= START).count() == 0
+
+
+def test_series_creation_is_audited(app, clients):
+    response = clients['admin'].post('/api/appointments/series/create', data={
+        'appt_date': '2030-01-07', 'appt_time': '10:00', 'title': 'Muayene', 'repeat_freq': 'WEEKLY',
+        'repeat_count': '3', 'guest_name': 'Seri', 'guest_phone': '0555 111 22 33'})
+    series_id = response.get_json()['series_id']
+    with app.app_context():
+        app.extensions['audit'].flush()
+        ids = {a for (a,) in db.session.query(Appointment.id).filter_by(series_id=series_id)}
+        records = AuditLog.query.filter(AuditLog.entity == 'appointment', AuditLog.entity_id.in_(ids)).all()
+    assert len(ids) == 3
+    assert {r.entity_id for r in records} == ids
+    assert {r.action for r in records} == {'create'}
+    assert all(r.source == 'admin.create_appointment_series' for r in records)
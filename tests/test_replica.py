@@ -0,0 +1,44 @@
+from sqlalchemy import update
+from flask import g
+from app.extensions import db
+from app.models import Resource
+
+
+def test_commit_without_rows_does_not_mark_write(app):
+    with app.test_request_context('/'):
+        chair = Resource(name='Koltuk 1', kind='chair')
+        db.session.add(chair)
+        db.session.commit()
+        g.pop('wrote', None)
+        db.session.commit()
+        chair.name = chair.name  # Değer değişmedi: flush satır yazmaz
+        db.session.commit()
+        assert not g.get('wrote')
+        chair.name = 'Koltuk 2'
+        db.session.commit()
+        assert g.get('wrote')
+
+
+def test_bulk_write_marks_write(app):
+    with app.test_request_context('/'):
+        db.session.execute(update(Resource).values(active=False))
+        db.session.commit()
+        assert g.get('wrote')
+
+
+def test_rolled_back_write_is_forgotten(app):
+    with app.test_request_context('/'):
+        db.session.add(Resource(name='Koltuk 1', kind='chair'))
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert not g.get('wrote')
+
+
+def test_read_only_request_keeps_reading_from_replica(app, clients):
+    clients['patient'].get('/api/user/csrf-token')
+    with clients['patient'].session_transaction() as session:
+        assert 'rw_until' not in session
+    clients['patient'].post('/api/user/waitlist/join', data={'appt_date': '2030-01-07', 'title': 'Muayene'})
+    with clients['patient'].session_transaction() as session:
+        assert session['rw_until']
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models import Appointment
+from app.resources import check_conflict, find_slots, MAX_APPOINTMENT, MAX_APPOINTMENT_MINUTES
+from app.recurrence import create_series, build_rule, RecurrenceError
+from app.waitlist import add_entry, WaitlistError
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+def test_longest_appointment_blocks_its_last_minutes(app):
+    end = START + MAX_APPOINTMENT
+    with app.app_context():
+        db.session.add(Appointment(title='Uzun', start_time=START, end_time=end, status='confirmed'))
+        db.session.commit()
+        assert check_conflict(end - timedelta(minutes=15), end + timedelta(minutes=15)) is not None
+        slots = find_slots(START.date(), 30, now=START - timedelta(days=1))
+    assert end - timedelta(minutes=15) not in slots and end in slots
+
+
+def test_longer_appointments_cannot_be_written(app):
+    too_long = MAX_APPOINTMENT_MINUTES + 15
+    with app.app_context():
+        with pytest.raises(RecurrenceError):
+            create_series(START, too_long, build_rule('WEEKLY', count=2))
+        with pytest.raises(WaitlistError):
+            add_entry('Uzun', too_long, datetime.now(), datetime.now() + timedelta(days=1))
+        assert Appointment.query.count() == 0
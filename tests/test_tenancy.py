@@ -0,0 +1,17 @@
+def test_header_does_not_switch_clinic_for_logged_in_user(app, branches):
+    client = app.test_client(user=branches['a'])
+    response = client.get('/admin/dashboard', headers={'X-Clinic': 'b'})
+    assert response.status_code == 302 and response.headers['location'].endswith('/dashboard')
+    assert client.get('/dashboard', headers={'X-Clinic': 'b'}).status_code == 200
+
+
+def test_session_is_not_loaded_in_another_clinic(app, branches):
+    client = app.test_client(user=branches['a'])
+    app.config['DEFAULT_CLINIC'] = 'b'  # Aynı çerez B şubesinin adresine gider
+    response = client.get('/admin/dashboard')
+    assert response.status_code == 302 and '/login' in response.headers['location']
+
+
+def test_header_selects_clinic_before_login(app, branches):
+    assert app.test_client().get('/login', headers={'X-Clinic': 'yok'}).status_code == 404
+    assert app.test_client().get('/login', headers={'X-Clinic': 'b'}).status_code == 200